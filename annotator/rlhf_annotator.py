@@ -17,6 +17,14 @@ except ImportError:
         base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
         return os.path.join(base_path, relative_path)
 
+# Optional near-duplicate removal for the combined exports (needs numpy and ../data_export/dedup.py)
+try:
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_export"))
+    from dedup import NUMPY_AVAILABLE, deduplicate
+    DEDUP_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    DEDUP_AVAILABLE = False
+
 def get_app_dir():
     """
     Get the application directory (where the executable is located) instead of 
@@ -681,6 +689,12 @@ class RLHFAnnotator:
                     for item in file_annotations:
                         f.write(json.dumps(item, ensure_ascii=False) + '\n')
         
+        # Drop repeated and near-identical examples (retries, canned wrap-ups) from the combined exports
+        removed_duplicates = 0
+        if DEDUP_AVAILABLE and all_supervised_data:
+            all_supervised_data, removed = deduplicate(all_supervised_data)
+            removed_duplicates += removed
+        
         # Create combined export with all supervised data
         if all_supervised_data:
             combined_supervised_path = os.path.join(base_export_dir, f"all_supervised_{timestamp}.jsonl")
@@ -699,6 +713,10 @@ class RLHFAnnotator:
                 }
                 all_dpo_data.append(dpo_item)
         
+        if DEDUP_AVAILABLE and all_dpo_data:
+            all_dpo_data, removed = deduplicate(all_dpo_data)
+            removed_duplicates += removed
+        
         if all_dpo_data:
             combined_dpo_path = os.path.join(base_export_dir, f"all_dpo_{timestamp}.jsonl")
             with open(combined_dpo_path, 'w', encoding='utf-8') as f:
@@ -717,7 +735,8 @@ class RLHFAnnotator:
             f"Successfully exported annotations to separate folders in:\n{base_export_dir}\n\n"
             f"Total supervised conversations: {len(all_supervised_data)}\n"
             f"Total DPO examples: {len(all_dpo_data)}\n"
-            f"Total feedback entries: {len(all_feedback)}"
+            f"Total feedback entries: {len(all_feedback)}\n"
+            f"Duplicates removed: {removed_duplicates if DEDUP_AVAILABLE else 'n/a (numpy not installed)'}"
         )
         
         # Reset unsaved changes flag since we've exported
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -17,16 +18,61 @@ import time
 from conversation import Conversation
 from audio_input import transcribe_audio
 from audio_output import text_to_speech_api
+from turn_cache import TurnResultCache
+from deadline import Deadline, DeadlineExceeded
+from model_router import latency_tracker
+from circuit_breaker import breaker_states, database_breaker, tts_breaker, transcription_breaker
+from persistence_queue import PersistenceQueue
+from session_updates import SessionUpdateCoalescer
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, check_page_arguments,
+    DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+)
 
 # Import database service
+# Nothing connects here: the service is created on first use and reconnected in the
+# background, so the API starts even while the database is unreachable
 try:
-    from database_service import db_service
-    DATABASE_AVAILABLE = True
-    print("✅ Database service loaded successfully")
+    from database_service import db_service, session_cache, database_configured
+    from async_database_service import create_async_database_service
+    # Async handlers await this one so database round trips never block the event loop
+    async_db_service = create_async_database_service(sync_service=db_service)
+    DATABASE_CONFIGURED = database_configured()
+    # Health probes and reads feed the database circuit; writes stay spooled while it is open
+    db_service.breaker = database_breaker
+    if DATABASE_CONFIGURED:
+        print("✅ Database service configured (connects on first use)")
+    else:
+        print("⚠️ Database settings missing - running in memory only")
 except Exception as e:
-    DATABASE_AVAILABLE = False
+    DATABASE_CONFIGURED = False
     print(f"⚠️ Database service not available: {e}")
 
+DATABASE_PROBE_INTERVAL_SECONDS = 30  # Health probe / reconnect interval
+
+def database_available() -> bool:
+    """True if database reads can be attempted right now (connected, probe passed, circuit not open)."""
+    return DATABASE_CONFIGURED and db_service.is_available()
+
+# Database writes are spooled locally and applied in the background (write-behind),
+# so they are accepted even while the database is down and replayed once it is back
+PERSISTENCE_SPOOL_PATH = os.environ.get("PERSISTENCE_SPOOL_PATH", "persistence_spool.db")
+PERSISTENCE_FLUSH_TIMEOUT_SECONDS = 10  # How long shutdown waits for spooled writes
+persistence_queue = None
+if DATABASE_CONFIGURED:
+    persistence_queue = PersistenceQueue(db_service, spool_path=PERSISTENCE_SPOOL_PATH)
+    persistence_queue.start()
+
+# Per-turn session counters are merged in memory and written at most every few seconds
+SESSION_UPDATE_FLUSH_SECONDS = 10
+session_updates = None
+if DATABASE_CONFIGURED:
+    session_updates = SessionUpdateCoalescer(
+        lambda session_id, updates: persistence_queue.enqueue(session_id, "update_session", updates=updates),
+        flush_interval_seconds=SESSION_UPDATE_FLUSH_SECONDS
+    )
+    session_updates.start()
+
 # Conditional import for audio processing (for deployment compatibility)
 try:
     AUDIO_INPUT_AVAILABLE = True
@@ -65,6 +111,21 @@ app.mount("/audio", StaticFiles(directory="temp_audio"), name="audio")
 sessions: Dict[str, Dict[str, Any]] = {}
 session_conversations: Dict[str, Conversation] = {}
 
+# Turns and the end of a session run one at a time: their blocking stages run in the
+# thread pool and share the session's conversation memory, closing draft and session dict
+session_locks: Dict[str, asyncio.Lock] = {}
+
+# Completed turn responses per session, keyed by the client's Idempotency-Key header
+IDEMPOTENCY_CACHE_SIZE = 32  # Completed turns remembered per session
+IDEMPOTENCY_CACHE_SESSIONS = 1000  # Sessions whose turns are remembered (least recently used dropped first)
+turn_result_cache = TurnResultCache(max_entries_per_session=IDEMPOTENCY_CACHE_SIZE,
+                                    max_sessions=IDEMPOTENCY_CACHE_SESSIONS)
+
+# Per-request time budgets shared by transcription, LLM, summarization, wrap-up and TTS
+TURN_DEADLINE_SECONDS = 90
+END_SESSION_DEADLINE_SECONDS = 60
+DISCONNECT_POLL_SECONDS = 0.5
+
 # Data Models matching integration documentation schemas
 class ApiResponse(BaseModel):
     success: bool
@@ -97,7 +158,7 @@ class MessageResponse(ApiResponse):
     data: Optional[Dict[str, Any]] = None  # Changed to allow sessionEnded and finalSummary fields
 
 class ConversationHistoryResponse(ApiResponse):
-    data: Optional[Dict[str, List[Message]]] = None
+    data: Optional[Dict[str, Any]] = None  # messages, plus pagination when a page was requested
 
 class SummaryData(BaseModel):
     sessionId: str
@@ -115,6 +176,9 @@ class RatingData(BaseModel):
 class RatingResponse(ApiResponse):
     data: Optional[Dict[str, Any]] = None
 
+class SearchResponse(ApiResponse):
+    data: Optional[Dict[str, Any]] = None
+
 # Helper functions
 def generate_session_id() -> str:
     """Generate a unique session ID."""
@@ -141,6 +205,10 @@ def create_session_data(session_id: str) -> SessionData:
         awaitingWrapUpConfirmation=False
     )
 
+def session_lock(session_id: str) -> asyncio.Lock:
+    """Get the lock serializing the turns of a session (a fresh one for unknown sessions)."""
+    return session_locks.get(session_id) or asyncio.Lock()
+
 def update_session_timestamp(session_id: str):
     """Update session's last activity timestamp."""
     if session_id in sessions:
@@ -156,15 +224,55 @@ def generate_tts_if_available(text: str, audio_path: str) -> bool:
         print(f"TTS generation failed: {e}")
         return False
 
-def save_message_to_database(session_id: str, message_id: str, sender: str, text_content: str):
-    """Save a message to the database if available."""
-    if DATABASE_AVAILABLE:
+async def synthesize_speech(text: str, audio_path: str, deadline: Deadline) -> bool:
+    """Generate TTS audio within the deadline; skipped (text-only turn) while the TTS circuit is open."""
+    if deadline.expired():
+        print("⏱️ No time left for TTS - sending a text-only response")
+        return False
+    if not tts_breaker.allow_request():
+        print("⚡ TTS circuit open - sending a text-only response")
+        return False
+    if await run_in_threadpool(text_to_speech_api, text, audio_path, deadline=deadline):
+        tts_breaker.record_success()
+        return True
+    if deadline.cancelled:
+        # Abandoned by the client: says nothing about the health of the TTS service
+        tts_breaker.release()
+    else:
+        # Includes running out of budget: a hanging TTS endpoint only fails that way
+        tts_breaker.record_failure("text_to_speech_api returned False")
+    return False
+
+async def cancel_on_disconnect(request: Request, deadline: Deadline, still_awaited=lambda: False):
+    """
+    Cancel the request's deadline as soon as the HTTP client disconnects.
+    
+    still_awaited tells whether other requests wait for the result of this one
+    (duplicates with the same Idempotency-Key); the work is kept going until
+    they are gone or the deadline ends.
+    """
+    disconnected = False
+    while not deadline.expired():
+        if not disconnected and await request.is_disconnected():
+            disconnected = True
+        if disconnected and not still_awaited():
+            print("Client disconnected - cancelling remaining work for this request")
+            deadline.cancel("client disconnected")
+            return
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+def save_turn_to_database(session_id: str, user_message: Message, ai_message: Message):
+    """Queue the user and AI messages of a turn for the database if available."""
+    if DATABASE_CONFIGURED:
         try:
-            db_service.save_message(session_id, message_id, sender, text_content)
-            print(f"✅ Message {message_id} saved to database")
+            persistence_queue.enqueue(session_id, "save_messages", messages=[
+                {"message_id": user_message.id, "sender": "user", "text_content": user_message.text},
+                {"message_id": ai_message.id, "sender": "ai", "text_content": ai_message.text}
+            ])
+            print(f"✅ Messages {user_message.id} and {ai_message.id} queued for database")
         except Exception as e:
-            print(f"⚠️ Failed to save message to database: {e}")
-            # Continue without database - message still processed in memory
+            print(f"⚠️ Failed to queue messages for database: {e}")
+            # Continue without database - messages still processed in memory
 
 def update_message_count(session_id: str, increment: int):
     """Update message count in memory and database."""
@@ -172,30 +280,16 @@ def update_message_count(session_id: str, increment: int):
         new_count = sessions[session_id]["messageCount"] + increment
         sessions[session_id]["messageCount"] = new_count
         update_session_timestamp(session_id)
-        if DATABASE_AVAILABLE:
-            try:
-                db_service.update_session(
-                    session_id, 
-                    {"message_count": new_count}
-                )
-                print(f"✅ Updated message_count to {new_count} in database for session {session_id}")
-            except Exception as e:
-                print(f"⚠️ Failed to update message_count in database for session {session_id}: {e}")
+        if DATABASE_CONFIGURED:
+            session_updates.update(session_id, message_count=new_count)
 
 def set_message_count(session_id: str, count: int):
     """Set message count in memory and database."""
     if session_id in sessions:
         sessions[session_id]["messageCount"] = count
         update_session_timestamp(session_id)
-        if DATABASE_AVAILABLE:
-            try:
-                db_service.update_session(
-                    session_id, 
-                    {"message_count": count}
-                )
-                print(f"✅ Set message_count to {count} in database for session {session_id}")
-            except Exception as e:
-                print(f"⚠️ Failed to set message_count in database for session {session_id}: {e}")
+        if DATABASE_CONFIGURED:
+            session_updates.update(session_id, message_count=count)
 
 # API Endpoints
 
@@ -211,14 +305,15 @@ async def create_session():
         
         # Create conversation instance
         session_conversations[session_id] = Conversation()
+        session_locks[session_id] = asyncio.Lock()
         
         # Store in database if available
-        if DATABASE_AVAILABLE:
+        if DATABASE_CONFIGURED:
             try:
-                db_session = db_service.create_session(session_id, user_id=None)  # user_id None for now (Phase 2)
-                print(f"✅ Session {session_id} created in database")
+                persistence_queue.enqueue(session_id, "create_session", user_id=None)  # user_id None for now (Phase 2)
+                print(f"✅ Session {session_id} queued for database")
             except Exception as e:
-                print(f"⚠️ Failed to create session in database: {e}")
+                print(f"⚠️ Failed to queue session for database: {e}")
                 # Continue without database - in-memory session still works
         
         return SessionResponse(
@@ -255,8 +350,13 @@ async def get_session(session_id: str):
         )
 
 @app.post("/api/sessions/{session_id}/end", response_model=SummaryResponse)
-async def end_session(session_id: str):
+async def end_session(session_id: str, request: Request):
     """End session and generate summary."""
+    deadline = Deadline(END_SESSION_DEADLINE_SECONDS)
+    disconnect_watcher = asyncio.create_task(cancel_on_disconnect(request, deadline))
+    # Wait for a turn of this session that is still running
+    lock = session_lock(session_id)
+    await lock.acquire()
     try:
         if session_id not in sessions:
             return SummaryResponse(
@@ -273,7 +373,9 @@ async def end_session(session_id: str):
             )
         
         # Generate summary using existing conversation logic (even if already ended)
-        summary = conversation.generate_closing_summary()
+        # The background draft is reused where possible so ending the session returns quickly
+        print(f"Closing summary draft staleness for {session_id}: {conversation.get_closing_draft_staleness()} rounds")
+        summary = await run_in_threadpool(conversation.finalize_closing_summary, deadline)
         
         # Calculate session duration (in seconds)
         created_at = datetime.fromisoformat(sessions[session_id]["createdAt"].replace("Z", "+00:00"))
@@ -285,28 +387,32 @@ async def end_session(session_id: str):
             update_session_timestamp(session_id)
         
         # Save to database if available
-        if DATABASE_AVAILABLE:
+        if DATABASE_CONFIGURED:
             try:
                 print(f"🔍 DEBUG: About to end session {session_id}")
                 print(f"  In-memory session data: {sessions[session_id]}")
                 print(f"  messageCount: {sessions[session_id]['messageCount']}")
                 
-                db_service.end_session(
-                    session_id=session_id, 
+                # Write coalesced counters before the session is closed
+                session_updates.flush(session_id)
+                persistence_queue.enqueue(
+                    session_id,
+                    "end_session",
                     summary=summary, 
                     duration=duration,
                     rating=None,  # Will be set by frontend later
                     feedback=None,  # Will be set by frontend later
                     message_count=sessions[session_id]["messageCount"]
                 )
-                print(f"✅ Session {session_id} ended and saved to database")
+                print(f"✅ Session {session_id} ended and queued for database")
             except Exception as e:
                 print(f"⚠️ Failed to save session summary to database: {e}")
                 # Continue without database - session still ends successfully
         
-        # Clean up conversation instance
+        # Clean up conversation instance and the session's stored turn responses
         if session_id in session_conversations:
             del session_conversations[session_id]
+        turn_result_cache.forget(session_id)
         
         return SummaryResponse(
             success=True,
@@ -323,10 +429,54 @@ async def end_session(session_id: str):
             success=False,
             error=f"Failed to end session: {str(e)}"
         )
+    finally:
+        lock.release()
+        disconnect_watcher.cancel()
 
 @app.post("/api/sessions/{session_id}/messages", response_model=MessageResponse)
-async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
-    """Send audio message and get AI response."""
+async def send_audio_message(session_id: str, request: Request, audio: UploadFile = File(...),
+                             idempotency_key: Optional[str] = Header(None)):
+    """
+    Send audio message and get AI response.
+    
+    Requests that repeat an Idempotency-Key header get the stored response of the
+    completed turn, and a duplicate sent while the turn is still running waits for
+    its result, so retries never add a second user/AI pair to the session.
+    
+    The whole turn shares one deadline of TURN_DEADLINE_SECONDS, which is cancelled
+    when the client disconnects so nobody pays for a turn that will not be heard,
+    unless a duplicate request is still waiting for it. A turn that runs out of
+    time or is cancelled fails and is not stored, so it can be retried. Turns of
+    one session run one at a time, in the order they arrive.
+    """
+    deadline = Deadline(TURN_DEADLINE_SECONDS)
+    still_awaited = lambda: bool(idempotency_key) and turn_result_cache.waiting(session_id, idempotency_key) > 0
+    disconnect_watcher = asyncio.create_task(cancel_on_disconnect(request, deadline, still_awaited))
+    
+    async def run_turn() -> MessageResponse:
+        async with session_lock(session_id):
+            return await process_audio_message(session_id, audio, deadline)
+    
+    try:
+        if not idempotency_key:
+            return await run_turn()
+        
+        return await turn_result_cache.run(
+            session_id,
+            idempotency_key,
+            run_turn,
+            should_store=lambda response: response.success  # Failed turns can be retried
+        )
+    finally:
+        disconnect_watcher.cancel()
+
+async def process_audio_message(session_id: str, audio: UploadFile, deadline: Deadline) -> MessageResponse:
+    """
+    Transcribe an audio message, run the conversation turn and build the response.
+    
+    Blocking stages run in the thread pool so the event loop can notice client
+    disconnects, and every stage draws its timeout from the request deadline.
+    """
     try:
         if session_id not in sessions:
             return MessageResponse(
@@ -363,8 +513,15 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
             temp_audio_path = temp_file.name
         
         try:
+            if not transcription_breaker.available():
+                # Fail fast instead of waiting for a transcription API that keeps failing
+                return MessageResponse(
+                    success=False,
+                    error="Voice input is temporarily unavailable. Please try again in a moment."
+                )
+            
             # Transcribe audio using existing logic
-            user_text = transcribe_audio(temp_audio_path)
+            user_text = await run_in_threadpool(transcribe_audio, temp_audio_path, deadline)
             
             if not user_text or not user_text.strip():
                 return MessageResponse(
@@ -396,8 +553,8 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                     conversation.add_user_message_to_memory(user_text)
                     
                     try:
-                        # Generate final summary using existing conversation logic
-                        final_message = conversation.generate_closing_summary()
+                        # Generate final summary, reusing the background draft where possible
+                        final_message = await run_in_threadpool(conversation.finalize_closing_summary, deadline)
                         conversation.add_ai_message_to_memory(final_message)
                         
                         # Update session status to ended
@@ -412,7 +569,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                             audio_path = os.path.join("temp_audio", audio_filename)
                             os.makedirs("temp_audio", exist_ok=True)
                             
-                            if text_to_speech_api(final_message, audio_path):
+                            if await synthesize_speech(final_message, audio_path, deadline):
                                 if os.path.exists(audio_path):
                                     audio_url = f"/audio/{audio_filename}"
                         except Exception as e:
@@ -435,14 +592,13 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                         )
                         
                         # Save messages to database
-                        save_message_to_database(session_id, user_message.id, "user", user_text)
-                        save_message_to_database(session_id, ai_message.id, "ai", final_message)
+                        save_turn_to_database(session_id, user_message, ai_message)
                         
                         # Update session message count
                         update_message_count(session_id, 2)
                         
                         # Save session summary to database if available (CRITICAL FIX)
-                        if DATABASE_AVAILABLE:
+                        if DATABASE_CONFIGURED:
                             try:
                                 # Calculate session duration (same logic as manual ending)
                                 created_at = datetime.fromisoformat(sessions[session_id]["createdAt"].replace("Z", "+00:00"))
@@ -452,15 +608,17 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                                 print(f"  In-memory session data: {sessions[session_id]}")
                                 print(f"  messageCount: {sessions[session_id]['messageCount']}")
                                 
-                                db_service.end_session(
-                                    session_id=session_id, 
+                                session_updates.flush(session_id)
+                                persistence_queue.enqueue(
+                                    session_id,
+                                    "end_session",
                                     summary=final_message, 
                                     duration=duration,
                                     rating=None,  # Will be set by frontend later
                                     feedback=None,  # Will be set by frontend later
                                     message_count=sessions[session_id]["messageCount"]
                                 )
-                                print(f"✅ Session {session_id} automatically ended and saved to database")
+                                print(f"✅ Session {session_id} automatically ended and queued for database")
                             except Exception as e:
                                 print(f"⚠️ Failed to save automatic session ending to database: {e}")
                                 # Continue without database - session still ends successfully
@@ -520,7 +678,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                         audio_path = os.path.join("temp_audio", audio_filename)
                         os.makedirs("temp_audio", exist_ok=True)
                         
-                        if text_to_speech_api(ai_response, audio_path):
+                        if await synthesize_speech(ai_response, audio_path, deadline):
                             if os.path.exists(audio_path):
                                 audio_url = f"/audio/{audio_filename}"
                     except Exception as e:
@@ -564,6 +722,9 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                 conversation.add_user_message_to_memory(user_text)
                 conversation.add_ai_message_to_memory(wrap_prompt)
                 
+                # Start drafting the final summary while the user confirms
+                conversation.maybe_refresh_closing_draft(force=True)
+                
                 # Create message objects
                 user_message = Message(
                     id=generate_message_id(),
@@ -580,8 +741,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                 )
                 
                 # Save messages to database
-                save_message_to_database(session_id, user_message.id, "user", user_text)
-                save_message_to_database(session_id, ai_message.id, "ai", wrap_prompt)
+                save_turn_to_database(session_id, user_message, ai_message)
                 
                 # Generate TTS for the wrap-up prompt
                 audio_url = None
@@ -590,7 +750,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                     audio_path = os.path.join("temp_audio", audio_filename)
                     os.makedirs("temp_audio", exist_ok=True)
                     
-                    if text_to_speech_api(wrap_prompt, audio_path):
+                    if await synthesize_speech(wrap_prompt, audio_path, deadline):
                         if os.path.exists(audio_path):
                             audio_url = f"/audio/{audio_filename}"
                 except Exception as e:
@@ -615,7 +775,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
 
             # Normal conversation processing (not wrap-up related)
             # Process user input with existing conversation logic
-            ai_response = conversation.process_input(user_text)
+            ai_response = await run_in_threadpool(conversation.process_input, user_text, deadline=deadline)
             
             # COMPREHENSIVE WRAP-UP LOGIC (copied from main.py lines 411-543)
             # Calculate elapsed time and turn counter
@@ -626,6 +786,11 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
             
             wrap_up_requested = False
             
+            # Ask the wrap-up model once per turn, and only when its answer is used
+            content_wrap_up = False
+            if sessions[session_id]["wrapUpCooldown"] <= 0 and not sessions[session_id]["ignoreContentWrapUp"]:
+                content_wrap_up = await run_in_threadpool(conversation.should_wrap_up, deadline)
+            
             # Check if we're in the cooldown period
             if sessions[session_id]["wrapUpCooldown"] > 0:
                 # Decrement cooldown
@@ -634,12 +799,12 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                 
             # Only check wrap-up conditions if not in cooldown
             elif (turn_counter >= max_turns or 
-                  (not sessions[session_id]["ignoreContentWrapUp"] and conversation.should_wrap_up()) or 
+                  content_wrap_up or 
                   elapsed_time >= (30*60 + sessions[session_id]["timeExtensionMinutes"]*60)):  # 30 min + any extension
                 
                 # Choose the appropriate wrap-up prompt based on what triggered it
                 wrap_prompt = ""
-                if not sessions[session_id]["ignoreContentWrapUp"] and conversation.should_wrap_up():
+                if content_wrap_up:
                     # Content-based wrap-up (detected Way Forward content)
                     wrap_prompt = "It looks like we've made good progress on your issue. Shall we wrap up today's session with a quick summary and an action plan? If yes, please say wrap up and summarize."
                 elif turn_counter >= max_turns or elapsed_time >= (30*60 + sessions[session_id]["timeExtensionMinutes"]*60):
@@ -653,6 +818,9 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                 sessions[session_id]["awaitingWrapUpConfirmation"] = True
                 update_session_timestamp(session_id)
                 
+                # Start drafting the final summary while the user confirms
+                conversation.maybe_refresh_closing_draft(force=True)
+                
                 # Generate TTS for wrap-up prompt
                 audio_url = None
                 try:
@@ -660,7 +828,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                     audio_path = os.path.join("temp_audio", audio_filename)
                     os.makedirs("temp_audio", exist_ok=True)
                     
-                    if text_to_speech_api(wrap_prompt, audio_path):
+                    if await synthesize_speech(wrap_prompt, audio_path, deadline):
                         if os.path.exists(audio_path):
                             audio_url = f"/audio/{audio_filename}"
                 except Exception as e:
@@ -687,8 +855,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                 update_session_timestamp(session_id)
                 
                 # Save messages to database
-                save_message_to_database(session_id, user_message.id, "user", user_text)
-                save_message_to_database(session_id, ai_message.id, "ai", wrap_prompt)
+                save_turn_to_database(session_id, user_message, ai_message)
                 
                 # Prepare response data with awaiting confirmation flag
                 response_data = {
@@ -701,6 +868,9 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                     data=response_data
                 )
             
+            # Keep the closing summary draft fresh once the session nears its end
+            conversation.maybe_refresh_closing_draft()
+            
             # Generate TTS for AI response
             audio_url = None
             try:
@@ -712,7 +882,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
                 print(f"Attempting TTS generation for: {ai_response[:50]}...")
                 print(f"Audio file path: {audio_path}")
                 
-                if text_to_speech_api(ai_response, audio_path):
+                if await synthesize_speech(ai_response, audio_path, deadline):
                     print(f"TTS successful, checking if file exists: {os.path.exists(audio_path)}")
                     if os.path.exists(audio_path):
                         audio_url = f"/audio/{audio_filename}"
@@ -747,8 +917,7 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
             update_message_count(session_id, 2)  # User + AI message
             
             # Save messages to database
-            save_message_to_database(session_id, user_message.id, "user", user_text)
-            save_message_to_database(session_id, ai_message.id, "ai", ai_response)
+            save_turn_to_database(session_id, user_message, ai_message)
             
             # Prepare response data
             response_data = {"messages": [user_message, ai_message]}
@@ -765,15 +934,60 @@ async def send_audio_message(session_id: str, audio: UploadFile = File(...)):
             except:
                 pass
     
+    except DeadlineExceeded as e:
+        # Not a reply: nothing was saved, so the client can send the turn again
+        print(f"Turn for {session_id} abandoned: {e}")
+        return MessageResponse(
+            success=False,
+            error="The response took too long. Please try again."
+        )
     except Exception as e:
         return MessageResponse(
             success=False,
             error=f"Failed to process audio: {str(e)}"
         )
 
+def paginate_memory_messages(messages: List[Message], limit: int, after: Optional[str],
+                             before: Optional[str]) -> Dict[str, Any]:
+    """Page the in-memory history by position, with cursors shaped like the database ones."""
+    positions = {message.id: i for i, message in enumerate(messages)}
+    start, end = 0, len(messages)
+    if after:
+        start = positions.get(decode_cursor(after, allow_message_ids=True)[1], -1) + 1
+        end = min(start + limit, len(messages))
+        has_more = end < len(messages)
+    elif before:
+        end = positions.get(decode_cursor(before, allow_message_ids=True)[1], 0)
+        start = max(end - limit, 0)
+        has_more = start > 0
+    else:
+        end = min(limit, len(messages))
+        has_more = end < len(messages)
+    page = messages[start:end]
+    return {
+        "messages": page,
+        "pagination": {
+            "hasMore": has_more,
+            "nextCursor": encode_cursor(page[-1].timestamp, page[-1].id) if page else after,
+            "prevCursor": encode_cursor(page[0].timestamp, page[0].id) if page else before
+        }
+    }
+
 @app.get("/api/sessions/{session_id}/messages", response_model=ConversationHistoryResponse)
-async def get_conversation_history(session_id: str):
-    """Get conversation history for a session."""
+async def get_conversation_history(
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    since: Optional[str] = None
+):
+    """
+    Get conversation history for a session.
+    
+    Without query parameters the whole history is returned. With limit, after,
+    before or since one page is returned (keyset pagination on created_at/id)
+    together with cursors for the next and previous pages.
+    """
     try:
         if session_id not in sessions:
             return ConversationHistoryResponse(
@@ -781,10 +995,35 @@ async def get_conversation_history(session_id: str):
                 error="Session not found"
             )
         
+        paginated = any(value is not None for value in (limit, after, before, since))
+        page_size = limit or DEFAULT_PAGE_SIZE
+        if paginated:
+            try:
+                check_page_arguments(page_size, after, before, since)
+                for cursor in (after, before):
+                    if cursor:
+                        # The page may come from the database or the in-memory history
+                        decode_cursor(cursor, allow_message_ids=True)
+            except ValueError as e:
+                return ConversationHistoryResponse(success=False, error=str(e))
+        
         # Try to get conversation history from database first
-        if DATABASE_AVAILABLE:
+        # (unless some of its writes are still queued, then memory is more recent)
+        if database_available() and not persistence_queue.has_pending(session_id):
             try:
-                db_messages = db_service.get_conversation_history(session_id)
+                with database_breaker.guard():
+                    if paginated:
+                        page = await async_db_service.get_messages_page(
+                            session_id, limit=page_size, after=after, before=before, since=since
+                        )
+                        db_messages = page["messages"]
+                    else:
+                        # The session row and its messages are read concurrently
+                        history = await async_db_service.get_session_with_history(session_id)
+                        db_messages = history["messages"]
+                if not paginated and history["session"] is None:
+                    # e.g. its create was dead-lettered: the in-memory history is the only one
+                    raise LookupError(f"Session {session_id} is not in the database")
                 
                 # Convert database messages to API format
                 messages = []
@@ -797,9 +1036,16 @@ async def get_conversation_history(session_id: str):
                     )
                     messages.append(message)
                 
+                data = {"messages": messages}
+                if paginated:
+                    data["pagination"] = {
+                        "hasMore": page["has_more"],
+                        "nextCursor": page["next_cursor"],
+                        "prevCursor": page["prev_cursor"]
+                    }
                 return ConversationHistoryResponse(
                     success=True,
-                    data={"messages": messages}
+                    data=data
                 )
                 
             except Exception as e:
@@ -833,6 +1079,14 @@ async def get_conversation_history(session_id: str):
             )
             messages.append(message)
         
+        if paginated:
+            # In-memory messages have no real timestamps, so since cannot be applied
+            # and pages are cut by position
+            return ConversationHistoryResponse(
+                success=True,
+                data=paginate_memory_messages(messages, page_size, after, before)
+            )
+        
         return ConversationHistoryResponse(
             success=True,
             data={"messages": messages}
@@ -844,6 +1098,57 @@ async def get_conversation_history(session_id: str):
             error=f"Failed to get conversation history: {str(e)}"
         )
 
+@app.get("/api/search", response_model=SearchResponse)
+async def search_messages(
+    q: str,
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0)
+):
+    """Full-text search over stored messages, best match first, with highlighted snippets."""
+    if not database_available():
+        return SearchResponse(success=False, error="Search requires the database")
+    
+    try:
+        with database_breaker.guard(ignore=(ValueError,)):
+            page = await async_db_service.search_messages(
+                q,
+                session_id=session_id,
+                user_id=user_id,
+                created_after=created_after,
+                created_before=created_before,
+                limit=limit,
+                offset=offset
+            )
+    except ValueError as e:
+        return SearchResponse(success=False, error=str(e))
+    except Exception as e:
+        print(f"⚠️ Search failed: {e}")
+        return SearchResponse(success=False, error=f"Search failed: {str(e)}")
+    
+    return SearchResponse(
+        success=True,
+        data={
+            "results": [
+                {
+                    "sessionId": row["session_id"],
+                    "messageId": row["message_id"],
+                    "sender": row["sender"],
+                    "text": row["text_content"],
+                    "timestamp": row["created_at"],
+                    "rank": row["rank"],
+                    "snippet": row["snippet"]
+                }
+                for row in page["results"]
+            ],
+            "hasMore": page["has_more"],
+            "nextOffset": page["next_offset"]
+        }
+    )
+
 @app.post("/api/sessions/{session_id}/rating", response_model=RatingResponse)
 async def submit_session_rating(session_id: str, rating_data: RatingData):
     """Submit rating and feedback for a completed session."""
@@ -869,16 +1174,17 @@ async def submit_session_rating(session_id: str, rating_data: RatingData):
             )
         
         # Update session with rating in database
-        if DATABASE_AVAILABLE:
+        if DATABASE_CONFIGURED:
             try:
-                db_service.update_session(
+                persistence_queue.enqueue(
                     session_id, 
-                    {
+                    "update_session",
+                    updates={
                         "rating": rating_data.rating,
                         "feedback": rating_data.feedback
                     }
                 )
-                print(f"✅ Rating {rating_data.rating} saved for session {session_id}")
+                print(f"✅ Rating {rating_data.rating} queued for session {session_id}")
             except Exception as e:
                 print(f"⚠️ Failed to save rating to database: {e}")
                 return RatingResponse(
@@ -917,10 +1223,11 @@ async def get_session_rating(session_id: str):
                 error="Session not found"
             )
         
-        # Try to get from database first
-        if DATABASE_AVAILABLE:
+        # Try to get from database first (unless a rating write is still queued)
+        if database_available() and not persistence_queue.has_pending(session_id):
             try:
-                db_session = db_service.get_session(session_id)
+                with database_breaker.guard():
+                    db_session = await async_db_service.get_session(session_id)
                 if db_session and (db_session.get("rating") or db_session.get("feedback")):
                     return RatingResponse(
                         success=True,
@@ -956,7 +1263,32 @@ async def get_session_rating(session_id: str):
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "timestamp": get_current_timestamp()}
+    return {
+        "status": "healthy",
+        "timestamp": get_current_timestamp(),
+        "model_latency": latency_tracker.snapshot(),
+        "persistence": persistence_queue.stats() if persistence_queue else None,
+        "session_updates": session_updates.stats() if session_updates else None,
+        "session_cache": session_cache.stats() if DATABASE_CONFIGURED else None,
+        "database": db_service.status() if DATABASE_CONFIGURED else None,
+        "circuits": breaker_states()
+    }
+
+@app.on_event("startup")
+async def start_database_monitor():
+    """Connect to the database in the background and keep probing it."""
+    if DATABASE_CONFIGURED:
+        db_service.start_monitor(DATABASE_PROBE_INTERVAL_SECONDS)
+
+@app.on_event("shutdown")
+async def flush_persistence_queue():
+    """Give queued database writes a chance to reach the database before exiting."""
+    if session_updates:
+        session_updates.stop()
+    if persistence_queue:
+        flushed = await run_in_threadpool(persistence_queue.stop, PERSISTENCE_FLUSH_TIMEOUT_SECONDS)
+        if not flushed:
+            print("⚠️ Some database writes are still spooled and will be replayed on next start")
 
 # Root endpoint
 @app.get("/")
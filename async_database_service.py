@@ -0,0 +1,60 @@
+import asyncio
+from typing import List, Dict, Any
+
+
+class AsyncDatabaseService:
+    """
+    Async interface over the synchronous database service, for async FastAPI handlers.
+
+    Every method of the wrapped service runs in a worker thread via asyncio.to_thread,
+    so awaiting a query never blocks the event loop. The queries themselves stay in
+    DatabaseService / SQLiteDatabaseService; this class only adds fan-out helpers that
+    run independent queries concurrently with asyncio.gather.
+    """
+
+    def __init__(self, service):
+        """
+        Args:
+            service: Synchronous database service to wrap (normally the shared db_service)
+        """
+        self.service = service
+
+    def __getattr__(self, name):
+        attribute = getattr(self.service, name)
+        if not callable(attribute):
+            return attribute
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attribute, *args, **kwargs)
+        return call
+
+    async def get_session_with_history(self, session_id: str) -> Dict[str, Any]:
+        """Fetch a session and its messages concurrently"""
+        session, messages = await asyncio.gather(
+            asyncio.to_thread(self.service.get_session, session_id),
+            asyncio.to_thread(self.service.get_conversation_history, session_id)
+        )
+        return {"session": session, "messages": messages if session else []}
+
+    async def get_histories(self, session_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch the messages of several sessions concurrently"""
+        histories = await asyncio.gather(*(
+            asyncio.to_thread(self.service.get_conversation_history, session_id) for session_id in session_ids
+        ))
+        return dict(zip(session_ids, histories))
+
+
+def create_async_database_service(sync_service=None) -> AsyncDatabaseService:
+    """
+    Create the async database service.
+
+    Args:
+        sync_service: Synchronous service to wrap; defaults to the shared db_service,
+            so both share the lazy connection and the session cache
+
+    Returns:
+        An AsyncDatabaseService over sync_service
+    """
+    if sync_service is None:
+        from database_service import db_service as sync_service
+    return AsyncDatabaseService(sync_service)
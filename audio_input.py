@@ -6,6 +6,7 @@ import platform  # For detecting the operating system
 import time  # For delays and timing
 from openai import OpenAI  # OpenAI API client
 from config import OPENAI_API_KEY, SAMPLE_RATE, CHANNELS, CHUNK_SIZE, RECORD_SECONDS
+from circuit_breaker import transcription_breaker  # Skips the API while it is failing
 
 # Conditional import for desktop audio recording
 try:
@@ -169,7 +170,7 @@ def record_audio(duration=RECORD_SECONDS, min_duration=0.5):
         # Wait for the thread to finish
         keypress_thread.join(timeout=0.5)
 
-def transcribe_audio(audio_file_path):
+def transcribe_audio(audio_file_path, deadline=None):
     """
     Transcribes audio to text using OpenAI's GPT-4o-mini-transcribe API with fallback.
     
@@ -182,6 +183,8 @@ def transcribe_audio(audio_file_path):
     
     Args:
         audio_file_path (str): Path to the audio file to transcribe
+        deadline (Deadline): Optional request deadline; the API call gets the
+            remaining budget (at most 30 seconds) and is abandoned when it ends
         
     Returns:
         str: The transcribed text, or None if transcription failed
@@ -215,12 +218,22 @@ def transcribe_audio(audio_file_path):
         with open(audio_file_path, "rb") as audio_file:
             try:
                 # Step 2: Send the file to OpenAI's Whisper API for transcription
-                # with a timeout to prevent hanging
-                transcription = client.audio.transcriptions.create(
-                    model="whisper-1",  # Using the stable and reliable Whisper model
-                    file=audio_file,  # The audio file object
-                    timeout=30  # Add a timeout to prevent hanging indefinitely
-                )
+                # with a timeout to prevent hanging (fails fast while the circuit is open)
+                with transcription_breaker.guard(deadline):
+                    if deadline is not None:
+                        transcription = deadline.run(
+                            client.with_options(max_retries=0).audio.transcriptions.create,
+                            model="whisper-1",
+                            file=audio_file,
+                            timeout=deadline.timeout_for("transcription", 30),
+                            stage="transcription"
+                        )
+                    else:
+                        transcription = client.audio.transcriptions.create(
+                            model="whisper-1",  # Using the stable and reliable Whisper model
+                            file=audio_file,  # The audio file object
+                            timeout=30  # Add a timeout to prevent hanging indefinitely
+                        )
             except (TimeoutException, Exception) as e:
                 print(f"Whisper transcription failed: {e}")
                 # No fallback needed since whisper-1 is the most reliable model
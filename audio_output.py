@@ -66,7 +66,7 @@ def text_to_speech(text, voice=DEFAULT_VOICE):
     except Exception as e:
         print(f"Error in text-to-speech conversion: {e}")
 
-def text_to_speech_api(text, output_path, voice=DEFAULT_VOICE):
+def text_to_speech_api(text, output_path, voice=DEFAULT_VOICE, deadline=None):
     """
     Convert text to speech using OpenAI's TTS API and save to a specific file path.
     This version is designed for API use where we need to save files for serving.
@@ -75,6 +75,8 @@ def text_to_speech_api(text, output_path, voice=DEFAULT_VOICE):
         text (str): The text to convert to speech
         output_path (str): Path where to save the audio file
         voice (str): The voice to use (e.g., "alloy", "echo", "fable")
+        deadline (Deadline): Optional request deadline; TTS is skipped when no
+            budget is left and the API call is abandoned when the deadline ends
         
     Returns:
         bool: True if successful, False if failed
@@ -83,12 +85,24 @@ def text_to_speech_api(text, output_path, voice=DEFAULT_VOICE):
         return False
     
     try:
-        # Generate speech from text using OpenAI's TTS API
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice=voice,
-            input=text
-        )
+        if deadline is not None:
+            # Generate and save the speech within the remaining request budget
+            response = deadline.run(
+                client.with_options(max_retries=0).audio.speech.create,
+                model="tts-1",
+                voice=voice,
+                input=text,
+                timeout=deadline.timeout_for("tts"),
+                stage="tts"
+            )
+            deadline.check("tts")
+        else:
+            # Generate speech from text using OpenAI's TTS API
+            response = client.audio.speech.create(
+                model="tts-1",
+                voice=voice,
+                input=text
+            )
         
         # Save the audio to the specified file path
         response.stream_to_file(output_path)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark every export_conversations format at increasing corpus sizes
+Usage: python benchmarks/export_benchmark.py [--messages 10000 100000 1000000] [--formats full txt ...] [--workers 1]
+
+For each size, a synthetic corpus (data_export/synthetic_corpus.py) is built
+in a local SQLite database, or reused from --db-dir, and exported in every
+format. Each export runs in a fresh process so its peak RSS is its own; the
+report lists export time, throughput (messages and output MB per second),
+peak RSS and output size (all files written, shards and indexes included).
+
+TXT is measured as a tar bundle (--bundle tar) rather than one file per
+session. parquet and arrow are skipped when pyarrow is not installed.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Add parent and data_export directories to path for imports
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "data_export"))
+
+from columnar_export import PYARROW_AVAILABLE, COLUMNAR_FORMATS
+
+
+FORMATS = ["full", "turn-by-turn", "turn-by-turn-ref", "txt", "parquet", "arrow"]
+OUTPUT_EXTENSIONS = {"txt": ".txt", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+def run_export(db_path: str, format_type: str, output_file: str, workers: int) -> None:
+    """Export in this process and print its time and peak RSS as the last line of output (child mode)"""
+    import resource
+
+    import export_conversations
+    from sqlite_database_service import SQLiteDatabaseService
+
+    export_conversations.db_service = SQLiteDatabaseService(db_path)
+    start = time.perf_counter()
+    # Keep the export's per-session progress lines out of the report
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            export_conversations.export_conversations(
+                output_file, format_type=format_type, min_messages=2, workers=workers,
+                bundle="tar" if format_type == "txt" else None
+            )
+        finally:
+            sys.stdout = stdout
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    print(json.dumps({"seconds": seconds, "peak_rss": peak}))
+
+
+def measure(db_path: str, format_type: str, output_dir: str, workers: int) -> Dict[str, float]:
+    """Run one export in a child process; return seconds, peak RSS and output bytes"""
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, "export" + OUTPUT_EXTENSIONS.get(format_type, ".jsonl"))
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", db_path, format_type, output_file, str(workers)],
+        capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["bytes"] = sum(entry.stat().st_size for entry in os.scandir(output_dir) if entry.is_file())
+    return result
+
+
+def main():
+    """Main function with command line interface"""
+    if len(sys.argv) == 6 and sys.argv[1] == "--child":
+        db_path, format_type, output_file, workers = sys.argv[2:]
+        run_export(db_path, format_type, output_file, int(workers))
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark every export format at increasing corpus sizes")
+    parser.add_argument("--messages", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Corpus sizes in messages (default: 10000 100000 1000000)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS,
+                        help="Formats to export (default: all)")
+    parser.add_argument("--workers", type=int, default=1, help="Formatting processes for JSONL exports (default: 1)")
+    parser.add_argument("--db-dir", help="Directory for the corpus databases; existing ones are reused")
+    args = parser.parse_args()
+
+    from synthetic_corpus import open_corpus
+
+    work_dir = tempfile.mkdtemp(prefix="export_bench_")
+    db_dir = args.db_dir or work_dir
+    formats: List[str] = [f for f in args.formats if PYARROW_AVAILABLE or f not in COLUMNAR_FORMATS]
+    if formats != args.formats:
+        print("⚠️  pyarrow is not installed; skipping parquet and arrow")
+
+    rows = []
+    for message_count in args.messages:
+        db_path = os.path.join(db_dir, f"corpus-{message_count}.db")
+        open_corpus(db_path, message_count)
+        for format_type in formats:
+            print(f"⏳ {message_count:,} messages, {format_type}")
+            result = measure(db_path, format_type, os.path.join(work_dir, f"{message_count}-{format_type}"),
+                             args.workers)
+            rows.append((message_count, format_type, result))
+
+    print(f"\n{'messages':>10} {'format':<17} {'time':>9} {'msgs/s':>10} {'MB/s':>8} {'peak RSS':>10} {'output':>10}")
+    for message_count, format_type, result in rows:
+        seconds = max(result["seconds"], 1e-9)
+        print(f"{message_count:>10,} {format_type:<17} {result['seconds']:8.1f}s "
+              f"{message_count / seconds:10,.0f} {result['bytes'] / 1_048_576 / seconds:8.1f} "
+              f"{result['peak_rss'] / 1_048_576:8.0f}MB {result['bytes'] / 1_048_576:8.1f}MB")
+
+    print(f"\nOutputs in {work_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark the columnar (Parquet / Arrow) export against JSONL
+Usage: python benchmarks/export_format_benchmark.py [--messages 200000] [--repeats 3] [--db corpus.db]
+
+Builds a synthetic corpus in a local SQLite database (see data_export/synthetic_corpus.py),
+exports it as full-conversation JSONL, Parquet and Arrow, and compares:
+- export time and output size
+- scan time of a typical analytics query (message count and mean length per
+  sender): parsing every JSONL line versus reading two columns of the messages table
+
+Requires pyarrow.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+# Add parent and data_export directories to path for imports
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "data_export"))
+
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+import export_conversations
+from columnar_export import columnar_paths
+from synthetic_corpus import open_corpus
+
+
+def scan_jsonl(path: str) -> Dict[str, tuple]:
+    """Message count and mean length per sender, from the full-conversation JSONL"""
+    totals: Dict[str, list] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            example = json.loads(line)
+            texts = [(m["role"], m["text"]) for m in example["input"] if m["role"] != "system"]
+            texts.append(("assistant", example["output"]["choices"][0]["message"]["content"]))
+            for role, text in texts:
+                total = totals.setdefault(role, [0, 0])
+                total[0] += 1
+                total[1] += len(text)
+    return {role: (count, chars / count) for role, (count, chars) in totals.items()}
+
+
+def scan_table(table) -> Dict[str, tuple]:
+    """Message count and mean length per sender, from the sender and text_length columns"""
+    grouped = table.group_by("sender").aggregate([("text_length", "count"), ("text_length", "mean")])
+    return {
+        str(sender): (count, mean)
+        for sender, count, mean in zip(*(grouped.column(name).to_pylist()
+                                         for name in ("sender", "text_length_count", "text_length_mean")))
+    }
+
+
+def scan_parquet(path: str) -> Dict[str, tuple]:
+    return scan_table(pq.read_table(path, columns=["sender", "text_length"]))
+
+
+def scan_arrow(path: str) -> Dict[str, tuple]:
+    with pyarrow.memory_map(path) as source:
+        return scan_table(pyarrow.ipc.open_file(source).read_all().select(["sender", "text_length"]))
+
+
+def time_scan(scan: Callable[[str], Dict[str, tuple]], path: str, repeats: int) -> float:
+    """Median scan time in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scan(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """Main function with command line interface"""
+    parser = argparse.ArgumentParser(description="Benchmark the Parquet/Arrow export against JSONL")
+    parser.add_argument("--messages", type=int, default=200_000, help="Number of synthetic messages (default: 200,000)")
+    parser.add_argument("--repeats", type=int, default=3, help="Repeats of each scan (default: 3)")
+    parser.add_argument("--db", help="SQLite file to use; an existing corpus in it is reused")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="export_bench_")
+    db_path = args.db or os.path.join(work_dir, "corpus.db")
+    export_conversations.db_service = open_corpus(db_path, args.messages)
+
+    outputs = {
+        "jsonl": (os.path.join(work_dir, "export.jsonl"), "full", scan_jsonl),
+        "parquet": (os.path.join(work_dir, "export.parquet"), "parquet", scan_parquet),
+        "arrow": (os.path.join(work_dir, "export.arrow"), "arrow", scan_arrow),
+    }
+    print(f"\n{'format':<8} {'export':>10} {'size':>12} {'scan':>12}")
+    for name, (path, format_type, scan) in outputs.items():
+        start = time.perf_counter()
+        # Keep the export's per-session progress lines out of the report
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                export_conversations.export_conversations(path, format_type=format_type, min_messages=2)
+            finally:
+                sys.stdout = stdout
+        export_seconds = time.perf_counter() - start
+
+        if format_type == "full":
+            size, scanned = os.path.getsize(path), path
+        else:
+            sessions_path, messages_path = columnar_paths(path, format_type)
+            size, scanned = os.path.getsize(sessions_path) + os.path.getsize(messages_path), messages_path
+        scan_ms = time_scan(scan, scanned, args.repeats)
+        print(f"{name:<8} {export_seconds:9.1f}s {size / 1_048_576:10.1f}MB {scan_ms:9.1f} ms")
+
+    print(f"\nOutputs in {work_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark full-text message search against the old substring (ilike) scan
+Usage: python benchmarks/search_benchmark.py [--messages 1000000] [--queries 5] [--db corpus.db]
+
+Builds a synthetic corpus in a local SQLite database (data_export/synthetic_corpus.py;
+FTS5 index maintained by the schema's triggers) and compares:
+- like: text_content LIKE '%query%', the old search_messages_global path
+- fts:  SQLiteDatabaseService.search_messages (ranked FTS5 + snippets, one page)
+
+The Postgres tsvector/GIN path behaves like the fts column; run the same
+queries through the search_messages RPC to compare on Supabase.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+# Add parent and data_export directories to path for imports
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "data_export"))
+
+from synthetic_corpus import open_corpus
+
+
+SEARCH_QUERIES = [
+    "work stress", "deadline", "sleep routine", "\"morning routine\"", "confidence presentation",
+    "anxiety or fear", "team conflict", "exercise -running", "career promotion", "gratitude journal"
+]
+
+
+def time_queries(run, queries: List[str], repeats: int) -> List[float]:
+    """Run every query repeats times and return the latencies in milliseconds"""
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            run(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(round(0.95 * len(ordered))) - 1)]
+    print(f"{name:<6} p50 {statistics.median(ordered):9.2f} ms   p95 {p95:9.2f} ms   max {ordered[-1]:9.2f} ms")
+
+
+def main():
+    """Main function with command line interface"""
+    parser = argparse.ArgumentParser(description="Benchmark indexed full-text search against substring scans")
+    parser.add_argument("--messages", type=int, default=1_000_000, help="Number of synthetic messages (default: 1,000,000)")
+    parser.add_argument("--queries", type=int, default=5, help="Repeats of the query set (default: 5)")
+    parser.add_argument("--db", help="SQLite file to use; an existing corpus in it is reused")
+    parser.add_argument("--skip-like", action="store_true", help="Only time the full-text search")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="search_bench_"), "corpus.db")
+    db = open_corpus(db_path, args.messages)
+
+    print(f"\n{len(SEARCH_QUERIES)} queries x {args.queries} repeats")
+    if not args.skip_like:
+        # The old path: unranked, unbounded substring scan of every message
+        like_words = [query.replace('"', "").split()[0] for query in SEARCH_QUERIES]
+        report("like", time_queries(
+            lambda word: db._query("SELECT * FROM messages WHERE text_content LIKE ?", (f"%{word}%",)),
+            like_words, args.queries
+        ))
+    report("fts", time_queries(lambda query: db.search_messages(query, limit=20), SEARCH_QUERIES, args.queries))
+
+
+if __name__ == "__main__":
+    main()
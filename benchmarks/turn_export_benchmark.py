@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark the turn-by-turn export writers on long sessions
+Usage: python benchmarks/turn_export_benchmark.py [--sessions 500] [--rounds 30]
+
+Formats synthetic sessions of --rounds user/coach exchanges
+(data_export/synthetic_corpus.py, no database needed) with:
+- examples:   format_conversation_turn_by_turn + json.dumps per example (the old path)
+- lines:      encode_turn_lines, which encodes every message once and extends the prefix
+- prefix-ref: the compact turn-by-turn-ref variant (every message stored once)
+
+and reports formatting time, output size and peak memory per session.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+# Add parent and data_export directories to path for imports
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "data_export"))
+
+import export_conversations
+from prefix_reference import PrefixReferenceEncoder
+from synthetic_corpus import generate_sessions
+
+
+def build_sessions(count: int, rounds: int, seed: int = 42) -> List[Dict]:
+    """Synthetic sessions of rounds user/coach exchanges"""
+    return [{"session": session, "messages": messages}
+            for session, messages in generate_sessions(count * rounds * 2, turns=(rounds, rounds), seed=seed)]
+
+
+def examples_writer(session: Dict, messages: List[Dict]) -> List[str]:
+    return [json.dumps(example, ensure_ascii=False) + "\n"
+            for example in export_conversations.format_conversation_turn_by_turn(session, messages)]
+
+
+def prefix_reference_writer() -> Callable[[Dict, List[Dict]], List[str]]:
+    encoder = PrefixReferenceEncoder()
+
+    def write(session: Dict, messages: List[Dict]) -> List[str]:
+        prompt = export_conversations.get_system_prompt_with_round(session["message_count"])
+        return encoder.encode(session["session_id"], prompt, export_conversations.turn_pairs(messages))
+    return write
+
+
+def run(writer: Callable[[Dict, List[Dict]], List[str]], sessions: List[Dict]) -> Dict[str, float]:
+    """Format every session; return seconds and output bytes, then peak memory of one session"""
+    start = time.perf_counter()
+    size = 0
+    for item in sessions:
+        size += sum(len(line.encode("utf-8")) for line in writer(item["session"], list(item["messages"])))
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    writer(sessions[0]["session"], list(sessions[0]["messages"]))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": seconds, "bytes": size, "peak": peak}
+
+
+def main():
+    """Main function with command line interface"""
+    parser = argparse.ArgumentParser(description="Benchmark the turn-by-turn export writers")
+    parser.add_argument("--sessions", type=int, default=500, help="Number of synthetic sessions (default: 500)")
+    parser.add_argument("--rounds", type=int, default=30, help="Exchanges per session (default: 30)")
+    args = parser.parse_args()
+
+    sessions = build_sessions(args.sessions, args.rounds)
+    print(f"{args.sessions:,} sessions x {args.rounds} rounds\n")
+    print(f"{'writer':<11} {'time':>9} {'output':>11} {'peak/session':>14}")
+    for name, writer in (("examples", examples_writer),
+                         ("lines", export_conversations.encode_turn_lines),
+                         ("prefix-ref", prefix_reference_writer())):
+        result = run(writer, sessions)
+        print(f"{name:<11} {result['seconds']:8.2f}s {result['bytes'] / 1_048_576:9.1f}MB "
+              f"{result['peak'] / 1024:11.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_SECONDS
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker.
+
+    closed:    calls go through; failure_threshold consecutive failures open the circuit
+    open:      calls fail fast with CircuitOpenError and optional work is skipped,
+               until recovery_seconds have passed
+    half_open: a single probe call is let through; success closes the circuit,
+               failure opens it again for another recovery period
+
+    Calls abandoned because their request was cancelled (client disconnected),
+    or that started with no budget left, say nothing about the dependency and are
+    not counted either way. A call that had budget and timed out is a failure: a
+    hanging dependency only ever fails by running out the request deadline.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 recovery_seconds: float = CIRCUIT_RECOVERY_SECONDS):
+        """
+        Initialize the breaker in the closed state.
+
+        Args:
+            name: Dependency name shown on the health endpoint
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_seconds: Time the circuit stays open before a probe is allowed
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    def _refresh(self) -> None:
+        # Caller holds the lock
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def available(self) -> bool:
+        """True if a call would currently be let through (does not claim the half-open probe)."""
+        with self._lock:
+            self._refresh()
+            return self._state == self.CLOSED or (self._state == self.HALF_OPEN and not self._probe_in_flight)
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether to call the dependency now.
+
+        Every call this returns True for must be followed by record_success(),
+        record_failure() or release(); in the half-open state it claims the probe.
+        """
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                print(f"✅ Circuit '{self.name}' closed again")
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+            self.consecutive_failures = 0
+
+    def record_failure(self, error: Any = None) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if error is not None:
+                self.last_error = str(error)
+            if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"⚡ Circuit '{self.name}' opened after {self.consecutive_failures} failures: {self.last_error}")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Give back a claimed probe without recording an outcome."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    @contextmanager
+    def guard(self, deadline=None, ignore=()):
+        """
+        Run the body as one call to the dependency.
+
+        Args:
+            deadline: Optional request deadline; failures after it was cancelled, or of a
+                call that started with no budget left, are not counted
+            ignore: Exception types that are the caller's fault (e.g. ValueError for
+                invalid arguments) and are not counted as failures
+
+        Raises:
+            CircuitOpenError: Without running the body if the circuit is open
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        started_without_budget = deadline is not None and deadline.expired()
+        try:
+            yield
+        except Exception as e:
+            if isinstance(e, ignore) or started_without_budget or (deadline is not None and deadline.cancelled):
+                self.release()
+            else:
+                self.record_failure(e)
+            raise
+        self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the state and counters for the health endpoint."""
+        with self._lock:
+            self._refresh()
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = round(max(0.0, self._opened_at + self.recovery_seconds - time.monotonic()), 1)
+            return {
+                "state": self._state,
+                "consecutive_failures": self.consecutive_failures,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_in_seconds": retry_in,
+                "last_error": self.last_error
+            }
+
+
+# One breaker per external dependency, shared by the whole process
+database_breaker = CircuitBreaker("database")
+chat_breaker = CircuitBreaker("chat")
+tts_breaker = CircuitBreaker("tts")
+transcription_breaker = CircuitBreaker("transcription")
+
+breakers = {
+    breaker.name: breaker
+    for breaker in (database_breaker, chat_breaker, tts_breaker, transcription_breaker)
+}
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Return the snapshot of every breaker, keyed by dependency name."""
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
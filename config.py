@@ -57,6 +57,35 @@ AVAILABLE_MODELS = {
 # Default model (can be changed at runtime)
 MODEL_NAME = AVAILABLE_MODELS["gpt41mini_hyper2"]
 
+# Hedged request configuration
+# When the primary model has not answered by its usual p95 latency, the same request
+# is also sent to a secondary model and the first valid answer is used
+HEDGE_MODEL_MAP = {
+    # primary model key -> secondary model key (both from AVAILABLE_MODELS)
+    "gpt41": "gpt41mini",
+    "gpt4o": "gpt4omini",
+    "gpt41mini_hyper2": "gpt41mini_hyper3",
+    "gpt41mini_hyper3": "gpt41mini_hyper2",
+}
+HEDGE_PERCENTILE = 95  # Latency percentile of the primary model after which to hedge
+HEDGE_MIN_SAMPLES = 20  # Latency samples needed before the percentile is trusted
+HEDGE_DEFAULT_DELAY_SECONDS = 8.0  # Hedge delay used until enough samples are collected
+HEDGE_LATENCY_WINDOW = 200  # Number of recent latency samples kept per model
+
+def get_hedge_model_name(model_name):
+    """Return the secondary model name to hedge model_name with, or None."""
+    for key, name in AVAILABLE_MODELS.items():
+        if name == model_name and key in HEDGE_MODEL_MAP:
+            return AVAILABLE_MODELS[HEDGE_MODEL_MAP[key]]
+    return None
+
+# Circuit breaker configuration
+# After CIRCUIT_FAILURE_THRESHOLD consecutive failures a dependency (database, chat,
+# TTS, transcription) is skipped instead of waiting for its timeout on every turn;
+# after CIRCUIT_RECOVERY_SECONDS a single probe request decides whether it is back
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_RECOVERY_SECONDS = 30
+
 # Temperature configuration based on model type
 def get_model_temperature():
     # O3 models don't support temperature parameter
@@ -302,6 +331,58 @@ Final Note:
 [Brief encouraging message specific to their situation]
 """
 
+# Hierarchical (map-reduce) closing summary configuration
+# Long sessions are split into turn-aligned chunks that are summarized in parallel
+# and then reduced into the final summary with CLOSING_PROMPT
+CLOSING_HIERARCHICAL_MIN_ROUNDS = 20  # Use the hierarchical mode from this many rounds on
+CLOSING_CHUNK_ROUNDS = 8  # Number of user/coach exchanges per chunk
+CLOSING_MAX_WORKERS = 4  # Maximum number of chunk summaries generated concurrently
+
+# Prompt used to summarize one chunk of a long conversation before the final reduce step
+CLOSING_CHUNK_PROMPT = """
+You are a coaching assistant. The following is part {part_number} of {total_parts} of a coaching conversation between a coach and client.
+
+{conversation_excerpt}
+
+Write a concise summary of this part of the conversation that preserves:
+- The topics and challenges the client raised
+- Insights, realizations or shifts in perspective
+- Any actions, options or next steps the client explicitly considered or committed to
+
+IMPORTANT:
+- Only include what was actually said in this part of the conversation
+- Preserve the client's own wording for commitments and key points
+- Do not write an action plan or a closing message
+"""
+
+# Closing summary draft configuration
+# A draft of the final summary is refreshed in the background once the session
+# approaches its end, so ending the session does not wait for a full LLM call
+CLOSING_DRAFT_MIN_ROUNDS = 15  # Start drafting from this round even without a wrap-up signal
+CLOSING_DRAFT_REFRESH_ROUNDS = 3  # Refresh the draft once it is this many rounds stale
+CLOSING_DRAFT_MAX_DELTA_ROUNDS = 6  # Beyond this staleness the summary is regenerated in full
+
+# Prompt used to bring a closing summary draft up to date with the latest exchanges
+CLOSING_DELTA_PROMPT = """
+You are a coaching assistant. Below is a draft of the final summary and action plan for a coaching session, followed by the exchanges that happened after the draft was written.
+
+<DRAFT_SUMMARY>
+{draft_summary}
+</DRAFT_SUMMARY>
+
+<NEW_EXCHANGES>
+{new_exchanges}
+</NEW_EXCHANGES>
+
+Update the draft so it also reflects the new exchanges.
+
+IMPORTANT:
+- Keep exactly the same format and section headings as the draft
+- Only add or change content that is supported by the new exchanges
+- Only include action items that were explicitly discussed or committed to by the client
+- Do NOT include the <DRAFT_SUMMARY> or <NEW_EXCHANGES> tags in your response
+"""
+
 # System prompt for determining if a coaching conversation should be wrapped up
 WRAP_UP_DECISION_PROMPT = """
 You are an expert in coaching conversations and the T-GROW model. Your task is to analyze the entire coaching conversation history and determine if the conversation has reached a natural conclusion point and should be wrapped up.
@@ -3,6 +3,7 @@ from langchain.memory import ConversationSummaryBufferMemory  # For storing conv
 from langchain.chains import ConversationChain  # For managing conversation flow
 from langchain_openai import ChatOpenAI  # For connecting to OpenAI's models
 from langchain_core.messages import SystemMessage  # For structured system messages
+from langchain_core.messages import HumanMessage, AIMessage, get_buffer_string
 from langchain.chains import LLMChain  # For the closing chain
 from langchain_core.prompts import (  # For creating structured prompts
     ChatPromptTemplate,
@@ -19,7 +20,16 @@ from config import (  # Import configuration
     PROGRESSION_ANALYSIS_PROMPT,
     FALLBACK_PROMPT,
     CLOSING_PROMPT,
-    WRAP_UP_DECISION_PROMPT
+    CLOSING_CHUNK_PROMPT,
+    CLOSING_HIERARCHICAL_MIN_ROUNDS,
+    CLOSING_CHUNK_ROUNDS,
+    CLOSING_MAX_WORKERS,
+    CLOSING_DELTA_PROMPT,
+    CLOSING_DRAFT_MIN_ROUNDS,
+    CLOSING_DRAFT_REFRESH_ROUNDS,
+    CLOSING_DRAFT_MAX_DELTA_ROUNDS,
+    WRAP_UP_DECISION_PROMPT,
+    get_hedge_model_name
 )
 import os
 import json
@@ -27,6 +37,11 @@ from datetime import datetime
 import sys
 import subprocess
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from deadline import Deadline, DeadlineExceeded
+from model_router import ModelRouter
+from circuit_breaker import chat_breaker, CircuitOpenError
 
 # Fix console encoding for international characters
 if sys.platform == 'win32':
@@ -88,6 +103,26 @@ class Conversation:
             **model_params
         )
         
+        # Calls made under a request deadline get a single attempt with the remaining
+        # budget as their timeout; a client retry would start a new request after the
+        # deadline and keep spending after the turn was abandoned
+        router_llm = ChatOpenAI(
+            api_key=OPENAI_API_KEY,
+            max_retries=0,
+            **model_params
+        )
+        
+        # Secondary model that is raced against the main LLM when it is slower than usual
+        hedge_model_name = get_hedge_model_name(MODEL_NAME)
+        hedge_llm = None
+        if hedge_model_name:
+            hedge_llm = ChatOpenAI(
+                api_key=OPENAI_API_KEY,
+                max_retries=0,
+                **{**model_params, "model": hedge_model_name}
+            )
+        self.router = ModelRouter(MODEL_NAME, router_llm, hedge_model_name, hedge_llm)
+        
         # Dedicated LLM for summarization
         # Using GPT-3.5-turbo which has proven reliability for summarization tasks
         self.summary_llm = ChatOpenAI(
@@ -96,6 +131,14 @@ class Conversation:
             temperature=0.3,  # Lower temperature for more consistent summaries
             request_timeout=20  # Increased timeout for more thorough summarization
         )
+        # Same model for buffer summarization within a turn's deadline (single attempt)
+        self.deadline_summary_llm = ChatOpenAI(
+            api_key=OPENAI_API_KEY,
+            model="gpt-3.5-turbo",
+            temperature=0.3,
+            request_timeout=20,
+            max_retries=0
+        )
         
         # Step 2: Set up conversation memory to store dialogue history with custom summarization
         # Create a custom summarization prompt that focuses on conversation history
@@ -119,6 +162,14 @@ class Conversation:
         # Add a conversation rounds counter that persists regardless of summarization
         self.conversation_rounds = 0
         
+        # Draft of the final summary, refreshed in the background near the end of the session
+        self.closing_draft = None
+        self.closing_draft_rounds = 0  # conversation_rounds when the draft was written
+        self._closing_draft_last_message = None  # Last message covered by the draft
+        self._closing_draft_lock = threading.Lock()
+        self._closing_draft_thread = None
+        self.wrap_up_signalled = False  # Set once should_wrap_up() first returns True
+        
         # Step 3: Create the prompt template with clear role separation and include conversation rounds
         # This makes it easier for the model to understand who is speaking and track conversation progress
         self.prompt_template = lambda rounds: ChatPromptTemplate.from_messages([
@@ -319,13 +370,17 @@ class Conversation:
                 'summary': self._safe_get_summary()
             }
             
-    def should_wrap_up(self):
+    def should_wrap_up(self, deadline=None):
         """
         Determine if the session should be wrapped up based on LLM analysis of the conversation.
         
         Uses an LLM to analyze the entire conversation history and determine if it has reached 
         a natural conclusion point according to the T-GROW coaching model.
         
+        Args:
+            deadline (Deadline): Optional request deadline. The check is skipped when no
+                budget is left and the LLM call is bounded by the remaining budget.
+        
         Returns:
           bool: True if session should be wrapped up, False otherwise.
         """
@@ -342,6 +397,14 @@ class Conversation:
         if self.conversation_rounds < 15:  # Threshold set to 15 rounds (adjust as needed)
             # print(f"Not enough conversation rounds for wrap-up check ({self.conversation_rounds}/15 rounds). Skipping LLM call.")
             return False
+        
+        if deadline is not None and deadline.expired():
+            # No budget left in this request for the wrap-up check
+            return False
+        
+        if not chat_breaker.available():
+            # The OpenAI API is failing; the wrap-up check is optional
+            return False
             
         try:
             # Format conversation history for the LLM
@@ -367,10 +430,15 @@ class Conversation:
             summary = summary_data.get('summary', '')
             
             # Create a dedicated LLM for wrap-up decision
+            wrap_up_params = {}
+            if deadline is not None:
+                wrap_up_params["request_timeout"] = deadline.timeout_for("wrap-up")
+                wrap_up_params["max_retries"] = 0
             wrap_up_llm = ChatOpenAI(
                 api_key=OPENAI_API_KEY,
                 model="gpt-3.5-turbo",  # Using 3.5 turbo for efficiency
-                temperature=0.1  # Low temperature for more consistent decisions
+                temperature=0.1,  # Low temperature for more consistent decisions
+                **wrap_up_params
             )
             
             # Create prompt from WRAP_UP_DECISION_PROMPT template
@@ -384,17 +452,24 @@ class Conversation:
             )
             
             # Run the chain
-            response = wrap_up_chain.run({
+            wrap_up_inputs = {
                 'conversation_history': formatted_history,
                 'conversation_summary': summary
-            })
+            }
+            if deadline is not None:
+                response = deadline.run(wrap_up_chain.run, wrap_up_inputs, stage="wrap-up")
+            else:
+                response = wrap_up_chain.run(wrap_up_inputs)
             
             # Clean up and parse the response
             clean_response = response.strip().lower()
             # print(f"\n--- WRAP-UP DECISION ---\nLLM decision: '{clean_response}'\n--- END DECISION ---\n")
             
             # Return True if the LLM says "yes", False otherwise
-            return clean_response == "yes"
+            if clean_response == "yes":
+                self.wrap_up_signalled = True
+                return True
+            return False
             
         except Exception as e:
             # Log the error and fall back to the default behavior (no wrap-up)
@@ -402,25 +477,124 @@ class Conversation:
             print("Falling back to default behavior: no wrap-up")
             return False
             
-    def process_input(self, user_input, timeout_seconds=60):
+    def _invoke_llm(self, prompt, deadline, stage="llm"):
+        """
+        Call the main LLM with the remaining budget of the deadline as its timeout.
+        
+        The timeout is passed per call instead of being set on the shared LLM,
+        so concurrent requests never see each other's timeouts. Requests go
+        through the model router, which hedges with a secondary model when the
+        main model is slower than its usual p95 latency or fails. While the
+        chat circuit is open, CircuitOpenError is raised without calling the API.
+        
+        Returns:
+            str: The model's response text
+        """
+        with chat_breaker.guard(deadline):
+            return self.router.invoke(prompt, deadline, stage=stage)
+
+    def _summarize_pruned_messages(self, messages, timeout):
+        """Fold messages pruned from the buffer into the moving summary."""
+        new_lines = get_buffer_string(
+            messages,
+            human_prefix=self.memory.human_prefix,
+            ai_prefix=self.memory.ai_prefix
+        )
+        summary_prompt = self.memory.prompt.format(
+            summary=self.memory.moving_summary_buffer,
+            new_lines=new_lines
+        )
+        return self.deadline_summary_llm.invoke(summary_prompt, timeout=timeout).content
+
+    def _prune_memory(self, deadline):
+        """
+        Summarize the oldest messages once the buffer exceeds max_token_limit.
+        
+        This mirrors ConversationSummaryBufferMemory.prune() but gives the
+        summarization call the remaining budget of the deadline. If there is no
+        budget left, pruning is deferred to a later turn.
+        """
+        buffer = self.memory.chat_memory.messages
+        current_tokens = self.memory.llm.get_num_tokens_from_messages(buffer)
+        if current_tokens <= self.memory.max_token_limit:
+            return
+        
+        if deadline.expired() or not chat_breaker.available():
+            # print("Deferring summarization: no time left in this request")
+            return
+        
+        prune_count = 0
+        while current_tokens > self.memory.max_token_limit and prune_count < len(buffer):
+            prune_count += 1
+            current_tokens = self.memory.llm.get_num_tokens_from_messages(buffer[prune_count:])
+        
+        pruned_messages = list(buffer[:prune_count])
+        timeout = deadline.timeout_for("summarization", self.summary_llm.request_timeout)
+        with chat_breaker.guard(deadline):
+            new_summary = deadline.run(
+                self._summarize_pruned_messages, pruned_messages, timeout, stage="summarization"
+            )
+        
+        # Only drop the messages once their summary exists
+        del buffer[:prune_count]
+        self.memory.moving_summary_buffer = new_summary
+
+    def _predict_with_memory(self, user_input, deadline):
+        """
+        Equivalent of ConversationChain.predict() that respects the request deadline.
+        
+        Loads the memory into the prompt, calls the LLM with the remaining budget,
+        saves the exchange to memory and summarizes the buffer if it grew too large.
+        
+        Returns:
+            str: The AI's response text
+        """
+        memory_variables = self.memory.load_memory_variables({})
+        prompt_value = self.conversation.prompt.invoke({"input": user_input, **memory_variables})
+        
+        response = self._invoke_llm(prompt_value.messages, deadline)
+        
+        # Save the exchange the same way ConversationSummaryBufferMemory.save_context does
+        self.memory.chat_memory.add_messages([HumanMessage(content=user_input), AIMessage(content=response)])
+        try:
+            self._prune_memory(deadline)
+        except Exception as e:
+            # The response is still valid; summarization is retried on a later turn
+            safe_print(f"Warning: Summarization skipped for this turn: {e}")
+            self.summarization_failed = True
+        
+        return response
+
+    def process_input(self, user_input, timeout_seconds=60, deadline=None):
         """
         Process user input and generate an AI response with timeout protection.
         
         This method:
         1. Checks if the input is valid
-        2. Sends the input to the language model with timeout protection
+        2. Sends the input to the language model within the request deadline
         3. Returns the generated response
         
         Args:
             user_input (str): The user's text input
             timeout_seconds (int): Maximum time in seconds to wait for a response
+                when no deadline is given
+            deadline (Deadline): Deadline of the request this turn belongs to. The
+                LLM, fallback and summarization calls all share its remaining budget.
             
         Returns:
             str: The AI's response text
+            
+        Raises:
+            DeadlineExceeded: If the given deadline ends before there is a response;
+                the user input is taken out of memory again so the turn can be retried
         """
         # Step 1: Check if the input is valid
         if not user_input:
             return "I couldn't hear you clearly. Could you please repeat that?"
+        
+        caller_deadline = deadline is not None
+        if deadline is None:
+            deadline = Deadline(timeout_seconds)
             
         try:
             # Clean up any empty messages first
@@ -440,18 +614,10 @@ class Conversation:
             # Get the current summary before processing - with error handling
             old_summary = self._safe_get_summary()
 
-            # Step 2: Use the conversation chain to generate a response with timeout
+            # Step 2: Use the conversation chain to generate a response within the deadline
             try:
                 # This automatically updates the conversation memory
-                # Add a timeout parameter if the API wrapper supports it
-                if hasattr(self.llm, 'request_timeout'):
-                    original_timeout = self.llm.request_timeout
-                    self.llm.request_timeout = timeout_seconds
-                    response = self.conversation.predict(input=user_input)
-                    self.llm.request_timeout = original_timeout
-                else:
-                    # If no timeout support, use the regular predict method
-                    response = self.conversation.predict(input=user_input)
+                response = self._predict_with_memory(user_input, deadline)
                 
                 # Clean up any empty messages that might have been introduced
                 self._clean_empty_messages()
@@ -460,6 +626,9 @@ class Conversation:
                 elapsed_time = time.time() - start_time
                 # print(f"Response generated in {elapsed_time:.2f} seconds")
                 
+            except (DeadlineExceeded, CircuitOpenError):
+                # No budget left for a fallback attempt, or the API is known to be down
+                raise
             except Exception as timeout_error:
                 elapsed_time = time.time() - start_time
                 # print(f"API call failed after {elapsed_time:.2f} seconds: {timeout_error}")
@@ -471,7 +640,7 @@ class Conversation:
                     
                     # Use a simpler prompt with the same model but direct call
                     formatted_fallback_prompt = FALLBACK_PROMPT.format(user_input=user_input)
-                    fallback_response = self.llm.predict(formatted_fallback_prompt)
+                    fallback_response = self._invoke_llm(formatted_fallback_prompt, deadline, stage="fallback")
                     
                     # Since we're bypassing the conversation chain, manually add to memory
                     self.memory.chat_memory.add_user_message(user_input)
@@ -487,6 +656,8 @@ class Conversation:
                     return fallback_response
                 except Exception as fallback_error:
                     safe_print(f"Fallback approach also failed: {fallback_error}")
+                    if isinstance(fallback_error, DeadlineExceeded):
+                        raise
                     raise timeout_error  # Re-raise the original error
             
             # Check if summary has changed and log if it has - with error handling
@@ -512,12 +683,26 @@ class Conversation:
             error_msg = str(e)
             safe_print(f"Error in conversation processing: {error_msg}")
             
+            if isinstance(e, DeadlineExceeded) and caller_deadline:
+                # The request timed out or was cancelled: there is no reply to keep,
+                # so the caller reports a failed turn instead of a canned answer
+                self._drop_unanswered_input(user_input)
+                raise
+            
             # Check if it's a timeout error
-            if "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
+            if isinstance(e, CircuitOpenError):
+                return "I'm having trouble connecting right now. Please give me a moment and try again."
+            if isinstance(e, DeadlineExceeded) or "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
                 return "I'm taking too long to respond. Let's try a different approach. Could you ask me something else or rephrase your question?"
             
             return "I'm having trouble processing that request. Let's try again."
     
+    def _drop_unanswered_input(self, user_input):
+        """Remove the user message of a turn that got no response from memory."""
+        messages = self.memory.chat_memory.messages
+        if messages and messages[-1].type == "human" and messages[-1].content == user_input:
+            messages.pop()
+    
     def _log_exchange(self, user_input, response):
         """Log the conversation exchange to a file."""
         try:
@@ -607,7 +792,195 @@ class Conversation:
         # safe_print("=" * 80)
         return results
         
-    def generate_closing_summary(self):
+    def _format_closing_transcript(self, messages):
+        """Format messages as a Client/Coach transcript for the closing prompts."""
+        transcript = ""
+        for msg in messages:
+            if msg.type == "human":
+                transcript += f"Client: {msg.content}\n\n"
+            else:
+                transcript += f"Coach: {msg.content}\n\n"
+        return transcript
+
+    def _split_into_turn_chunks(self, messages, rounds_per_chunk=CLOSING_CHUNK_ROUNDS):
+        """
+        Split messages into chunks of at most rounds_per_chunk exchanges.
+        
+        A new chunk only ever starts at a client message, so a client message
+        and the coach reply to it always end up in the same chunk.
+        
+        Returns:
+            list: List of message lists, in conversation order
+        """
+        chunks = []
+        current_chunk = []
+        rounds_in_chunk = 0
+        
+        for msg in messages:
+            if msg.type == "human":
+                if rounds_in_chunk >= rounds_per_chunk:
+                    chunks.append(current_chunk)
+                    current_chunk = []
+                    rounds_in_chunk = 0
+                rounds_in_chunk += 1
+            current_chunk.append(msg)
+        
+        if current_chunk:
+            chunks.append(current_chunk)
+        return chunks
+
+    def _closing_predict(self, closing_llm, prompt, deadline=None):
+        """Ask the closing LLM; under a deadline each call gets the budget left at that moment as its timeout."""
+        if deadline is None:
+            return closing_llm.predict(prompt)
+        timeout = deadline.timeout_for("closing summary")
+        return deadline.run(closing_llm.predict, prompt, timeout=timeout, stage="closing summary")
+
+    def _summarize_closing_chunks(self, closing_llm, chunks, deadline=None):
+        """
+        Summarize transcript chunks concurrently (the map step of the hierarchical summary).
+        
+        Returns:
+            list: One summary per chunk, in the same order as the chunks
+        """
+        def summarize_chunk(indexed_chunk):
+            index, chunk = indexed_chunk
+            chunk_prompt = CLOSING_CHUNK_PROMPT.format(
+                part_number=index + 1,
+                total_parts=len(chunks),
+                conversation_excerpt=self._format_closing_transcript(chunk)
+            )
+            return self._closing_predict(closing_llm, chunk_prompt, deadline)
+        
+        max_workers = max(1, min(CLOSING_MAX_WORKERS, len(chunks)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(summarize_chunk, enumerate(chunks)))
+
+    def _build_hierarchical_closing_history(self, closing_llm, messages, deadline=None):
+        """
+        Build the condensed conversation history passed to CLOSING_PROMPT for long sessions.
+        
+        The moving summary of the memory already covers the messages that were
+        pruned from the buffer, so it is reused as a prefix instead of being
+        summarized again. The remaining messages are split into turn-aligned
+        chunks that are summarized in parallel.
+        
+        Returns:
+            str: Conversation history text for the reduce step
+        """
+        earlier_summary = self._safe_get_summary()
+        chunks = self._split_into_turn_chunks(messages)
+        
+        conversation_text = "Condensed conversation history (in chronological order):\n\n"
+        if earlier_summary:
+            conversation_text += f"{earlier_summary}\n\n"
+        
+        # A single chunk is short enough to pass through verbatim
+        if len(chunks) <= 1:
+            conversation_text += "Recent conversation:\n\n"
+            conversation_text += self._format_closing_transcript(messages)
+            return conversation_text
+        
+        chunk_summaries = self._summarize_closing_chunks(closing_llm, chunks, deadline)
+        for index, chunk_summary in enumerate(chunk_summaries):
+            conversation_text += f"Part {index + 1} of {len(chunk_summaries)}:\n{chunk_summary.strip()}\n\n"
+        return conversation_text
+
+    def _create_closing_llm(self, deadline=None):
+        """Create the LLM used for closing summaries, bounded by the deadline if given."""
+        closing_params = {}
+        if deadline is not None:
+            # Single attempts; each call passes the budget left at that point (see _closing_predict)
+            closing_params["request_timeout"] = deadline.timeout_for("closing summary")
+            closing_params["max_retries"] = 0
+        return ChatOpenAI(
+            api_key=OPENAI_API_KEY,
+            model="gpt-3.5-turbo",  # Using 3.5 for cost efficiency
+            temperature=0.3,  # Lower temperature for more consistent summaries
+            **closing_params
+        )
+
+    def _compose_closing_summary(self, messages, hierarchical=None, deadline=None):
+        """
+        Generate the final summary text for the given messages without logging it.
+        
+        Args:
+            messages (list): Conversation messages to summarize
+            hierarchical (bool): Force the hierarchical mode on or off
+            deadline (Deadline): Optional request deadline bounding the LLM calls
+            
+        Returns:
+            str: The final summary and action plan
+        """
+        # Create a dedicated LLM instance for the closing summary
+        closing_llm = self._create_closing_llm(deadline)
+        
+        if hierarchical is None:
+            hierarchical = self.conversation_rounds >= CLOSING_HIERARCHICAL_MIN_ROUNDS
+        
+        # Format the conversation history into a readable string
+        if hierarchical:
+            conversation_text = self._build_hierarchical_closing_history(closing_llm, messages, deadline)
+        else:
+            conversation_text = "Full conversation history:\n\n"
+            conversation_text += self._format_closing_transcript(messages)
+        
+        # Create the closing chain with the explicitly formatted prompt
+        # Note: CLOSING_PROMPT should be updated in config.py to handle full conversation history
+        formatted_closing_prompt = CLOSING_PROMPT.format(conversation_history=conversation_text)
+        # safe_print("Passing complete conversation history to closing prompt...")
+        
+        # Use direct LLM prediction instead of chain to ensure proper formatting
+        return self._closing_predict(closing_llm, formatted_closing_prompt, deadline)
+
+    def _log_closing_summary(self, messages, final_message):
+        """Write the final summary to the conversation log and the final summary file."""
+        # Log the final summary to the conversation log file
+        try:
+            # Check if the last few messages already have the wrap-up proposal and confirmation
+            # Check for wrap-up trigger & confirmation already in the conversation
+            has_wrap_up_proposal = False
+            has_user_confirmation = False
+            
+            if len(messages) >= 2:
+                # Check last coach message for wrap-up prompt patterns
+                last_coach_msgs = [msg.content for msg in messages[-4:] if msg.type == "ai"]
+                last_user_msgs = [msg.content.lower() for msg in messages[-3:] if msg.type == "human"]
+                
+                for msg in last_coach_msgs:
+                    if "wrap up" in msg and "summary" in msg and "action plan" in msg:
+                        has_wrap_up_proposal = True
+                        break
+                
+                for msg in last_user_msgs:
+                    if ("yes" in msg or "sure" in msg or "please" in msg) and (
+                        "summarize" in msg or "summary" in msg or "wrap" in msg):
+                        has_user_confirmation = True
+                        break
+            
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                # Only add "Please summarize" if the wrap-up dialog isn't already in the conversation
+                if not (has_wrap_up_proposal and has_user_confirmation):
+                    f.write("User: Please summarize.\n")
+                    f.write("-" * 50 + "\n")
+                
+                f.write(f"Coach: {final_message}\n")
+                f.write("-" * 50 + "\n")
+        except Exception as log_error:
+            # safe_print(f"Warning: Could not update conversation log with final summary: {log_error}")
+            pass
+        
+        # Log the final summary to a separate file
+        try:
+            with open(os.path.join(self.log_dir, f"final_summary_{self.session_id}.txt"), "w", encoding="utf-8") as f:
+                f.write("FINAL SUMMARY AND ACTION PLAN\n")
+                f.write("=" * 50 + "\n\n")
+                f.write(final_message)
+        except Exception as log_error:
+            # safe_print(f"Warning: Could not log final summary: {log_error}")
+            pass
+
+    def generate_closing_summary(self, hierarchical=None, deadline=None):
         """
         Generate a final summary and action plan for the coaching session.
         
@@ -615,6 +988,15 @@ class Conversation:
         a structured summary with actionable next steps based on the
         entire conversation history.
         
+        Long sessions use a hierarchical (map-reduce) mode: the transcript is
+        split into turn-aligned chunks that are summarized concurrently, and the
+        chunk summaries are reduced with CLOSING_PROMPT.
+        
+        Args:
+            hierarchical (bool): Force the hierarchical mode on or off. By default it
+                is used once the session reaches CLOSING_HIERARCHICAL_MIN_ROUNDS rounds.
+            deadline (Deadline): Optional request deadline bounding the LLM calls
+        
         Returns:
             str: The final summary and action plan
         """
@@ -622,80 +1004,144 @@ class Conversation:
             # Get the entire conversation history
             messages = self.get_conversation_history()
             
-            # Format the conversation history into a readable string
-            conversation_text = "Full conversation history:\n\n"
-            for msg in messages:
-                if msg.type == "human":
-                    conversation_text += f"Client: {msg.content}\n\n"
-                else:
-                    conversation_text += f"Coach: {msg.content}\n\n"
-            
-            # Create a dedicated LLM instance for the closing summary
-            closing_llm = ChatOpenAI(
-                api_key=OPENAI_API_KEY,
-                model="gpt-3.5-turbo",  # Using 3.5 for cost efficiency
-                temperature=0.3  # Lower temperature for more consistent summaries
-            )
-            
-            # Create the closing chain with the explicitly formatted prompt
-            # Note: CLOSING_PROMPT should be updated in config.py to handle full conversation history
-            formatted_closing_prompt = CLOSING_PROMPT.format(conversation_history=conversation_text)
-            # safe_print("Passing complete conversation history to closing prompt...")
-            
-            # Use direct LLM prediction instead of chain to ensure proper formatting
-            final_message = closing_llm.predict(formatted_closing_prompt)
-            
-            # Log the final summary to the conversation log file
-            try:
-                # Check if the last few messages already have the wrap-up proposal and confirmation
-                # Check for wrap-up trigger & confirmation already in the conversation
-                has_wrap_up_proposal = False
-                has_user_confirmation = False
-                
-                if len(messages) >= 2:
-                    # Check last coach message for wrap-up prompt patterns
-                    last_coach_msgs = [msg.content for msg in messages[-4:] if msg.type == "ai"]
-                    last_user_msgs = [msg.content.lower() for msg in messages[-3:] if msg.type == "human"]
-                    
-                    for msg in last_coach_msgs:
-                        if "wrap up" in msg and "summary" in msg and "action plan" in msg:
-                            has_wrap_up_proposal = True
-                            break
-                    
-                    for msg in last_user_msgs:
-                        if ("yes" in msg or "sure" in msg or "please" in msg) and (
-                            "summarize" in msg or "summary" in msg or "wrap" in msg):
-                            has_user_confirmation = True
-                            break
-                
-                with open(self.log_file, "a", encoding="utf-8") as f:
-                    # Only add "Please summarize" if the wrap-up dialog isn't already in the conversation
-                    if not (has_wrap_up_proposal and has_user_confirmation):
-                        f.write("User: Please summarize.\n")
-                        f.write("-" * 50 + "\n")
-                    
-                    f.write(f"Coach: {final_message}\n")
-                    f.write("-" * 50 + "\n")
-            except Exception as log_error:
-                # safe_print(f"Warning: Could not update conversation log with final summary: {log_error}")
-                pass
+            with chat_breaker.guard(deadline):
+                final_message = self._compose_closing_summary(messages, hierarchical, deadline)
+            self._log_closing_summary(messages, final_message)
             
-            # Log the final summary to a separate file
-            try:
-                with open(os.path.join(self.log_dir, f"final_summary_{self.session_id}.txt"), "w", encoding="utf-8") as f:
-                    f.write("FINAL SUMMARY AND ACTION PLAN\n")
-                    f.write("=" * 50 + "\n\n")
-                    f.write(final_message)
-            except Exception as log_error:
-                # safe_print(f"Warning: Could not log final summary: {log_error}")
-                pass
-                
             return final_message
         except Exception as e:
             # safe_print(f"Error generating closing summary: {e}")
             return "I'm unable to generate a final summary at this time. Let's continue our conversation."
 
-    def process_input_without_adding_to_memory(self, user_input, timeout_seconds=60):
+    def get_closing_draft_staleness(self):
+        """
+        Get how many conversation rounds the closing summary draft is behind.
+        
+        Returns:
+            int: Number of rounds since the draft was written, or None if there is no draft
+        """
+        with self._closing_draft_lock:
+            if self.closing_draft is None:
+                return None
+            return self.conversation_rounds - self.closing_draft_rounds
+
+    def _refresh_closing_draft(self, messages, rounds):
+        """Regenerate the closing summary draft for a snapshot of the conversation."""
+        try:
+            with chat_breaker.guard():
+                draft = self._compose_closing_summary(messages)
+        except Exception as e:
+            safe_print(f"Warning: Could not refresh closing summary draft: {e}")
+            return
+        
+        with self._closing_draft_lock:
+            # Never replace a newer draft with an older one
+            if self.closing_draft is None or rounds >= self.closing_draft_rounds:
+                self.closing_draft = draft
+                self.closing_draft_rounds = rounds
+                self._closing_draft_last_message = messages[-1] if messages else None
+
+    def maybe_refresh_closing_draft(self, force=False):
+        """
+        Refresh the closing summary draft in the background when the session nears its end.
+        
+        The draft is refreshed once should_wrap_up() has returned True or the session
+        has reached CLOSING_DRAFT_MIN_ROUNDS rounds, and then again whenever it is
+        CLOSING_DRAFT_REFRESH_ROUNDS rounds stale. Only one refresh runs at a time.
+        
+        Args:
+            force (bool): Refresh regardless of the round threshold, e.g. when the
+                user asked to wrap up
+                
+        Returns:
+            bool: True if a background refresh was started
+        """
+        if not (force or self.wrap_up_signalled or self.conversation_rounds >= CLOSING_DRAFT_MIN_ROUNDS):
+            return False
+        
+        if self._closing_draft_thread is not None and self._closing_draft_thread.is_alive():
+            return False
+        
+        if not chat_breaker.available():
+            # The draft is optional work; the final summary falls back to a full generation
+            return False
+        
+        staleness = self.get_closing_draft_staleness()
+        if staleness is not None and staleness < CLOSING_DRAFT_REFRESH_ROUNDS:
+            return False
+        
+        # Snapshot the history on the calling thread so the worker never touches live memory
+        messages = list(self.get_conversation_history())
+        if not messages:
+            return False
+        
+        self._closing_draft_thread = threading.Thread(
+            target=self._refresh_closing_draft,
+            args=(messages, self.conversation_rounds),
+            daemon=True
+        )
+        self._closing_draft_thread.start()
+        return True
+
+    def _messages_since_closing_draft(self, messages):
+        """Return the messages added after the draft was written, or None if unknown."""
+        last_message = self._closing_draft_last_message
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index] is last_message:
+                return messages[index + 1:]
+        return None
+
+    def finalize_closing_summary(self, deadline=None):
+        """
+        Return the final summary, reusing the background draft where possible.
+        
+        An up-to-date draft is returned immediately. A draft that is at most
+        CLOSING_DRAFT_MAX_DELTA_ROUNDS rounds stale is brought up to date with a
+        small delta update covering only the newer exchanges. Otherwise the
+        summary is generated in full with generate_closing_summary().
+        
+        Args:
+            deadline (Deadline): Optional request deadline bounding the LLM calls
+        
+        Returns:
+            str: The final summary and action plan
+        """
+        # Let an in-flight refresh finish; it is further along than a new call would be
+        if self._closing_draft_thread is not None and self._closing_draft_thread.is_alive():
+            self._closing_draft_thread.join(timeout=deadline.remaining() if deadline is not None else None)
+        
+        staleness = self.get_closing_draft_staleness()
+        if staleness is None or staleness > CLOSING_DRAFT_MAX_DELTA_ROUNDS:
+            return self.generate_closing_summary(deadline=deadline)
+        
+        try:
+            messages = self.get_conversation_history()
+            with self._closing_draft_lock:
+                draft = self.closing_draft
+                new_messages = self._messages_since_closing_draft(messages)
+            
+            if new_messages is None:
+                return self.generate_closing_summary(deadline=deadline)
+            
+            if staleness == 0:
+                # Only wrap-up prompts and confirmations were added since the draft
+                final_message = draft
+            else:
+                closing_llm = self._create_closing_llm(deadline)
+                delta_prompt = CLOSING_DELTA_PROMPT.format(
+                    draft_summary=draft,
+                    new_exchanges=self._format_closing_transcript(new_messages)
+                )
+                with chat_breaker.guard(deadline):
+                    final_message = self._closing_predict(closing_llm, delta_prompt, deadline)
+            
+            self._log_closing_summary(messages, final_message)
+            return final_message
+        except Exception as e:
+            safe_print(f"Warning: Could not finalize closing summary draft: {e}")
+            return self.generate_closing_summary(deadline=deadline)
+
+    def process_input_without_adding_to_memory(self, user_input, timeout_seconds=60, deadline=None):
         """
         Process user input that's already been added to memory.
         
@@ -704,6 +1150,8 @@ class Conversation:
         Args:
             user_input (str): The user's text input that's already been added to memory
             timeout_seconds (int): Maximum time in seconds to wait for a response
+                when no deadline is given
+            deadline (Deadline): Deadline of the request this turn belongs to
             
         Returns:
             str: The AI's response text
@@ -712,6 +1160,9 @@ class Conversation:
         if not user_input:
             return "I couldn't hear you clearly. Could you please repeat that?"
         
+        if deadline is None:
+            deadline = Deadline(timeout_seconds)
+        
         try:
             # Track the start time for timeout purposes
             start_time = time.time()
@@ -727,80 +1178,42 @@ class Conversation:
             # Get the current summary before processing - with error handling
             old_summary = self._safe_get_summary()
 
-            # Step 2: Use the conversation chain's LLM to generate a response with timeout
+            # Step 2: Use the conversation chain's LLM to generate a response within the deadline
             try:
-                # Use the LLM directly with the conversation's prompt
-                if hasattr(self.llm, 'request_timeout'):
-                    original_timeout = self.llm.request_timeout
-                    self.llm.request_timeout = timeout_seconds
-                    
-                    # Get the current conversation history
-                    chat_history = self.memory.chat_memory.messages
-                    
-                    # Check for and remove duplicated messages (if the user input is already in memory twice)
-                    self._remove_duplicate_messages()
-                    
-                    # Get updated chat history after removing duplicates
-                    chat_history = self.memory.chat_memory.messages
-                    
-                    # Create input values for the prompt without including user_input again
-                    # This is the key difference - we don't pass the user_input separately
-                    # since it's already in the chat history
-                    input_values = {"input": "", "chat_history": chat_history}
-                    
-                    # Get the prompt with history
-                    prompt_value = self.conversation.prompt.invoke(input_values)
-                    
-                    # Get the response directly from the LLM
-                    response = self.llm.invoke(prompt_value.messages).content
-                    
-                    # Only add the AI's response to memory
-                    self.memory.chat_memory.add_ai_message(response)
-                    
-                    # Trigger summarization if needed
-                    if hasattr(self.memory, 'buffer') and len(self.memory.buffer) > self.memory.max_token_limit:
-                        # Force summarization
-                        # print("Triggering manual summarization due to buffer size")
-                        buffer_content = self.memory.buffer
-                        summary = self.memory.summarize(buffer_content)
-                        if summary:
-                            old_summary = self._safe_get_summary() 
-                            # Update the summary
-                            self.memory.moving_summary_buffer = summary
-                            # Clear the buffer after summarization
-                            self.memory.buffer = []
-                            # Log the update
-                            self._log_summary_update(old_summary, summary)
-                    
-                    # Restore original timeout
-                    self.llm.request_timeout = original_timeout
-                else:
-                    # If no timeout support, use the same approach without timeout handling
-                    # Check for and remove duplicated messages
-                    self._remove_duplicate_messages()
-                    
-                    # Get the current conversation history after duplicate removal
-                    chat_history = self.memory.chat_memory.messages
-                    
-                    # Use empty input since the user input is already in chat history
-                    input_values = {"input": "", "chat_history": chat_history}
-                    prompt_value = self.conversation.prompt.invoke(input_values)
-                    response = self.llm.invoke(prompt_value.messages).content
-                    
-                    # Only add the AI response to memory
-                    self.memory.chat_memory.add_ai_message(response)
-                    
-                    # Trigger summarization if needed
-                    if hasattr(self.memory, 'buffer') and len(self.memory.buffer) > self.memory.max_token_limit:
-                        # Force summarization
-                        # print("Triggering manual summarization due to buffer size")
-                        buffer_content = self.memory.buffer
-                        summary = self.memory.summarize(buffer_content)
-                        if summary:
-                            old_summary = self._safe_get_summary()
-                            self.memory.moving_summary_buffer = summary
-                            self.memory.buffer = []
-                            self._log_summary_update(old_summary, summary)
+                # Check for and remove duplicated messages (if the user input is already in memory twice)
+                self._remove_duplicate_messages()
+                
+                # Get updated chat history after removing duplicates
+                chat_history = self.memory.chat_memory.messages
+                
+                # Create input values for the prompt without including user_input again
+                # This is the key difference - we don't pass the user_input separately
+                # since it's already in the chat history
+                input_values = {"input": "", "chat_history": chat_history}
+                
+                # Get the prompt with history
+                prompt_value = self.conversation.prompt.invoke(input_values)
+                
+                # Get the response directly from the LLM, with a per-call timeout
+                response = self._invoke_llm(prompt_value.messages, deadline)
+                
+                # Only add the AI's response to memory
+                self.memory.chat_memory.add_ai_message(response)
+                
+                # Trigger summarization if needed
+                if hasattr(self.memory, 'buffer') and len(self.memory.buffer) > self.memory.max_token_limit:
+                    # Force summarization
+                    # print("Triggering manual summarization due to buffer size")
+                    buffer_content = self.memory.buffer
+                    summary = self.memory.summarize(buffer_content)
+                    if summary:
+                        old_summary = self._safe_get_summary() 
+                        # Update the summary
+                        self.memory.moving_summary_buffer = summary
+                        # Clear the buffer after summarization
+                        self.memory.buffer = []
+                        # Log the update
+                        self._log_summary_update(old_summary, summary)
                 
                 # Track and log response time
                 elapsed_time = time.time() - start_time
@@ -809,6 +1222,9 @@ class Conversation:
                 # Clean up any empty messages that might have been introduced
                 self._clean_empty_messages()
                 
+            except (DeadlineExceeded, CircuitOpenError):
+                # No budget left for a fallback attempt, or the API is known to be down
+                raise
             except Exception as timeout_error:
                 elapsed_time = time.time() - start_time
                 # print(f"API call failed after {elapsed_time:.2f} seconds: {timeout_error}")
@@ -820,7 +1236,7 @@ class Conversation:
                     
                     # Use a simpler prompt with the same model but direct call
                     formatted_fallback_prompt = FALLBACK_PROMPT.format(user_input=user_input)
-                    fallback_response = self.llm.predict(formatted_fallback_prompt)
+                    fallback_response = self._invoke_llm(formatted_fallback_prompt, deadline, stage="fallback")
                     
                     # Only add the AI's response to memory (input already added)
                     self.memory.chat_memory.add_ai_message(fallback_response)
@@ -861,7 +1277,9 @@ class Conversation:
             print(f"Error in conversation processing: {error_msg}")
             
             # Check if it's a timeout error
-            if "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
+            if isinstance(e, CircuitOpenError):
+                return "I'm having trouble connecting right now. Please give me a moment and try again."
+            if isinstance(e, DeadlineExceeded) or "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
                 return "I'm taking too long to respond. Let's try a different approach. Could you ask me something else or rephrase your question?"
             
             return "I'm having trouble processing that request. Let's try again."
@@ -959,13 +1377,15 @@ class Conversation:
             # print(f"Buffer size after adding: {len(self.memory.buffer)}")
             pass
             
-    def process_input_with_existing_message(self, user_input, timeout_seconds=60):
+    def process_input_with_existing_message(self, user_input, timeout_seconds=60, deadline=None):
         """
         Process user input that's already been added to memory correctly.
         
         Args:
             user_input (str): The user's text input that's already been added to memory
             timeout_seconds (int): Maximum time in seconds to wait for a response
+                when no deadline is given
+            deadline (Deadline): Deadline of the request this turn belongs to
             
         Returns:
             str: The AI's response text
@@ -974,6 +1394,9 @@ class Conversation:
         if not user_input:
             return "I couldn't hear you clearly. Could you please repeat that?"
         
+        if deadline is None:
+            deadline = Deadline(timeout_seconds)
+        
         try:
             # Track the start time for timeout purposes
             start_time = time.time()
@@ -988,27 +1411,20 @@ class Conversation:
             
             # Step 2: Get a response using the conversation chain
             try:
-                # Set timeout if supported
-                if hasattr(self.llm, 'request_timeout'):
-                    original_timeout = self.llm.request_timeout
-                    self.llm.request_timeout = timeout_seconds
-                
-                # Get the response using the conversation chain's LLM
+                # Get the response using the conversation chain's prompt and memory
                 # We create a dummy empty message, so the chain doesn't add the input again
-                # But we use the conversation predict method to properly handle memory
-                response = self.conversation.predict(input="")
+                response = self._predict_with_memory("", deadline)
                 
                 # Clean up any empty messages immediately
                 self._clean_empty_messages()
                 
-                # Restore timeout if needed
-                if hasattr(self.llm, 'request_timeout'):
-                    self.llm.request_timeout = original_timeout
-                
                 # Track and log response time
                 elapsed_time = time.time() - start_time
                 # print(f"Response generated in {elapsed_time:.2f} seconds")
                 
+            except (DeadlineExceeded, CircuitOpenError):
+                # No budget left for a fallback attempt, or the API is known to be down
+                raise
             except Exception as timeout_error:
                 elapsed_time = time.time() - start_time
                 # print(f"API call failed after {elapsed_time:.2f} seconds: {timeout_error}")
@@ -1017,7 +1433,7 @@ class Conversation:
                 try:
                     print("Attempting fallback response generation...")
                     formatted_fallback_prompt = FALLBACK_PROMPT.format(user_input=user_input)
-                    fallback_response = self.llm.predict(formatted_fallback_prompt)
+                    fallback_response = self._invoke_llm(formatted_fallback_prompt, deadline, stage="fallback")
                     
                     # Manually add the response to memory
                     self.memory.chat_memory.add_ai_message(fallback_response)
@@ -1048,7 +1464,9 @@ class Conversation:
             error_msg = str(e)
             print(f"Error in conversation processing: {error_msg}")
             
-            if "timeout" in error_msg.lower():
+            if isinstance(e, CircuitOpenError):
+                return "I'm having trouble connecting right now. Please give me a moment and try again."
+            if isinstance(e, DeadlineExceeded) or "timeout" in error_msg.lower():
                 return "I'm taking too long to respond. Let's try a different approach."
                 
             return "I'm having trouble processing that request. Let's try again." 
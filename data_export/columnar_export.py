@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Columnar (Parquet / Arrow IPC) export of conversations for analytics
+Used by export_conversations.py --format parquet|arrow
+
+Writes two tables with typed columns next to the output path:
+- <base>.sessions.<ext>: one row per session (status, rating, duration, round
+  count, message counts and lengths, timestamps)
+- <base>.messages.<ext>: one row per message (sender, position, text, length)
+
+Rows are buffered per table and written as one record batch (a Parquet row
+group) every row_group_size rows, so memory stays bounded by the batch size
+rather than the export size.
+
+Requires pyarrow (pip install pyarrow), which is optional for the rest of the project.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+DEFAULT_ROW_GROUP_SIZE = 65536  # Rows per record batch / Parquet row group
+
+
+def session_schema() -> "pa.Schema":
+    return pa.schema([
+        ("session_id", pa.string()),
+        ("user_id", pa.string()),
+        ("status", pa.dictionary(pa.int8(), pa.string())),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("ended_at", pa.timestamp("us", tz="UTC")),
+        ("duration_seconds", pa.int32()),
+        ("rating", pa.int8()),
+        ("message_count", pa.int32()),
+        ("rounds", pa.int32()),
+        ("user_messages", pa.int32()),
+        ("ai_messages", pa.int32()),
+        ("user_chars", pa.int64()),
+        ("ai_chars", pa.int64()),
+    ])
+
+
+def message_schema() -> "pa.Schema":
+    return pa.schema([
+        ("session_id", pa.string()),
+        ("position", pa.int32()),
+        ("sender", pa.dictionary(pa.int8(), pa.string())),
+        ("text_content", pa.string()),
+        ("text_length", pa.int32()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO timestamp as stored by Supabase ('+00:00') or SQLite ('Z')"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def columnar_paths(output_file: str, format_type: str) -> Tuple[str, str]:
+    """Return the (sessions, messages) table paths for an output path"""
+    extension = COLUMNAR_FORMATS[format_type]
+    base_path = output_file[:-len(extension)] if output_file.endswith(extension) else output_file
+    return f"{base_path}.sessions{extension}", f"{base_path}.messages{extension}"
+
+
+class _TableWriter:
+    """Buffers rows of one table column by column and writes them a record batch at a time"""
+
+    def __init__(self, path: str, schema: "pa.Schema", format_type: str, row_group_size: int):
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._columns: Dict[str, List[Any]] = {name: [] for name in schema.names}
+        if format_type == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(path, schema)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        self.rows += 1
+        if len(self._columns["session_id"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._columns["session_id"]:
+            return
+        batch = pa.record_batch(
+            [pa.array(self._columns[field.name], type=field.type) for field in self.schema],
+            schema=self.schema
+        )
+        if isinstance(self._writer, pq.ParquetWriter):
+            self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_batch(batch)
+        self._columns = {name: [] for name in self.schema.names}
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+
+class ColumnarExportWriter:
+    """Streams conversations into the sessions and messages tables"""
+
+    def __init__(self, output_file: str, format_type: str = "parquet",
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        """
+        Args:
+            output_file: Output path; the table paths are derived from it (see columnar_paths)
+            format_type: 'parquet' or 'arrow' (Arrow IPC file)
+            row_group_size: Rows per record batch / Parquet row group
+
+        Raises:
+            RuntimeError: If pyarrow is not installed
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("The parquet and arrow formats need pyarrow: pip install pyarrow")
+        self.sessions_path, self.messages_path = columnar_paths(output_file, format_type)
+        self.sessions = _TableWriter(self.sessions_path, session_schema(), format_type, row_group_size)
+        self.messages = _TableWriter(self.messages_path, message_schema(), format_type, row_group_size)
+
+    def write(self, session: Dict[str, Any], messages: List[Dict[str, Any]]) -> None:
+        """Append one session and its messages (sorted by creation time)"""
+        counts = {"user": [0, 0], "ai": [0, 0]}
+        for position, msg in enumerate(sorted(messages, key=lambda x: x['created_at'])):
+            text = msg['text_content'] or ""
+            sender = "user" if msg['sender'] == 'user' else "ai"
+            counts[sender][0] += 1
+            counts[sender][1] += len(text)
+            self.messages.append({
+                "session_id": session['session_id'],
+                "position": position,
+                "sender": msg['sender'],
+                "text_content": text,
+                "text_length": len(text),
+                "created_at": parse_timestamp(msg['created_at'])
+            })
+
+        self.sessions.append({
+            "session_id": session['session_id'],
+            "user_id": session.get('user_id'),
+            "status": session.get('status'),
+            "created_at": parse_timestamp(session.get('created_at')),
+            "ended_at": parse_timestamp(session.get('ended_at')),
+            "duration_seconds": session.get('duration_seconds'),
+            "rating": session.get('rating'),
+            "message_count": session.get('message_count'),
+            "rounds": min(counts["user"][0], counts["ai"][0]),
+            "user_messages": counts["user"][0],
+            "ai_messages": counts["ai"][0],
+            "user_chars": counts["user"][1],
+            "ai_chars": counts["ai"][1]
+        })
+
+    def close(self) -> None:
+        self.sessions.close()
+        self.messages.close()
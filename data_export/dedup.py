@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for exported training data (MinHash + LSH)
+Usage: python dedup.py input.jsonl [-o output.jsonl] [--threshold 0.85]
+
+Used as a stage of export_conversations.py --dedup and of the RLHF annotator
+export, and as a standalone tool for existing JSONL datasets (evaluation
+exports, annotator supervised/DPO exports).
+
+Each example is reduced to its conversational text (system prompts and
+unchanged history are left out), normalized and split into word shingles.
+A MinHash signature is computed with NumPy for all permutations at once,
+and locality-sensitive hashing over signature bands finds candidate pairs,
+which are kept or dropped by their estimated Jaccard similarity. The first
+occurrence of every group of near-duplicates is kept.
+
+Requires numpy.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+DEFAULT_THRESHOLD = 0.85  # Estimated Jaccard similarity at or above which examples are duplicates
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 5  # Words per shingle
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def example_text(example: Dict[str, Any]) -> str:
+    """
+    Return the text of an example that decides whether it duplicates another
+
+    Understands the export formats (full, turn-by-turn) and the annotator
+    formats (supervised messages, DPO). System prompts are left out, and for a
+    turn-by-turn example only its exchange (last user message and output) counts,
+    so consecutive turns of one session are not mistaken for duplicates.
+    """
+    def contents(messages: Iterable[Dict[str, Any]]) -> List[str]:
+        return [str(m.get("content") or m.get("text") or "") for m in messages if m.get("role") != "system"]
+
+    if "messages" in example:  # Annotator supervised
+        return "\n".join(contents(example["messages"]))
+    if isinstance(example.get("input"), dict):  # Annotator DPO
+        return "\n".join(contents(example["input"].get("messages", [])) + contents(example.get("preferred_output", [])))
+    if isinstance(example.get("output"), str):  # Turn-by-turn
+        return "\n".join(contents(example.get("input", [])[-1:]) + [example["output"]])
+    # Full conversation
+    output = [choice["message"]["content"] for choice in example.get("output", {}).get("choices", [])]
+    return "\n".join(contents(example.get("input", [])) + output)
+
+
+def shingle_hashes(text: str, shingle_size: int = DEFAULT_SHINGLE_SIZE) -> List[int]:
+    """32-bit hashes of the word shingles of the lowercased text (one shingle if it is shorter)"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= shingle_size:
+        return [zlib.crc32(" ".join(words).encode("utf-8"))]
+    return list({zlib.crc32(" ".join(words[i:i + shingle_size]).encode("utf-8"))
+                 for i in range(len(words) - shingle_size + 1)})
+
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Choose (bands, rows per band) so that pairs around threshold similarity become candidates
+
+    A pair with Jaccard similarity s shares at least one band with probability
+    1 - (1 - s^rows)^bands, which rises steeply around (1 / bands)^(1 / rows).
+    The split whose rise point is closest below threshold is used, so few true
+    duplicates are missed; candidates are checked against threshold anyway.
+    """
+    best = None
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        rise = (1 / bands) ** (1 / rows)
+        if rise <= threshold and (best is None or rise > best[0]):
+            best = (rise, bands, rows)
+    return (best[1], best[2]) if best else (num_perm, 1)
+
+
+class Deduplicator:
+    """Streaming MinHash/LSH near-duplicate filter; keeps the first of every group of near-duplicates"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = 1):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity at or above which an example is a duplicate
+            num_perm: MinHash permutations (signature length)
+            shingle_size: Words per shingle
+            seed: Seed of the permutations
+
+        Raises:
+            RuntimeError: If numpy is not installed
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("Deduplication needs numpy: pip install numpy")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+
+        rng = np.random.RandomState(seed)
+        # Universal hashing (a * x + b) mod p; a, b < 2^32 and x < 2^32 cannot overflow uint64
+        self._a = rng.randint(1, _MAX_HASH, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.randint(0, _MAX_HASH, size=(num_perm, 1), dtype=np.uint64)
+
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List["np.ndarray"] = []
+        self._exact: set = set()
+        self.seen = 0
+        self.removed = 0
+        self.exact_removed = 0
+
+    def signatures(self, texts: List[str]) -> "np.ndarray":
+        """
+        MinHash signatures of texts, shape (len(texts), num_perm)
+
+        The shingle hashes of all texts are permuted in one vectorized operation and
+        reduced per text with np.minimum.reduceat.
+        """
+        shingles = [shingle_hashes(text, self.shingle_size) for text in texts]
+        offsets = np.cumsum([0] + [len(s) for s in shingles[:-1]])
+        hashes = np.fromiter((h for s in shingles for h in s), dtype=np.uint64)
+        permuted = ((self._a * hashes + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return np.minimum.reduceat(permuted, offsets, axis=1).T.astype(np.uint32)
+
+    def _band_keys(self, signature: "np.ndarray") -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, text: str, signature: Optional["np.ndarray"] = None) -> bool:
+        """
+        Check one example against the ones kept so far and keep it if it is new
+
+        Returns:
+            bool: True if the example is a duplicate (and was not kept)
+        """
+        self.seen += 1
+        digest = hashlib.sha1(" ".join(_WORD_PATTERN.findall(text.lower())).encode("utf-8")).digest()
+        if digest in self._exact:
+            self.removed += 1
+            self.exact_removed += 1
+            return True
+
+        if signature is None:
+            signature = self.signatures([text])[0]
+        keys = self._band_keys(signature)
+        candidates = {index for band, key in enumerate(keys) for index in self._buckets[band].get(key, ())}
+        for index in candidates:
+            if np.count_nonzero(self._signatures[index] == signature) >= self.threshold * self.num_perm:
+                self.removed += 1
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        self._exact.add(digest)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(index)
+        return False
+
+    def filter(self, examples: Iterable[Any], text: Callable[[Any], str] = example_text,
+               batch_size: int = 1000) -> Iterator[Any]:
+        """Yield the examples that are not near-duplicates of an earlier one, computing signatures in batches"""
+        batch = []
+        for example in examples:
+            batch.append(example)
+            if len(batch) == batch_size:
+                yield from self._filter_batch(batch, text)
+                batch = []
+        if batch:
+            yield from self._filter_batch(batch, text)
+
+    def _filter_batch(self, batch: List[Any], text: Callable[[Any], str]) -> Iterator[Any]:
+        texts = [text(example) for example in batch]
+        for example, content, signature in zip(batch, texts, self.signatures(texts)):
+            if not self.add(content, signature):
+                yield example
+
+    def report(self) -> str:
+        return (f"Removed {self.removed} of {self.seen} examples as duplicates "
+                f"({self.exact_removed} exact, {self.removed - self.exact_removed} near-duplicate)")
+
+
+def deduplicate(examples: List[Any], threshold: float = DEFAULT_THRESHOLD,
+                text: Callable[[Any], str] = example_text) -> Tuple[List[Any], int]:
+    """Return the examples without near-duplicates and the number removed"""
+    deduplicator = Deduplicator(threshold)
+    kept = list(deduplicator.filter(examples, text))
+    return kept, deduplicator.removed
+
+
+def main():
+    """Main function with command line interface"""
+    parser = argparse.ArgumentParser(description="Remove near-duplicate examples from a JSONL dataset")
+    parser.add_argument("input_file", help="JSONL file (export or annotator supervised/DPO export)")
+    parser.add_argument("-o", "--output", help="Output file (default: <input>.dedup.jsonl)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Similarity at or above which examples are duplicates (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM,
+                        help=f"MinHash permutations (default: {DEFAULT_NUM_PERM})")
+    parser.add_argument("--shingle-size", type=int, default=DEFAULT_SHINGLE_SIZE,
+                        help=f"Words per shingle (default: {DEFAULT_SHINGLE_SIZE})")
+    args = parser.parse_args()
+
+    output_file = args.output or args.input_file.rsplit(".", 1)[0] + ".dedup.jsonl"
+    deduplicator = Deduplicator(args.threshold, args.num_perm, args.shingle_size)
+    with open(args.input_file, "r", encoding="utf-8") as source, open(output_file, "w", encoding="utf-8") as target:
+        examples = (json.loads(line) for line in source if line.strip())
+        for example in deduplicator.filter(examples):
+            target.write(json.dumps(example, ensure_ascii=False) + "\n")
+
+    print(f"🧹 {deduplicator.report()}")
+    print(f"📄 Wrote {deduplicator.seen - deduplicator.removed} examples to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,129 @@ Usage: python export_conversations.py [options]
 Supported formats:
 - full: Complete conversation as single training example (JSONL)
 - turn-by-turn: Each user-AI exchange as separate example (JSONL) 
+- turn-by-turn-ref: Same examples, each message stored once (compact JSONL, see prefix_reference.py)
 - txt: Human-readable format for annotation (TXT)
+- parquet / arrow: Sessions and messages tables with typed columns for analytics (needs pyarrow)
 """
 
 import argparse
 import json
 import os
 import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database_service import db_service
+from pagination import DEFAULT_SESSION_PAGE_SIZE
 from config import SYSTEM_PROMPT
+from dedup import DEFAULT_THRESHOLD, Deduplicator, example_text
+from columnar_export import COLUMNAR_FORMATS, ColumnarExportWriter
+from export_manifest import EXPORT_SHARD_SIZE, ExportManifest, ShardWriter, content_hash
+from prefix_reference import PrefixReferenceEncoder
+from output_streams import BUNDLE_FORMATS, COMPRESSION_EXTENSIONS, ShardedOutput, TxtBundle
+
+
+# Session columns each format needs; summaries and other large columns are only
+# read when the format writes them
+SESSION_COLUMNS_BY_FORMAT = {
+    "full": ["session_id", "message_count"],
+    "turn-by-turn": ["session_id", "message_count"],
+    "turn-by-turn-ref": ["session_id", "message_count"],
+    "txt": ["session_id", "summary"],
+    "parquet": ["session_id", "user_id", "status", "ended_at", "duration_seconds", "rating", "message_count"],
+    "arrow": ["session_id", "user_id", "status", "ended_at", "duration_seconds", "rating", "message_count"],
+}
+
+JSONL_FORMATS = ("full", "turn-by-turn", "turn-by-turn-ref")
+
+# Message columns every format needs
+MESSAGE_COLUMNS = ["session_id", "sender", "text_content", "created_at"]
+
+EXPORT_SESSION_BATCH_SIZE = 100  # Sessions whose messages are read with one IN (...) query
+EXPORT_FETCH_WORKERS = 4  # Message batches fetched concurrently
+EXPORT_FORMAT_BATCH_SIZE = 50  # Sessions per task handed to a formatting worker process
+EXPORT_PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+def date_range_filter(start_date: Optional[str], end_date: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Turn inclusive YYYY-MM-DD dates into the [created_after, created_before) range used by the query
+    
+    Raises:
+        ValueError: If a date is not in YYYY-MM-DD format
+    """
+    created_after = datetime.strptime(start_date, '%Y-%m-%d').strftime('%Y-%m-%d') if start_date else None
+    created_before = None
+    if end_date:
+        created_before = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    return created_after, created_before
+
+
+def iter_sessions(columns: List[str], page_size: int = DEFAULT_SESSION_PAGE_SIZE, **filters) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the sessions matching filters, newest first, one keyset page at a time
+    
+    Args:
+        columns: Session columns to read
+        page_size: Sessions per database round trip
+        **filters: status, min_rating, created_after, created_before, session_ids, changed_since
+    """
+    cursor = None
+    while True:
+        page = db_service.get_sessions_page(columns=columns, limit=page_size, after=cursor, **filters)
+        yield from page["sessions"]
+        if not page["has_more"]:
+            return
+        cursor = page["next_cursor"]
+
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to size consecutive items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fetch_conversations(sessions: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Read the messages of a batch of sessions with one bulk query and pair them with their session"""
+    rows = db_service.get_messages_for_sessions([session['id'] for session in sessions], columns=MESSAGE_COLUMNS)
+    messages_by_session: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        messages_by_session.setdefault(row['session_id'], []).append(row)
+    return [(session, messages_by_session.get(session['id'], [])) for session in sessions]
+
+
+def iter_conversations(
+    sessions: Iterable[Dict[str, Any]],
+    batch_size: int = EXPORT_SESSION_BATCH_SIZE,
+    workers: int = EXPORT_FETCH_WORKERS
+) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Yield (session, messages) for every session, in the order of sessions
+    
+    Messages are read in bulk, batch_size sessions per query, with up to workers
+    batches in flight at once; batches are yielded as soon as they are ready and
+    in order, so only a bounded number of conversations is held in memory.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in iter_batches(sessions, batch_size):
+            pending.append(pool.submit(fetch_conversations, batch))
+            if len(pending) >= workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
 
 
 def get_system_prompt_with_round(round_num: int = 1, max_rounds: int = 30) -> str:
@@ -206,6 +314,136 @@ def format_conversation_turn_by_turn(session_data: Dict[str, Any], messages: Lis
     return turn_examples
 
 
+def turn_pairs(messages: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Return the (user, coach) message texts of a conversation's proper user->AI exchanges, in order"""
+    messages.sort(key=lambda x: x['created_at'])
+    pairs = []
+    for i in range(0, len(messages) - 1, 2):
+        user_msg, ai_msg = messages[i], messages[i + 1]
+        if user_msg['sender'] == 'user' and ai_msg['sender'] == 'ai':
+            pairs.append((user_msg['text_content'], ai_msg['text_content']))
+    return pairs
+
+
+def encode_turn_lines(session_data: Dict[str, Any], messages: List[Dict[str, Any]]) -> List[str]:
+    """
+    Return the turn-by-turn JSONL lines of a conversation
+    
+    Produces exactly json.dumps(example, ensure_ascii=False) + '\\n' for every example of
+    format_conversation_turn_by_turn, without building each turn's input list: every
+    message is encoded once, and the encoded history prefix is extended turn by turn.
+    """
+    if len(messages) < 2:  # Need at least user message and AI response
+        return []
+    
+    round_count = session_data.get('message_count', len(messages) // 2)
+    system_prompt = get_system_prompt_with_round(round_count)
+    prefix = '{"input": [' + json.dumps({"role": "system", "content": system_prompt}, ensure_ascii=False)
+    
+    lines = []
+    for user_text, ai_text in turn_pairs(messages):
+        user = json.dumps({"role": "user", "content": user_text}, ensure_ascii=False)
+        lines.append(f'{prefix}, {user}], "output": {json.dumps(ai_text, ensure_ascii=False)}}}\n')
+        prefix = f'{prefix}, {user}, {json.dumps({"role": "assistant", "content": ai_text}, ensure_ascii=False)}'
+    return lines
+
+
+def format_session(
+    format_type: str,
+    session: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    min_messages: int,
+    dedup: bool = False
+) -> Dict[str, Any]:
+    """
+    Format one conversation for a JSONL format; runs in the formatting worker processes
+    
+    Returns:
+        Dict with session_id, message_count and skip (the reason it is not exported, or None);
+        the encoded lines, or for turn-by-turn-ref the turn pairs and system prompt; and with
+        dedup the texts to compare (one per line for turn-by-turn, one per session otherwise)
+    """
+    result = {"session_id": session['session_id'], "message_count": len(messages), "skip": None}
+    if len(messages) < min_messages:
+        result["skip"] = f"only {len(messages)} messages (min: {min_messages})"
+        return result
+    
+    if format_type == "full":
+        formatted_data = format_conversation_for_evaluation(session, messages)
+        if not formatted_data:
+            result["skip"] = "couldn't format for evaluation"
+            return result
+        result["lines"] = [json.dumps(formatted_data, ensure_ascii=False) + '\n']
+        texts = lambda: [example_text(formatted_data)]
+    elif format_type == "turn-by-turn":
+        result["lines"] = encode_turn_lines(session, messages)
+        texts = lambda: [f"{user_text}\n{ai_text}" for user_text, ai_text in turn_pairs(messages)]
+    else:
+        pairs = turn_pairs(messages)
+        result["pairs"] = pairs
+        result["system_prompt"] = get_system_prompt_with_round(session.get('message_count', len(messages) // 2))
+        texts = lambda: ["\n".join(text for pair in pairs for text in pair)]
+    
+    if not (result.get("lines") or result.get("pairs")):
+        result["skip"] = "couldn't generate turns"
+    elif dedup:
+        result["texts"] = texts()
+    return result
+
+
+def format_batch(task: Tuple[str, int, bool, List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]]) -> List[Dict[str, Any]]:
+    """Format a batch of (session, messages) in a worker process (see format_session)"""
+    format_type, min_messages, dedup, batch = task
+    return [format_session(format_type, session, messages, min_messages, dedup) for session, messages in batch]
+
+
+def format_conversations(
+    conversations: Iterable[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+    format_type: str,
+    min_messages: int,
+    dedup: bool = False,
+    workers: int = 1,
+    batch_size: int = EXPORT_FORMAT_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield format_session results for the conversations, in their order
+    
+    With workers > 1, batches of batch_size conversations are formatted by a process
+    pool while the fetch stage keeps reading; at most 2 batches per worker are in flight
+    and results are yielded in submission order, so the output does not depend on workers.
+    """
+    if workers <= 1:
+        for session, messages in conversations:
+            yield format_session(format_type, session, messages, min_messages, dedup)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in iter_batches(conversations, batch_size):
+            pending.append(pool.submit(format_batch, (format_type, min_messages, dedup, batch)))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class ExportProgress:
+    """Prints sessions processed, records written and throughput every interval seconds"""
+    
+    def __init__(self, interval: float = EXPORT_PROGRESS_INTERVAL_SECONDS):
+        self.interval = interval
+        self.started = time.monotonic()
+        self._last_report = self.started
+    
+    def update(self, sessions: int, records: int) -> None:
+        now = time.monotonic()
+        if now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        rate = sessions / max(now - self.started, 1e-9)
+        print(f"⏳ {sessions:,} sessions processed, {records:,} records written ({rate:,.0f} sessions/s)")
+
+
 def export_conversations(
     output_file: str,
     format_type: str = "full",
@@ -214,154 +452,192 @@ def export_conversations(
     session_ids: Optional[List[str]] = None,
     min_rating: Optional[int] = None,
     status: Optional[str] = None,
-    min_messages: int = 4
+    min_messages: int = 4,
+    batch_size: int = EXPORT_SESSION_BATCH_SIZE,
+    fetch_workers: int = EXPORT_FETCH_WORKERS,
+    compression: str = "none",
+    shard_records: Optional[int] = None,
+    shard_bytes: Optional[int] = None,
+    bundle: Optional[str] = None,
+    dedup_threshold: Optional[float] = None,
+    workers: int = 1
 ) -> None:
     """
     Export conversations from Supabase in multiple formats
     
     Args:
         output_file: Path to output file
-        format_type: Export format ('full', 'turn-by-turn', 'txt')
+        format_type: Export format ('full', 'turn-by-turn', 'turn-by-turn-ref', 'txt', 'parquet', 'arrow')
         start_date: Start date filter (YYYY-MM-DD)
         end_date: End date filter (YYYY-MM-DD)
         session_ids: List of specific session IDs to export
         min_rating: Minimum session rating filter
         status: Session status filter ('active' or 'ended')
         min_messages: Minimum number of messages required
+        batch_size: Sessions whose messages are read with one query
+        fetch_workers: Message batches fetched concurrently
+        compression: Compression of the JSONL output or tar bundle ('none', 'gzip', 'zstd')
+        shard_records: Split the JSONL output into shards of at most this many records
+        shard_bytes: Split the JSONL output into shards of at most this many (uncompressed) bytes
+        bundle: Write the TXT files into one 'tar' or 'zip' archive instead of separate files
+        dedup_threshold: Drop JSONL examples at least this similar to an earlier one (MinHash
+            estimate of Jaccard similarity; per exchange for turn-by-turn, per session otherwise)
+        workers: Processes formatting JSONL sessions in parallel (1 formats in this process)
     """
     try:
-        print("🔍 Fetching sessions from Supabase...")
-        
-        # Get all sessions first
-        all_sessions = db_service.debug_get_all_sessions()
-        
-        if not all_sessions:
-            print("❌ No sessions found in database")
-            return
-        
-        print(f"📊 Found {len(all_sessions)} total sessions")
-        
-        # Apply filters
-        filtered_sessions = []
-        
-        for session in all_sessions:
-            # Filter by session IDs
-            if session_ids and session['session_id'] not in session_ids:
-                continue
-            
-            # Filter by status
-            if status and session['status'] != status:
-                continue
-            
-            # Filter by rating
-            if min_rating and (not session.get('rating') or session['rating'] < min_rating):
-                continue
-            
-            # Filter by date range
-            if start_date:
-                session_date = datetime.fromisoformat(session['created_at'].replace('Z', '+00:00'))
-                start_dt = datetime.fromisoformat(start_date + 'T00:00:00+00:00')
-                if session_date < start_dt:
-                    continue
-            
-            if end_date:
-                session_date = datetime.fromisoformat(session['created_at'].replace('Z', '+00:00'))
-                end_dt = datetime.fromisoformat(end_date + 'T23:59:59+00:00')
-                if session_date > end_dt:
-                    continue
-            
-            filtered_sessions.append(session)
+        print("🔍 Fetching matching sessions from the database...")
         
-        print(f"📋 {len(filtered_sessions)} sessions match filters")
+        # Filters are applied by the database; sessions are streamed page by page
+        created_after, created_before = date_range_filter(start_date, end_date)
+        filtered_sessions = iter_sessions(
+            SESSION_COLUMNS_BY_FORMAT[format_type],
+            status=status,
+            min_rating=min_rating,
+            created_after=created_after,
+            created_before=created_before,
+            session_ids=session_ids
+        )
+        conversations = iter_conversations(filtered_sessions, batch_size=batch_size, workers=fetch_workers)
         
         # Export conversations
+        matched_count = 0
         exported_count = 0
         skipped_count = 0
         total_examples = 0  # For turn-by-turn format
         created_files = []  # For TXT format file tracking
+        deduplicator = Deduplicator(dedup_threshold) if dedup_threshold and format_type in JSONL_FORMATS else None
         
-        # Handle TXT format differently (separate files per session)
+        # Handle TXT format differently (separate files per session, or one archive)
         if format_type == "txt":
-            for session in filtered_sessions:
-                session_id = session['session_id']
-                print(f"🔄 Processing session: {session_id}")
-                
-                # Get conversation history
-                messages = db_service.get_conversation_history(session_id)
-                
-                if len(messages) < min_messages:
-                    print(f"⏭️  Skipping {session_id}: only {len(messages)} messages (min: {min_messages})")
-                    skipped_count += 1
-                    continue
-                
-                # Generate individual filename for this session
-                individual_filename = generate_txt_filename(output_file, session_id)
-                
-                # Text format for annotation - individual file
-                formatted_text = format_conversation_for_annotation(session, messages)
-                if formatted_text:
-                    with open(individual_filename, 'w', encoding='utf-8') as session_file:
-                        session_file.write(formatted_text)
-                    created_files.append(individual_filename)
-                    exported_count += 1
-                    print(f"✅ Exported {session_id} ({len(messages)} messages) → {individual_filename}")
-                else:
-                    print(f"⏭️  Skipped {session_id}: couldn't format for annotation")
-                    skipped_count += 1
-        
-        else:
-            # Handle JSONL formats (full and turn-by-turn) - single file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                for session in filtered_sessions:
+            txt_bundle = TxtBundle(output_file, bundle, compression) if bundle else None
+            try:
+                for session, messages in conversations:
+                    matched_count += 1
                     session_id = session['session_id']
                     print(f"🔄 Processing session: {session_id}")
                     
-                    # Get conversation history
-                    messages = db_service.get_conversation_history(session_id)
-                    
                     if len(messages) < min_messages:
                         print(f"⏭️  Skipping {session_id}: only {len(messages)} messages (min: {min_messages})")
                         skipped_count += 1
                         continue
                     
-                    # Format based on requested format type
-                    if format_type == "full":
-                        # Full conversation format (existing)
-                        formatted_data = format_conversation_for_evaluation(session, messages)
-                        if formatted_data:
-                            f.write(json.dumps(formatted_data, ensure_ascii=False) + '\n')
-                            exported_count += 1
-                            print(f"✅ Exported {session_id} ({len(messages)} messages)")
+                    # Generate individual filename for this session
+                    individual_filename = generate_txt_filename(output_file, session_id)
+                    
+                    # Text format for annotation - individual file
+                    formatted_text = format_conversation_for_annotation(session, messages)
+                    if formatted_text:
+                        if txt_bundle:
+                            individual_filename = os.path.basename(individual_filename)
+                            txt_bundle.add(individual_filename, formatted_text)
                         else:
-                            print(f"⏭️  Skipped {session_id}: couldn't format for evaluation")
-                            skipped_count += 1
+                            with open(individual_filename, 'w', encoding='utf-8') as session_file:
+                                session_file.write(formatted_text)
+                        created_files.append(individual_filename)
+                        exported_count += 1
+                        print(f"✅ Exported {session_id} ({len(messages)} messages) → {individual_filename}")
+                    else:
+                        print(f"⏭️  Skipped {session_id}: couldn't format for annotation")
+                        skipped_count += 1
+            finally:
+                if txt_bundle:
+                    txt_bundle.close()
+        
+        elif format_type in COLUMNAR_FORMATS:
+            # Columnar tables for analytics; every message is kept, nothing is reformatted
+            writer = ColumnarExportWriter(output_file, format_type)
+            try:
+                for session, messages in conversations:
+                    matched_count += 1
+                    session_id = session['session_id']
+                    
+                    if len(messages) < min_messages:
+                        print(f"⏭️  Skipping {session_id}: only {len(messages)} messages (min: {min_messages})")
+                        skipped_count += 1
+                        continue
+                    
+                    writer.write(session, messages)
+                    exported_count += 1
+            finally:
+                writer.close()
+        
+        else:
+            # Handle JSONL formats (full and turn-by-turn) - single file or shards
+            # Sessions are formatted in order (or by a pool of worker processes) and written here
+            # in the same order, so deduplication and prompt ids do not depend on the worker count
+            prefix_encoder = PrefixReferenceEncoder()
+            progress = ExportProgress()
+            formatted = format_conversations(conversations, format_type, min_messages,
+                                             dedup=deduplicator is not None, workers=workers)
+            with ShardedOutput(output_file, compression, shard_records, shard_bytes) as output:
+                for result in formatted:
+                    matched_count += 1
+                    progress.update(matched_count, output.records)
+                    session_id = result['session_id']
+                    print(f"🔄 Processing session: {session_id}")
+                    
+                    if result['skip']:
+                        print(f"⏭️  Skipped {session_id}: {result['skip']}")
+                        skipped_count += 1
+                        continue
                     
-                    elif format_type == "turn-by-turn":
-                        # Turn-by-turn format for OpenAI evaluation
-                        turn_examples = format_conversation_turn_by_turn(session, messages)
-                        if turn_examples:
-                            for turn_example in turn_examples:
-                                f.write(json.dumps(turn_example, ensure_ascii=False) + '\n')
-                            exported_count += 1
-                            total_examples += len(turn_examples)
-                            print(f"✅ Exported {session_id} ({len(turn_examples)} turns from {len(messages)} messages)")
+                    lines = result.get('lines')
+                    if deduplicator:
+                        if format_type == "turn-by-turn":
+                            # Each exchange is checked on its own
+                            lines = [line for line, text in zip(lines, result['texts']) if not deduplicator.add(text)]
+                            duplicate = not lines
                         else:
-                            print(f"⏭️  Skipped {session_id}: couldn't generate turns")
+                            duplicate = deduplicator.add(result['texts'][0])
+                        if duplicate:
+                            print(f"🧹 Skipped {session_id}: near-duplicate of an earlier conversation")
                             skipped_count += 1
+                            continue
+                    
+                    if format_type == "turn-by-turn-ref":
+                        # Compact variant: the prompt and every message are written once
+                        lines = prefix_encoder.encode(session_id, result['system_prompt'], result['pairs'])
+                        if output.starts_new_shard(lines):
+                            # Every shard defines the prompts it uses, so it can be loaded on its own
+                            prefix_encoder = PrefixReferenceEncoder()
+                            lines = prefix_encoder.encode(session_id, result['system_prompt'], result['pairs'])
+                        turn_count = len(result['pairs'])
+                    else:
+                        turn_count = len(lines)
+                    output.write(session_id, lines)
+                    exported_count += 1
+                    if format_type == "full":
+                        print(f"✅ Exported {session_id} ({result['message_count']} messages)")
+                    else:
+                        total_examples += turn_count
+                        print(f"✅ Exported {session_id} ({turn_count} turns from {result['message_count']} messages)")
+        
+        if matched_count == 0:
+            print("❌ No sessions match the filters")
+            return
         
         # Print completion summary
-        print(f"\n🎉 Export complete!")
-        if format_type == "txt":
+        print(f"\n📋 {matched_count} sessions matched filters")
+        print(f"🎉 Export complete!")
+        if format_type == "txt" and bundle:
+            print(f"📄 Exported {exported_count} conversations as {len(created_files)} files in {txt_bundle.path}")
+        elif format_type == "txt":
             print(f"📄 Exported {exported_count} conversations to {len(created_files)} separate files:")
             for filename in created_files[:5]:  # Show first 5 files
                 print(f"   - {filename}")
             if len(created_files) > 5:
                 print(f"   ... and {len(created_files) - 5} more files")
-        elif format_type == "turn-by-turn":
-            print(f"📄 Exported {exported_count} conversations ({total_examples} total turns) to {output_file}")
+        elif format_type in ("turn-by-turn", "turn-by-turn-ref"):
+            print(f"📄 Exported {exported_count} conversations ({total_examples} total turns) to {describe_output(output)}")
+        elif format_type in COLUMNAR_FORMATS:
+            print(f"📄 Exported {exported_count} conversations ({writer.messages.rows} messages) to:")
+            print(f"   - {writer.sessions_path}")
+            print(f"   - {writer.messages_path}")
         else:
-            print(f"📄 Exported {exported_count} conversations to {output_file}")
+            print(f"📄 Exported {exported_count} conversations to {describe_output(output)}")
         print(f"⏭️  Skipped {skipped_count} conversations")
+        if deduplicator:
+            print(f"🧹 {deduplicator.report()}")
         
     except Exception as e:
         print(f"❌ Error during export: {e}")
@@ -369,6 +645,140 @@ def export_conversations(
         traceback.print_exc()
 
 
+def format_jsonl_lines(format_type: str, session: Dict[str, Any], messages: List[Dict[str, Any]]) -> List[str]:
+    """Return the JSONL lines of one conversation ('full' or 'turn-by-turn'), or [] if it can't be formatted"""
+    if format_type == "full":
+        formatted_data = format_conversation_for_evaluation(session, messages)
+        return [json.dumps(formatted_data, ensure_ascii=False) + '\n'] if formatted_data else []
+    return encode_turn_lines(session, messages)
+
+
+def export_incremental(
+    output_file: str,
+    format_type: str = "full",
+    manifest_path: Optional[str] = None,
+    shard_size: int = EXPORT_SHARD_SIZE,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    session_ids: Optional[List[str]] = None,
+    min_rating: Optional[int] = None,
+    status: Optional[str] = None,
+    min_messages: int = 4,
+    batch_size: int = EXPORT_SESSION_BATCH_SIZE,
+    fetch_workers: int = EXPORT_FETCH_WORKERS
+) -> Dict[str, int]:
+    """
+    Export only the sessions that are new or changed since the previous run
+    
+    Output goes to JSONL shards next to output_file (out.jsonl -> out-00001.jsonl, ...),
+    and a manifest (out.manifest.json by default) records the watermark and, per
+    session, its ended_at, message_count, content hash and shard location. The
+    first run exports every matching session; later runs read only sessions created
+    or updated since the watermark and append those whose content changed, then
+    rewrite the shards that held their previous lines (see ExportManifest.compact).
+    
+    Args:
+        output_file: Base path of the output shards (.jsonl)
+        format_type: Export format ('full' or 'turn-by-turn')
+        manifest_path: Path of the manifest (default: <output base>.manifest.json)
+        shard_size: JSONL lines per shard
+        start_date, end_date, session_ids, min_rating, status, min_messages: As for export_conversations
+        batch_size: Sessions whose messages are read with one query
+        fetch_workers: Message batches fetched concurrently
+    
+    Returns:
+        Dict with the exported, unchanged and skipped session counts of this run
+    
+    Raises:
+        ValueError: For the txt format, or if the manifest belongs to a different export
+    """
+    if format_type not in ("full", "turn-by-turn"):
+        raise ValueError("Incremental exports support the JSONL formats (full, turn-by-turn) only")
+    
+    base_path = output_file[:-len('.jsonl')] if output_file.endswith('.jsonl') else output_file
+    manifest_path = manifest_path or f"{base_path}.manifest.json"
+    filters = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "session_ids": session_ids,
+        "min_rating": min_rating,
+        "status": status,
+        "min_messages": min_messages
+    }
+    manifest = ExportManifest.load(manifest_path, format_type, filters)
+    shard_directory = os.path.dirname(os.path.abspath(base_path))
+    if manifest.complete_compaction(shard_directory):
+        # The previous run stopped after saving its manifest but before replacing the shards
+        manifest.save()
+    started_at = datetime.utcnow()
+    print(f"🔍 Fetching sessions changed since {manifest.watermark or 'the beginning'}...")
+    
+    created_after, created_before = date_range_filter(start_date, end_date)
+    sessions = iter_sessions(
+        SESSION_COLUMNS_BY_FORMAT[format_type] + ["ended_at"],
+        status=status,
+        min_rating=min_rating,
+        created_after=created_after,
+        created_before=created_before,
+        session_ids=session_ids,
+        changed_since=manifest.watermark
+    )
+    stats = {"exported": 0, "unchanged": 0, "skipped": 0}
+    
+    def changed_sessions() -> Iterator[Dict[str, Any]]:
+        # Sessions updated inside the watermark overlap are usually already exported
+        for session in sessions:
+            if manifest.is_unchanged(session):
+                stats["unchanged"] += 1
+            else:
+                yield session
+    
+    writer = ShardWriter(base_path, manifest.data["shards"], shard_size)
+    try:
+        for session, messages in iter_conversations(changed_sessions(), batch_size=batch_size, workers=fetch_workers):
+            session_id = session['session_id']
+            lines = format_jsonl_lines(format_type, session, messages) if len(messages) >= min_messages else []
+            if not lines:
+                stats["skipped"] += 1
+                continue
+            
+            lines_hash = content_hash(lines)
+            entry = manifest.entry(session_id)
+            if entry is not None and entry["content_hash"] == lines_hash:
+                manifest.record(session, lines_hash, None)
+                stats["unchanged"] += 1
+                continue
+            
+            manifest.record(session, lines_hash, writer.write(lines))
+            stats["exported"] += 1
+            print(f"✅ Exported {session_id} ({len(lines)} records from {len(messages)} messages)")
+    finally:
+        writer.close()
+    
+    # The manifest is saved only after the shards are on disk; lines of a run that
+    # fails before this point are truncated away by the next one
+    dropped = manifest.compact(shard_directory)
+    manifest.finish_run(started_at, stats)
+    manifest.save()
+    if manifest.complete_compaction(shard_directory):
+        manifest.save()
+    
+    print(f"\n🎉 Incremental export complete!")
+    print(f"📄 Exported {stats['exported']} new or changed conversations to {len(manifest.data['shards'])} shard(s) of {base_path}")
+    print(f"⏭️  {stats['unchanged']} unchanged, {stats['skipped']} skipped")
+    if dropped:
+        print(f"🧹 Removed {dropped} outdated line(s) of changed conversations from their shards")
+    print(f"🗂️  Manifest: {manifest_path}")
+    return stats
+
+
+def describe_output(output: ShardedOutput) -> str:
+    """Name the file(s) a JSONL export was written to"""
+    if not output.sharded:
+        return output.paths[0]
+    return f"{len(output.paths)} shards ({os.path.basename(output.paths[0])}, ...), index {output.index_path}"
+
+
 def generate_txt_filename(base_output_file: str, session_id: str) -> str:
     """Generate individual filename for TXT format using session ID"""
     # Split the filename into base and extension
@@ -386,6 +796,10 @@ def detect_format_from_filename(filename: str) -> str:
         return 'txt'
     elif filename.endswith('.jsonl'):
         return 'full'  # Default JSONL format
+    elif filename.endswith('.parquet'):
+        return 'parquet'
+    elif filename.endswith('.arrow'):
+        return 'arrow'
     else:
         return 'full'  # Default format
 
@@ -398,18 +812,21 @@ def main():
 Format options:
   full        Complete conversation as single training example (JSONL)
   turn-by-turn  Each user-AI exchange as separate example (JSONL)
+  turn-by-turn-ref  Same examples with each message stored once (compact JSONL)
   txt         Human-readable format for annotation (TXT)
+  parquet     Sessions and messages tables for analytics (Parquet, needs pyarrow)
+  arrow       Same tables as Arrow IPC files (needs pyarrow)
         """
     )
     
     parser.add_argument(
         "output_file",
-        help="Output file path (.jsonl or .txt)"
+        help="Output file path (.jsonl, .txt, .parquet or .arrow)"
     )
     
     parser.add_argument(
         "--format",
-        choices=["full", "turn-by-turn", "txt"],
+        choices=["full", "turn-by-turn", "turn-by-turn-ref", "txt", "parquet", "arrow"],
         help="Export format (auto-detected from file extension if not specified)"
     )
     
@@ -449,6 +866,83 @@ Format options:
         help="Minimum number of messages required (default: 4)"
     )
     
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EXPORT_SESSION_BATCH_SIZE,
+        help=f"Sessions whose messages are read with one query (default: {EXPORT_SESSION_BATCH_SIZE})"
+    )
+    
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=EXPORT_FETCH_WORKERS,
+        help=f"Message batches fetched concurrently (default: {EXPORT_FETCH_WORKERS})"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes formatting JSONL sessions in parallel; 0 uses every core (default: 1)"
+    )
+    
+    parser.add_argument(
+        "--compress",
+        choices=sorted(COMPRESSION_EXTENSIONS),
+        default="none",
+        help="Compress the JSONL output or the --bundle archive (zstd needs zstandard; default: none)"
+    )
+    
+    parser.add_argument(
+        "--shard-records",
+        type=int,
+        help="Split the JSONL output into shards of at most N records, with an index file"
+    )
+    
+    parser.add_argument(
+        "--shard-bytes",
+        type=int,
+        help="Split the JSONL output into shards of at most N uncompressed bytes, with an index file"
+    )
+    
+    parser.add_argument(
+        "--bundle",
+        choices=BUNDLE_FORMATS,
+        help="Write the TXT files into one tar or zip archive instead of separate files"
+    )
+    
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Drop near-duplicate JSONL examples (MinHash/LSH, needs numpy)"
+    )
+    
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Similarity at or above which examples count as duplicates (default: {DEFAULT_THRESHOLD})"
+    )
+    
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Export only sessions new or changed since the last run, into JSONL shards tracked by a manifest"
+    )
+    
+    parser.add_argument(
+        "--manifest",
+        help="Manifest path for --incremental (default: <output>.manifest.json)"
+    )
+    
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=EXPORT_SHARD_SIZE,
+        help=f"JSONL lines per shard for --incremental (default: {EXPORT_SHARD_SIZE})"
+    )
+    
     parser.add_argument(
         "--recent",
         type=int,
@@ -463,20 +957,50 @@ Format options:
         format_type = detect_format_from_filename(args.output_file)
         print(f"🔍 Auto-detected format: {format_type}")
     
+    if args.incremental and (format_type not in ("full", "turn-by-turn") or args.recent):
+        print("❌ --incremental works with the JSONL formats and fixed filters (no --recent)")
+        sys.exit(1)
+    if args.incremental and (args.compress != "none" or args.shard_records or args.shard_bytes
+                             or args.dedup or args.workers != 1):
+        print("❌ --incremental writes uncompressed --shard-size shards; it cannot be combined with "
+              "--compress, --shard-records, --shard-bytes, --dedup or --workers")
+        sys.exit(1)
+    
     # Handle recent filter
     start_date = args.start_date
     if args.recent:
         start_date = (datetime.now() - timedelta(days=args.recent)).strftime('%Y-%m-%d')
         print(f"📅 Using recent filter: conversations from {start_date}")
     
-    # Check if database is available
+    # Check if database is available (reads a single session id)
     try:
-        db_service.debug_get_all_sessions()
+        db_service.get_sessions_page(columns=["session_id"], limit=1)
     except Exception as e:
         print(f"❌ Cannot connect to database: {e}")
         print("💡 Make sure SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables are set")
         sys.exit(1)
     
+    if args.incremental:
+        try:
+            export_incremental(
+                output_file=args.output_file,
+                format_type=format_type,
+                manifest_path=args.manifest,
+                shard_size=args.shard_size,
+                start_date=start_date,
+                end_date=args.end_date,
+                session_ids=args.session_ids,
+                min_rating=args.min_rating,
+                status=args.status,
+                min_messages=args.min_messages,
+                batch_size=args.batch_size,
+                fetch_workers=args.fetch_workers
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        return
+    
     # Run export
     export_conversations(
         output_file=args.output_file,
@@ -486,7 +1010,15 @@ Format options:
         session_ids=args.session_ids,
         min_rating=args.min_rating,
         status=args.status,
-        min_messages=args.min_messages
+        min_messages=args.min_messages,
+        batch_size=args.batch_size,
+        fetch_workers=args.fetch_workers,
+        compression=args.compress,
+        shard_records=args.shard_records,
+        shard_bytes=args.shard_bytes,
+        bundle=args.bundle,
+        dedup_threshold=args.dedup_threshold if args.dedup else None,
+        workers=args.workers or os.cpu_count() or 1
     )
 
 
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Manifest and sharded JSONL output for incremental exports
+Used by export_conversations.py --incremental
+
+The manifest records, per exported session, its ended_at, message_count, a
+hash of the exported lines and where those lines are (shard, first line,
+line count). A run only reads sessions created or updated since the previous
+run's watermark, skips the ones whose ended_at/message_count/content hash
+did not change, and appends the rest to the shards. The shards that held the
+previous lines of a changed session are then rewritten without them, so every
+session appears once and the shards can be read as plain JSONL.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+
+MANIFEST_VERSION = 1
+EXPORT_SHARD_SIZE = 50000  # JSONL lines per shard
+# The next run re-reads sessions changed this long before the watermark, so rows
+# committed while a run was in progress (or written with a skewed clock) are not missed
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+
+def content_hash(lines: List[str]) -> str:
+    """Hash the exported lines of one session"""
+    digest = hashlib.sha256()
+    for line in lines:
+        digest.update(line.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ExportManifest:
+    """State of an incremental export, stored as JSON next to its shards"""
+
+    def __init__(self, path: str, format_type: str, filters: Dict[str, Any]):
+        self.path = path
+        self.data: Dict[str, Any] = {
+            "version": MANIFEST_VERSION,
+            "format": format_type,
+            "filters": filters,
+            "watermark": None,
+            "runs": [],
+            "shards": [],
+            "sessions": {},
+            "superseded": [],
+            "compacting": []
+        }
+
+    @classmethod
+    def load(cls, path: str, format_type: str, filters: Dict[str, Any]) -> "ExportManifest":
+        """
+        Load the manifest at path, or start a new one if it does not exist
+
+        Raises:
+            ValueError: If the manifest was written for another format or other filters
+        """
+        manifest = cls(path, format_type, filters)
+        if not os.path.exists(path):
+            return manifest
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != format_type or data.get("filters") != filters:
+            raise ValueError(
+                f"{path} was written for format {data.get('format')} with filters {data.get('filters')}; "
+                "use a new manifest for a different export"
+            )
+        manifest.data = data
+        return manifest
+
+    @property
+    def watermark(self) -> Optional[str]:
+        return self.data["watermark"]
+
+    def entry(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self.data["sessions"].get(session_id)
+
+    def is_unchanged(self, session: Dict[str, Any]) -> bool:
+        """True if the session was exported with the same ended_at and message_count"""
+        entry = self.entry(session["session_id"])
+        return entry is not None and (entry["ended_at"], entry["message_count"]) == (
+            session.get("ended_at"), session.get("message_count")
+        )
+
+    def record(self, session: Dict[str, Any], lines_hash: str, location: Optional[Tuple[str, int, int]]) -> None:
+        """
+        Record an exported session
+
+        Args:
+            session: Session row (session_id, ended_at, message_count)
+            lines_hash: content_hash of the exported lines
+            location: (shard, first line, line count) of newly written lines, or None
+                if the content was unchanged and the previous lines are still current
+        """
+        previous = self.entry(session["session_id"])
+        entry = dict(previous or {})
+        entry.update({
+            "ended_at": session.get("ended_at"),
+            "message_count": session.get("message_count"),
+            "content_hash": lines_hash
+        })
+        if location is not None:
+            if previous is not None:
+                # The older lines are dropped from their shard by compact()
+                self.data["superseded"].append(
+                    {"shard": previous["shard"], "line": previous["line"], "lines": previous["lines"]}
+                )
+            entry["shard"], entry["line"], entry["lines"] = location
+        self.data["sessions"][session["session_id"]] = entry
+
+    def compact(self, directory: str) -> int:
+        """
+        Write each shard holding superseded lines again without them, as <shard>.compact
+
+        The shard sizes and the line numbers of the sessions in those shards are
+        updated to the compacted files. Save the manifest, then call
+        complete_compaction() to move the compacted files into place; a run that
+        stops in between is completed by the next one, and .compact files written
+        before an unsaved manifest are simply overwritten.
+
+        Args:
+            directory: Directory of the shards
+
+        Returns:
+            int: Number of lines dropped
+        """
+        dropped_by_shard: Dict[str, List[Tuple[int, int]]] = {}
+        for dropped in self.data["superseded"]:
+            dropped_by_shard.setdefault(dropped["shard"], []).append((dropped["line"], dropped["lines"]))
+        shards = {shard["file"]: shard for shard in self.data["shards"]}
+        entries_by_shard: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self.data["sessions"].values():
+            if entry.get("shard") in dropped_by_shard:
+                entries_by_shard.setdefault(entry["shard"], []).append(entry)
+
+        total_dropped = 0
+        for file, ranges in dropped_by_shard.items():
+            shard = shards[file]
+            with open(os.path.join(directory, file), "rb") as f:
+                lines = f.read(shard["bytes"]).split(b"\n")[:-1]
+            removed = set()
+            for line, count in ranges:
+                removed.update(range(line, line + count))
+            # New index of every kept line
+            new_index, kept = {}, []
+            for index, line in enumerate(lines):
+                if index not in removed:
+                    new_index[index] = len(kept)
+                    kept.append(line + b"\n")
+            with open(os.path.join(directory, file + ".compact"), "wb") as f:
+                f.writelines(kept)
+                f.flush()
+                os.fsync(f.fileno())
+            for entry in entries_by_shard.get(file, []):
+                entry["line"] = new_index[entry["line"]]
+            shard["lines"], shard["bytes"] = len(kept), sum(len(line) for line in kept)
+            total_dropped += len(lines) - len(kept)
+            self.data.setdefault("compacting", []).append(file)
+
+        self.data["superseded"] = []
+        return total_dropped
+
+    def complete_compaction(self, directory: str) -> bool:
+        """Move the compacted shards of a saved compact() into place; True if there were any"""
+        files = self.data.get("compacting") or []
+        for file in files:
+            compacted = os.path.join(directory, file + ".compact")
+            if os.path.exists(compacted):
+                os.replace(compacted, os.path.join(directory, file))
+        self.data["compacting"] = []
+        return bool(files)
+
+    def finish_run(self, started_at: datetime, stats: Dict[str, int]) -> None:
+        """Advance the watermark to the start of this run (minus the overlap) and log the run"""
+        self.data["watermark"] = (started_at - WATERMARK_OVERLAP).isoformat() + "Z"
+        self.data["runs"].append({"started_at": started_at.isoformat() + "Z", **stats})
+
+    def save(self) -> None:
+        """Write the manifest atomically, so a crash never leaves a half-written file"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+
+class ShardWriter:
+    """
+    Appends JSONL lines to numbered shard files (<base>-00001.jsonl, ...)
+
+    The lines of one session are never split across shards. The shard list in
+    the manifest holds each shard's committed line and byte counts; lines
+    written by a run that crashed before saving its manifest are truncated
+    away when the next run reopens the shard.
+    """
+
+    def __init__(self, base_path: str, shards: List[Dict[str, Any]], shard_size: int = EXPORT_SHARD_SIZE):
+        """
+        Args:
+            base_path: Output path without the .jsonl extension
+            shards: The manifest's shard list; updated in place
+            shard_size: Lines per shard before a new one is started
+        """
+        self.base_path = base_path
+        self.directory = os.path.dirname(os.path.abspath(base_path))
+        self.shards = shards
+        self.shard_size = shard_size
+        self._file = None
+
+    def _shard_path(self, shard: Dict[str, Any]) -> str:
+        return os.path.join(self.directory, shard["file"])
+
+    def _new_shard(self) -> Dict[str, Any]:
+        shard = {"file": f"{os.path.basename(self.base_path)}-{len(self.shards) + 1:05d}.jsonl",
+                 "lines": 0, "bytes": 0}
+        self.shards.append(shard)
+        self._file = open(self._shard_path(shard), "wb")
+        return shard
+
+    def _open(self) -> Dict[str, Any]:
+        """Reopen the last shard if it has room, dropping anything past its committed size"""
+        if self.shards and self.shards[-1]["lines"] < self.shard_size:
+            shard = self.shards[-1]
+            self._file = open(self._shard_path(shard), "ab")
+            self._file.truncate(shard["bytes"])
+            return shard
+        return self._new_shard()
+
+    def write(self, lines: List[str]) -> Tuple[str, int, int]:
+        """
+        Append the lines of one session
+
+        Returns:
+            (shard file name, index of the first line in the shard, line count)
+        """
+        shard = self.shards[-1] if self._file is not None else self._open()
+        if shard["lines"] and shard["lines"] + len(lines) > self.shard_size:
+            self._file.close()
+            shard = self._new_shard()
+
+        data = "".join(lines).encode("utf-8")
+        self._file.write(data)
+        location = (shard["file"], shard["lines"], len(lines))
+        shard["lines"] += len(lines)
+        shard["bytes"] += len(data)
+        return location
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
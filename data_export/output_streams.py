@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Compressed, sharded output streams for export_conversations.py
+
+- ShardedOutput: JSONL output written through a gzip or zstd stream, optionally
+  split into numbered shards by record count or size, with a JSON index of the shards
+- TxtBundle: the per-session annotation texts written as members of one tar or
+  zip archive instead of thousands of small files
+
+zstd needs the zstandard package (pip install zstandard); gzip, tar and zip
+use the standard library.
+"""
+
+import gzip
+import io
+import json
+import os
+import tarfile
+import time
+import zipfile
+from typing import Any, BinaryIO, Dict, List, Optional, TextIO
+
+try:
+    import zstandard
+    ZSTANDARD_AVAILABLE = True
+except ImportError:
+    ZSTANDARD_AVAILABLE = False
+
+
+COMPRESSION_EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+BUNDLE_FORMATS = ("tar", "zip")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def open_compressed(path: str, compression: str = "none") -> BinaryIO:
+    """
+    Open path for streaming binary writes through the given compression
+
+    Raises:
+        RuntimeError: For zstd if zstandard is not installed
+        ValueError: For an unknown compression
+    """
+    if compression == "none":
+        return open(path, "wb")
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=GZIP_LEVEL)
+    if compression == "zstd":
+        if not ZSTANDARD_AVAILABLE:
+            raise RuntimeError("zstd compression needs zstandard: pip install zstandard")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(open(path, "wb"))
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def open_for_reading(path: str) -> TextIO:
+    """Open an export for reading as UTF-8 text, decompressing .gz and .zst files"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        if not ZSTANDARD_AVAILABLE:
+            raise RuntimeError("Reading .zst files needs zstandard: pip install zstandard")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def compressed_path(path: str, compression: str) -> str:
+    """Append the compression's extension (export.jsonl -> export.jsonl.gz)"""
+    return path + COMPRESSION_EXTENSIONS[compression]
+
+
+class ShardedOutput:
+    """
+    Streams JSONL records into one file, or into numbered shards
+    (<base>-00001.jsonl.gz, ...) when a record or byte limit is set
+
+    The records of one session are written together and never split across
+    shards. When sharding, <base>.index.json lists every shard with its record
+    count, uncompressed and compressed size, and first and last session.
+    """
+
+    def __init__(self, output_file: str, compression: str = "none",
+                 max_records: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            output_file: Output path (.jsonl); the compression extension is appended
+            compression: 'none', 'gzip' or 'zstd'
+            max_records: Start a new shard after this many records
+            max_bytes: Start a new shard after this many uncompressed bytes
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.output_file = output_file
+        self.compression = compression
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.sharded = bool(max_records or max_bytes)
+        self.base_path, self.extension = os.path.splitext(output_file)
+        self.shards: List[Dict[str, Any]] = []
+        self.records = 0
+        self._file: Optional[BinaryIO] = None
+
+    @property
+    def index_path(self) -> str:
+        return f"{self.base_path}.index.json"
+
+    @property
+    def paths(self) -> List[str]:
+        return [shard["path"] for shard in self.shards]
+
+    def _open_shard(self) -> Dict[str, Any]:
+        if self.sharded:
+            path = compressed_path(f"{self.base_path}-{len(self.shards) + 1:05d}{self.extension}", self.compression)
+        else:
+            path = compressed_path(self.output_file, self.compression)
+        shard = {"path": path, "records": 0, "bytes": 0, "first_session": None, "last_session": None}
+        self.shards.append(shard)
+        self._file = open_compressed(path, self.compression)
+        return shard
+
+    def _close_shard(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        shard = self.shards[-1]
+        shard["compressed_bytes"] = os.path.getsize(shard["path"])
+
+    def _shard_full(self, shard: Dict[str, Any], records: int, size: int) -> bool:
+        if not self.sharded or shard["records"] == 0:
+            return False
+        return bool((self.max_records and shard["records"] + records > self.max_records)
+                    or (self.max_bytes and shard["bytes"] + size > self.max_bytes))
+
+    def starts_new_shard(self, lines: List[str]) -> bool:
+        """Whether writing lines would close the current shard and open the next one"""
+        if self._file is None:
+            return False
+        return self._shard_full(self.shards[-1], len(lines), sum(len(line.encode("utf-8")) for line in lines))
+
+    def write(self, session_id: str, lines: List[str]) -> None:
+        """Write the JSONL lines of one session"""
+        data = "".join(lines).encode("utf-8")
+        shard = self.shards[-1] if self._file is not None else self._open_shard()
+        if self._shard_full(shard, len(lines), len(data)):
+            self._close_shard()
+            shard = self._open_shard()
+        self._file.write(data)
+        shard["records"] += len(lines)
+        shard["bytes"] += len(data)
+        shard["first_session"] = shard["first_session"] or session_id
+        shard["last_session"] = session_id
+        self.records += len(lines)
+
+    def close(self) -> None:
+        """Close the last shard and, when sharding, write the shard index"""
+        if not self.shards:
+            self._open_shard()  # An export without results still produces its (empty) output
+        self._close_shard()
+        if self.sharded:
+            index = {
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "compression": self.compression,
+                "records": self.records,
+                "shards": [dict(shard, path=os.path.basename(shard["path"])) for shard in self.shards]
+            }
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+
+    def __enter__(self) -> "ShardedOutput":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class TxtBundle:
+    """Writes the per-session annotation texts as members of one tar or zip archive"""
+
+    def __init__(self, output_file: str, bundle: str = "tar", compression: str = "gzip"):
+        """
+        Args:
+            output_file: Output path (.txt); the archive is <base>.tar[.gz|.zst] or <base>.zip
+            bundle: 'tar' or 'zip'
+            compression: Compression of the tar stream ('none', 'gzip', 'zstd');
+                zip members are always deflated
+        """
+        if bundle not in BUNDLE_FORMATS:
+            raise ValueError(f"Unknown bundle format: {bundle}")
+        base_path = output_file[:-len('.txt')] if output_file.endswith('.txt') else output_file
+        self.members = 0
+        if bundle == "zip":
+            self.path = f"{base_path}.zip"
+            self._zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+            self._tar = None
+        else:
+            self.path = compressed_path(f"{base_path}.tar", compression)
+            self._stream = open_compressed(self.path, compression)
+            # Stream mode: members are written one after another, nothing is seeked back
+            self._tar = tarfile.open(fileobj=self._stream, mode="w|")
+            self._zip = None
+
+    def add(self, name: str, text: str) -> None:
+        """Add one file to the archive"""
+        data = text.encode("utf-8")
+        if self._zip is not None:
+            self._zip.writestr(name, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._tar.addfile(info, io.BytesIO(data))
+        self.members += 1
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+            self._stream.close()
+
+    def __enter__(self) -> "TxtBundle":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compact "prefix-reference" variant of the turn-by-turn format
+Written by export_conversations.py --format turn-by-turn-ref
+
+The regular turn-by-turn format repeats the system prompt and the whole
+conversation history in every example, so a session of n turns takes O(n²)
+space. This variant stores every message once:
+
+    {"type": "prompt", "id": 0, "content": "<system prompt>"}
+    {"type": "session", "session_id": "...", "prompt": 0, "turns": [["<user>", "<coach>"], ...]}
+
+A prompt line is written the first time a system prompt is used in a file (each
+shard of a sharded export defines its own prompts). Example k of
+a session is the system prompt plus the first k - 1 turns as history, the
+user message of turn k as the last input and the coach reply of turn k as the
+output. load_prefix_reference() expands a file back into exactly the examples
+of the regular turn-by-turn format.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+from output_streams import open_for_reading
+
+
+class PrefixReferenceEncoder:
+    """Encodes sessions as prefix-reference lines; one instance per output file or shard"""
+
+    def __init__(self):
+        self._prompt_ids: Dict[str, int] = {}
+
+    def encode(self, session_id: str, system_prompt: str, turns: List[Tuple[str, str]]) -> List[str]:
+        """
+        Return the lines for one session (a prompt line first if the prompt is new)
+
+        Args:
+            session_id: Session the turns belong to
+            system_prompt: System prompt of the session's examples
+            turns: (user message, coach reply) pairs in conversation order
+        """
+        lines = []
+        prompt_id = self._prompt_ids.get(system_prompt)
+        if prompt_id is None:
+            prompt_id = self._prompt_ids[system_prompt] = len(self._prompt_ids)
+            lines.append(json.dumps({"type": "prompt", "id": prompt_id, "content": system_prompt},
+                                    ensure_ascii=False) + '\n')
+        lines.append(json.dumps({"type": "session", "session_id": session_id, "prompt": prompt_id,
+                                 "turns": [list(turn) for turn in turns]}, ensure_ascii=False) + '\n')
+        return lines
+
+
+def expand_session(system_prompt: str, turns: List[List[str]]) -> Iterator[Dict[str, Any]]:
+    """Yield the turn-by-turn examples of one session record"""
+    history = [{"role": "system", "content": system_prompt}]
+    for user_text, ai_text in turns:
+        yield {"input": history + [{"role": "user", "content": user_text}], "output": ai_text}
+        history = history + [{"role": "user", "content": user_text}, {"role": "assistant", "content": ai_text}]
+
+
+def load_prefix_reference(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the turn-by-turn examples stored in a prefix-reference file (.gz/.zst included)
+
+    Raises:
+        ValueError: If a session refers to a prompt that was not defined before it
+    """
+    prompts: Dict[int, str] = {}
+    with open_for_reading(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "prompt":
+                prompts[record["id"]] = record["content"]
+            elif record["type"] == "session":
+                if record["prompt"] not in prompts:
+                    raise ValueError(f"Session {record['session_id']} refers to undefined prompt {record['prompt']}")
+                yield from expand_session(prompts[record["prompt"]], record["turns"])
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Synthetic coaching conversations for export and search benchmarks
+Usage: python synthetic_corpus.py corpus.db [--messages 100000] [--turns 5 30] [--ratings 1:1,2:2,3:4,4:8,5:6]
+
+Generates sessions of alternating user/coach messages and loads them into a
+local SQLite database with the SQLiteDatabaseService schema, so
+export_conversations.py (and the benchmarks in benchmarks/) can run at scale
+without Supabase. Everything is drawn from a seeded random generator, so the
+same options always produce the same corpus.
+
+- Sessions have a random number of turns (user message + coach reply)
+- User messages are short, coach replies longer (words per message configurable)
+- Ended sessions get a summary, duration and a rating drawn from the rating
+  weights, or no rating; a share of sessions is still active
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_database_service import SQLiteDatabaseService
+
+
+VOCABULARY = (
+    "work stress sleep family deadline manager goal habit exercise anxiety confidence "
+    "motivation focus energy career promotion friend partner weekend morning routine "
+    "meditation breathing journal progress feedback team project meeting presentation "
+    "balance rest health diet running reading learning skill change decision priority "
+    "plan week month reflection gratitude boundary conflict support coach question "
+    "feel think want need try start stop keep notice remember prepare choose"
+).split()
+
+DEFAULT_TURNS = (5, 30)  # Turns per session (inclusive range)
+DEFAULT_USER_WORDS = (5, 40)
+DEFAULT_COACH_WORDS = (15, 80)
+DEFAULT_RATING_WEIGHTS = {1: 1, 2: 2, 3: 4, 4: 8, 5: 6}
+DEFAULT_UNRATED_SHARE = 0.3  # Ended sessions without a rating
+DEFAULT_ACTIVE_SHARE = 0.05  # Sessions that are still active
+DEFAULT_INSERT_BATCH_SIZE = 20000  # Messages per insert transaction
+CORPUS_START = datetime(2025, 1, 1)
+
+# Columns inserted, in order
+SESSION_ROW_COLUMNS = ("id", "session_id", "status", "created_at", "updated_at", "ended_at", "message_count",
+                       "summary", "duration_seconds", "rating", "feedback")
+MESSAGE_ROW_COLUMNS = ("id", "session_id", "message_id", "sender", "text_content", "created_at")
+
+
+def parse_rating_weights(spec: str) -> Dict[int, float]:
+    """
+    Parse rating weights like '1:1,2:2,3:4,4:8,5:6'
+
+    Raises:
+        ValueError: For ratings outside 1-5, negative weights or no positive weight
+    """
+    weights = {}
+    for item in spec.split(","):
+        rating, weight = item.split(":")
+        weights[int(rating)] = float(weight)
+    if any(rating not in range(1, 6) for rating in weights):
+        raise ValueError("Ratings must be between 1 and 5")
+    if any(weight < 0 for weight in weights.values()) or not any(weights.values()):
+        raise ValueError("Rating weights must be non-negative with at least one positive weight")
+    return weights
+
+
+def synthetic_text(rng: random.Random, words: Tuple[int, int]) -> str:
+    """Sentences of vocabulary words, words[0]-words[1] words in total"""
+    remaining = rng.randint(*words)
+    sentences = []
+    while remaining > 0:
+        length = min(remaining, rng.randint(4, 14))
+        sentence = " ".join(rng.choice(VOCABULARY) for _ in range(length))
+        sentences.append(sentence.capitalize() + rng.choice(".?."))
+        remaining -= length
+    return " ".join(sentences)
+
+
+def generate_sessions(
+    message_count: int,
+    turns: Tuple[int, int] = DEFAULT_TURNS,
+    user_words: Tuple[int, int] = DEFAULT_USER_WORDS,
+    coach_words: Tuple[int, int] = DEFAULT_COACH_WORDS,
+    rating_weights: Optional[Dict[int, float]] = None,
+    unrated_share: float = DEFAULT_UNRATED_SHARE,
+    active_share: float = DEFAULT_ACTIVE_SHARE,
+    seed: int = 42
+) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Yield (session, messages) until message_count messages have been generated
+
+    Sessions and messages have the columns of the sessions and messages tables;
+    sessions start a few minutes apart and messages within a session 10-90 s apart.
+    The last session is cut short to end at exactly message_count messages.
+
+    Args:
+        message_count: Total messages to generate
+        turns: Range of turns (user message + coach reply) per session
+        user_words: Range of words per user message
+        coach_words: Range of words per coach reply
+        rating_weights: Relative frequency of each rating 1-5 among rated sessions
+        unrated_share: Share of ended sessions without a rating
+        active_share: Share of sessions that are still active (never rated)
+        seed: Seed of the random generator
+    """
+    rng = random.Random(seed)
+    rating_weights = rating_weights or DEFAULT_RATING_WEIGHTS
+    ratings, weights = list(rating_weights), list(rating_weights.values())
+    session_start = CORPUS_START
+    generated = 0
+    index = 0
+    while generated < message_count:
+        count = min(2 * rng.randint(*turns), message_count - generated)
+        session_uuid = str(uuid.UUID(int=rng.getrandbits(128)))
+        session_id = f"session-{index:08d}"
+        created_at = session_start
+        messages = []
+        for n in range(count):
+            created_at += timedelta(seconds=rng.randint(10, 90))
+            messages.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "session_id": session_uuid,
+                "message_id": f"msg-{generated + n:09d}",
+                "sender": "user" if n % 2 == 0 else "ai",
+                "text_content": synthetic_text(rng, user_words if n % 2 == 0 else coach_words),
+                "created_at": created_at.isoformat() + "Z"
+            })
+
+        active = rng.random() < active_share
+        ended_at = None if active else created_at + timedelta(seconds=30)
+        session = {
+            "id": session_uuid,
+            "session_id": session_id,
+            "status": "active" if active else "ended",
+            "created_at": session_start.isoformat() + "Z",
+            "updated_at": (ended_at or created_at).isoformat() + "Z",
+            "ended_at": ended_at.isoformat() + "Z" if ended_at else None,
+            "message_count": count,
+            "summary": None if active else synthetic_text(rng, (20, 40)),
+            "duration_seconds": None if active else int((ended_at - session_start).total_seconds()),
+            "rating": None if active or rng.random() < unrated_share else rng.choices(ratings, weights)[0],
+            "feedback": None
+        }
+        yield session, messages
+
+        generated += count
+        index += 1
+        session_start += timedelta(minutes=rng.randint(1, 30))
+
+
+def load_corpus(db: SQLiteDatabaseService, message_count: int,
+                batch_size: int = DEFAULT_INSERT_BATCH_SIZE, progress: bool = True, **options) -> Dict[str, int]:
+    """
+    Insert a synthetic corpus of message_count messages into db
+
+    Args:
+        db: Database to load (normally an empty one)
+        message_count: Total messages to insert
+        batch_size: Messages per insert transaction
+        progress: Print the number of messages inserted so far
+        **options: Passed to generate_sessions (turns, user_words, rating_weights, seed, ...)
+
+    Returns:
+        Dict with the number of sessions and messages inserted
+    """
+    conn = db._connection()
+    session_columns, message_columns = SESSION_ROW_COLUMNS, MESSAGE_ROW_COLUMNS
+    session_sql = (f"INSERT INTO sessions ({', '.join(session_columns)}) "
+                   f"VALUES ({', '.join('?' * len(session_columns))})")
+    message_sql = (f"INSERT INTO messages ({', '.join(message_columns)}) "
+                   f"VALUES ({', '.join('?' * len(message_columns))})")
+
+    def flush(sessions: List[tuple], messages: List[tuple]) -> None:
+        conn.execute("BEGIN")
+        conn.executemany(session_sql, sessions)
+        conn.executemany(message_sql, messages)
+        conn.execute("COMMIT")
+
+    session_rows, message_rows = [], []
+    stats = {"sessions": 0, "messages": 0}
+    for session, messages in generate_sessions(message_count, **options):
+        session_rows.append(tuple(session[column] for column in session_columns))
+        message_rows.extend(tuple(message[column] for column in message_columns) for message in messages)
+        stats["sessions"] += 1
+        stats["messages"] += len(messages)
+        if len(message_rows) >= batch_size:
+            flush(session_rows, message_rows)
+            session_rows, message_rows = [], []
+            if progress:
+                print(f"  inserted {stats['messages']:,}/{message_count:,} messages", end="\r")
+    if session_rows:
+        flush(session_rows, message_rows)
+    if progress:
+        print(f"  inserted {stats['messages']:,}/{message_count:,} messages")
+    return stats
+
+
+def open_corpus(db_path: str, message_count: int, **options) -> SQLiteDatabaseService:
+    """Open the SQLite corpus at db_path, generating message_count messages first if it is empty"""
+    db = SQLiteDatabaseService(db_path)
+    existing = db._connection().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    if existing == 0:
+        print(f"🔧 Building {message_count:,}-message corpus in {db_path}")
+        start = time.perf_counter()
+        load_corpus(db, message_count, **options)
+        print(f"✅ Corpus ready in {time.perf_counter() - start:.1f}s")
+    else:
+        print(f"✅ Reusing corpus with {existing:,} messages from {db_path}")
+    return db
+
+
+def main():
+    """Main function with command line interface"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic conversation corpus in a SQLite database")
+    parser.add_argument("db_path", help="SQLite file to create (SQLiteDatabaseService schema)")
+    parser.add_argument("--messages", type=int, default=100_000, help="Number of messages (default: 100,000)")
+    parser.add_argument("--turns", type=int, nargs=2, default=DEFAULT_TURNS, metavar=("MIN", "MAX"),
+                        help=f"Turns per session (default: {DEFAULT_TURNS[0]} {DEFAULT_TURNS[1]})")
+    parser.add_argument("--user-words", type=int, nargs=2, default=DEFAULT_USER_WORDS, metavar=("MIN", "MAX"),
+                        help=f"Words per user message (default: {DEFAULT_USER_WORDS[0]} {DEFAULT_USER_WORDS[1]})")
+    parser.add_argument("--coach-words", type=int, nargs=2, default=DEFAULT_COACH_WORDS, metavar=("MIN", "MAX"),
+                        help=f"Words per coach reply (default: {DEFAULT_COACH_WORDS[0]} {DEFAULT_COACH_WORDS[1]})")
+    parser.add_argument("--ratings", type=parse_rating_weights,
+                        help="Relative frequency of each rating, e.g. 1:1,2:2,3:4,4:8,5:6 (the default)")
+    parser.add_argument("--unrated-share", type=float, default=DEFAULT_UNRATED_SHARE,
+                        help=f"Share of ended sessions without a rating (default: {DEFAULT_UNRATED_SHARE})")
+    parser.add_argument("--active-share", type=float, default=DEFAULT_ACTIVE_SHARE,
+                        help=f"Share of sessions still active (default: {DEFAULT_ACTIVE_SHARE})")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    args = parser.parse_args()
+
+    db = SQLiteDatabaseService(args.db_path)
+    if db._connection().execute("SELECT COUNT(*) FROM messages").fetchone()[0]:
+        print(f"❌ {args.db_path} already contains messages")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    stats = load_corpus(db, args.messages, turns=tuple(args.turns), user_words=tuple(args.user_words),
+                        coach_words=tuple(args.coach_words), rating_weights=args.ratings,
+                        unrated_share=args.unrated_share, active_share=args.active_share, seed=args.seed)
+    print(f"✅ Wrote {stats['sessions']:,} sessions with {stats['messages']:,} messages to {args.db_path} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
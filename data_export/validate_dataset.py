@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Validate fine-tuning datasets offline and estimate their token counts and cost
+Usage: python validate_dataset.py file.jsonl [file2.jsonl ...] [options]
+
+Checks the JSONL written by export_conversations.py (full, turn-by-turn;
+.jsonl.gz/.jsonl.zst shards included) and the annotator's supervised and DPO
+exports before they are uploaded:
+- structure: valid JSON, known roles, non-empty string contents
+- role order: system first, user and assistant alternating, the example
+  ending where its format expects (assistant for supervised, user for inputs)
+- length: examples over --max-tokens are flagged, or with --truncate the
+  oldest exchanges of their history are dropped until they fit
+
+Tokens are counted with the cl100k_base encoding bundled with the project
+(cl100k_base.tiktoken or tiktoken_ext/cl100k_base.tiktoken; nothing is
+downloaded), using the chat overhead of 3 tokens per message plus 3 for the
+reply. Files are split into chunks that are validated in parallel by a
+process pool.
+
+Requires tiktoken.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from output_streams import open_for_reading
+
+try:
+    import tiktoken
+    from tiktoken.load import load_tiktoken_bpe
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENCODING_FILES = [
+    os.path.join(ROOT, "cl100k_base.tiktoken"),
+    os.path.join(ROOT, "tiktoken_ext", "cl100k_base.tiktoken"),
+]
+# Split pattern and special tokens of cl100k_base, as defined by tiktoken_ext.openai_public
+CL100K_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+CL100K_SPECIAL_TOKENS = {
+    "<|endoftext|>": 100257,
+    "<|fim_prefix|>": 100258,
+    "<|fim_middle|>": 100259,
+    "<|fim_suffix|>": 100260,
+    "<|endofprompt|>": 100276,
+}
+
+TOKENS_PER_MESSAGE = 3  # <|start|>{role}\n ... <|end|>
+TOKENS_PER_NAME = 1
+TOKENS_PER_REPLY = 3  # Every reply is primed with <|start|>assistant
+
+DEFAULT_MAX_TOKENS = 65536  # Per-example training context of the current fine-tunable models
+DEFAULT_PRICE_PER_MILLION = 5.00  # USD per 1M training tokens (gpt-4.1-mini)
+VALIDATION_CHUNK_SIZE = 500  # Lines per task handed to a worker
+
+# Default epoch heuristics of the fine-tuning API
+TARGET_EPOCHS = 3
+MIN_TARGET_EXAMPLES = 100
+MAX_TARGET_EXAMPLES = 25000
+MIN_DEFAULT_EPOCHS = 1
+MAX_DEFAULT_EPOCHS = 25
+
+ROLES = ("system", "user", "assistant")
+
+_encoding = None
+
+
+def load_ranks(path: str) -> Dict[bytes, int]:
+    """
+    Read the token ranks of a .tiktoken file
+
+    The bundled files hold a header line followed by "<raw token bytes> <rank>"
+    lines, ranks in order; tokens may themselves contain newlines, so each token
+    ends at the first " <rank>\\n" after the previous one. Files in tiktoken's own
+    base64 format are passed to tiktoken.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(b"tiktoken encoding file"):
+        return load_tiktoken_bpe(path)
+    body = data.split(b"\n", 1)[1]
+    if not body.endswith(b"\n"):
+        body += b"\n"
+    ranks: Dict[bytes, int] = {}
+    position = 0
+    while position < len(body):
+        marker = b" %d\n" % len(ranks)
+        end = body.find(marker, position)
+        if end < 0:
+            raise ValueError(f"{path}: rank {len(ranks)} not found")
+        ranks[body[position:end]] = len(ranks)
+        position = end + len(marker)
+    return ranks
+
+
+def load_encoding() -> "tiktoken.Encoding":
+    """
+    Build the cl100k_base encoding from the bundled ranks file, without network access
+
+    Raises:
+        RuntimeError: If tiktoken is not installed or no bundled ranks file is found
+    """
+    if not TIKTOKEN_AVAILABLE:
+        raise RuntimeError("Dataset validation needs tiktoken: pip install tiktoken")
+    for path in ENCODING_FILES:
+        if os.path.exists(path):
+            return tiktoken.Encoding(
+                name="cl100k_base",
+                pat_str=CL100K_PATTERN,
+                mergeable_ranks=load_ranks(path),
+                special_tokens=CL100K_SPECIAL_TOKENS
+            )
+    raise RuntimeError(f"cl100k_base.tiktoken not found in {ROOT} or {ROOT}/tiktoken_ext")
+
+
+def _init_worker() -> None:
+    global _encoding
+    _encoding = load_encoding()
+
+
+def message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Tokens of a list of chat messages, including the per-message overhead"""
+    tokens = 0
+    for message in messages:
+        tokens += TOKENS_PER_MESSAGE
+        tokens += len(_encoding.encode(message.get("role", ""), disallowed_special=()))
+        tokens += len(_encoding.encode(message_content(message), disallowed_special=()))
+        if message.get("name"):
+            tokens += TOKENS_PER_NAME
+    return tokens
+
+
+def message_content(message: Dict[str, Any]) -> str:
+    content = message.get("content", message.get("text"))
+    return content if isinstance(content, str) else ""
+
+
+def example_parts(example: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+    """
+    Split an example into its kind, its conversation (the list that may be truncated)
+    and its completions
+
+    Raises:
+        ValueError: If the example matches none of the supported formats
+    """
+    if isinstance(example.get("messages"), list):
+        return "supervised", example["messages"], []
+    if isinstance(example.get("input"), dict) and isinstance(example["input"].get("messages"), list):
+        return "dpo", example["input"]["messages"], [example.get("preferred_output") or [],
+                                                     example.get("non_preferred_output") or []]
+    if isinstance(example.get("input"), list) and isinstance(example.get("output"), str):
+        return "turn-by-turn", example["input"], [[{"role": "assistant", "content": example["output"]}]]
+    if isinstance(example.get("input"), list) and isinstance(example.get("output"), dict):
+        choices = example["output"].get("choices") or []
+        return "full", example["input"], [[choice.get("message", {}) for choice in choices[:1]]]
+    raise ValueError("unknown example format (expected messages, input/output or DPO fields)")
+
+
+def check_messages(kind: str, messages: List[Dict[str, Any]], completions: List[List[Dict[str, Any]]]) -> List[str]:
+    """Return the structure and role-order problems of an example"""
+    issues = []
+    if not messages:
+        return ["no messages"]
+    for index, message in enumerate(messages + [m for completion in completions for m in completion]):
+        if message.get("role") not in ROLES:
+            issues.append(f"message {index}: unknown role {message.get('role')!r}")
+        elif not message_content(message).strip():
+            issues.append(f"message {index}: empty content")
+
+    roles = [message.get("role") for message in messages]
+    if "system" in roles[1:]:
+        issues.append("system message after the first message")
+    dialogue = [role for role in roles if role != "system"]
+    if any(a == b for a, b in zip(dialogue, dialogue[1:])):
+        issues.append("user and assistant messages do not alternate")
+    if dialogue and dialogue[0] != "user":
+        issues.append("conversation does not start with a user message")
+
+    expected_last = "assistant" if kind == "supervised" else "user"
+    if dialogue and dialogue[-1] != expected_last:
+        issues.append(f"conversation ends with {dialogue[-1]}, expected {expected_last}")
+    if kind == "supervised" and not any(m.get("weight", 1) for m in messages if m.get("role") == "assistant"):
+        issues.append("no assistant message with weight 1 to train on")
+    if kind == "dpo" and any(len(completion) != 1 for completion in completions):
+        issues.append("preferred and non-preferred output need exactly one message each")
+    return issues
+
+
+def example_tokens(messages: List[Dict[str, Any]], completions: List[List[Dict[str, Any]]]) -> int:
+    return message_tokens(messages) + sum(message_tokens(c) for c in completions) + TOKENS_PER_REPLY
+
+
+def truncate_history(kind: str, messages: List[Dict[str, Any]], completions: List[List[Dict[str, Any]]],
+                     max_tokens: int) -> Optional[int]:
+    """
+    Drop the oldest user/assistant exchanges after the system prompt until the example fits
+
+    The final exchange (supervised) or last user message (inputs) is always kept.
+
+    Returns:
+        The new token count, or None if the example cannot be made to fit
+    """
+    keep = 2 if kind == "supervised" else 1
+    start = 1 if messages and messages[0].get("role") == "system" else 0
+    tokens = example_tokens(messages, completions)
+    while tokens > max_tokens and len(messages) - start > keep + 1:
+        del messages[start:start + 2]
+        tokens = example_tokens(messages, completions)
+    return tokens if tokens <= max_tokens else None
+
+
+def validate_lines(task: Tuple[str, int, List[str], int, bool]) -> List[Dict[str, Any]]:
+    """
+    Validate one chunk of lines (runs in a worker process)
+
+    Args:
+        task: (path, line number of the first line, lines, max_tokens, truncate)
+
+    Returns:
+        One result per line: line, kind, tokens, issues, and the fixed line when truncating
+    """
+    path, first_line, lines, max_tokens, truncate = task
+    results = []
+    for line_number, line in enumerate(lines, first_line):
+        result = {"file": path, "line": line_number, "kind": None, "tokens": 0, "issues": []}
+        results.append(result)
+        try:
+            example = json.loads(line)
+            kind, messages, completions = example_parts(example)
+        except (ValueError, AttributeError) as e:
+            result["issues"].append(f"invalid example: {e}")
+            continue
+
+        result["kind"] = kind
+        result["issues"] = check_messages(kind, messages, completions)
+        result["tokens"] = example_tokens(messages, completions)
+        if result["tokens"] > max_tokens:
+            if truncate:
+                fitted = truncate_history(kind, messages, completions, max_tokens)
+                if fitted is None:
+                    result["issues"].append(f"{result['tokens']} tokens, over the {max_tokens} limit even after truncation")
+                else:
+                    result["truncated_from"] = result["tokens"]
+                    result["tokens"] = fitted
+                    result["fixed"] = json.dumps(example, ensure_ascii=False) + "\n"
+            else:
+                result["issues"].append(f"{result['tokens']} tokens, over the {max_tokens} limit")
+        if "fixed" not in result and not result["issues"]:
+            result["fixed"] = line if line.endswith("\n") else line + "\n"
+    return results
+
+
+def iter_tasks(paths: List[str], max_tokens: int, truncate: bool,
+               chunk_size: int = VALIDATION_CHUNK_SIZE) -> Iterator[Tuple[str, int, List[str], int, bool]]:
+    """Split the non-empty lines of every file (gzip/zstd compressed ones included) into chunks"""
+    for path in paths:
+        with open_for_reading(path) as f:
+            chunk, first_line = [], 1
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                if not chunk:
+                    first_line = line_number
+                chunk.append(line)
+                if len(chunk) == chunk_size:
+                    yield path, first_line, chunk, max_tokens, truncate
+                    chunk = []
+            if chunk:
+                yield path, first_line, chunk, max_tokens, truncate
+
+
+def validate_files(paths: List[str], max_tokens: int = DEFAULT_MAX_TOKENS, truncate: bool = False,
+                   workers: Optional[int] = None, chunk_size: int = VALIDATION_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the validation result of every example of the files, in file and line order
+
+    Chunks are validated by a pool of worker processes (default: one per core), with
+    a bounded number of chunks in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = deque()
+        for task in iter_tasks(paths, max_tokens, truncate, chunk_size):
+            pending.append(pool.submit(validate_lines, task))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def default_epochs(example_count: int) -> int:
+    """Epochs the fine-tuning API picks when n_epochs is not set"""
+    if example_count == 0:
+        return 0
+    if example_count * TARGET_EPOCHS < MIN_TARGET_EXAMPLES:
+        return min(MAX_DEFAULT_EPOCHS, MIN_TARGET_EXAMPLES // example_count)
+    if example_count * TARGET_EPOCHS > MAX_TARGET_EXAMPLES:
+        return max(MIN_DEFAULT_EPOCHS, MAX_TARGET_EXAMPLES // example_count)
+    return TARGET_EPOCHS
+
+
+def summarize(results: List[Dict[str, Any]], max_tokens: int, epochs: Optional[int] = None,
+              price_per_million: float = DEFAULT_PRICE_PER_MILLION) -> Dict[str, Any]:
+    """Aggregate token counts, problems and the estimated training cost"""
+    valid = [r for r in results if not r["issues"]]
+    tokens = sorted(r["tokens"] for r in valid)
+    billable = sum(min(t, max_tokens) for t in tokens)
+    epochs = epochs if epochs is not None else default_epochs(len(valid))
+    return {
+        "examples": len(results),
+        "valid": len(valid),
+        "invalid": len(results) - len(valid),
+        "truncated": sum(1 for r in results if "truncated_from" in r and not r["issues"]),
+        "kinds": dict(Counter(r["kind"] for r in results if r["kind"])),
+        # Problems counted by kind, with message indexes and token counts left out
+        "issues": dict(Counter(re.sub(r"\d+", "N", issue) for r in results for issue in r["issues"])),
+        "tokens": {
+            "total": sum(tokens),
+            "min": tokens[0] if tokens else 0,
+            "mean": round(statistics.mean(tokens), 1) if tokens else 0,
+            "median": statistics.median(tokens) if tokens else 0,
+            "p95": tokens[max(0, int(round(0.95 * len(tokens))) - 1)] if tokens else 0,
+            "max": tokens[-1] if tokens else 0,
+        },
+        "epochs": epochs,
+        "billable_tokens": billable * epochs,
+        "estimated_cost_usd": round(billable * epochs * price_per_million / 1_000_000, 2)
+    }
+
+
+def main():
+    """Main function with command line interface"""
+    parser = argparse.ArgumentParser(description="Validate fine-tuning JSONL offline and estimate tokens and cost")
+    parser.add_argument("files", nargs="+", help="JSONL files (exports or annotator supervised/DPO exports)")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS,
+                        help=f"Per-example token limit (default: {DEFAULT_MAX_TOKENS})")
+    parser.add_argument("--truncate", action="store_true",
+                        help="Drop the oldest exchanges of over-length examples instead of only flagging them")
+    parser.add_argument("--output", help="Write the valid (and truncated) examples to this JSONL file")
+    parser.add_argument("--report", help="Write per-example results (line, kind, tokens, issues) to this JSONL file")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--epochs", type=int, help="Training epochs for the cost estimate (default: as the API picks)")
+    parser.add_argument("--price-per-million", type=float, default=DEFAULT_PRICE_PER_MILLION,
+                        help=f"USD per 1M training tokens (default: {DEFAULT_PRICE_PER_MILLION})")
+    args = parser.parse_args()
+
+    try:
+        load_encoding()  # Fail before starting the workers
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    results = []
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    report = open(args.report, "w", encoding="utf-8") if args.report else None
+    try:
+        for result in validate_files(args.files, args.max_tokens, args.truncate, args.workers):
+            fixed = result.pop("fixed", None)
+            if output and fixed and not result["issues"]:
+                output.write(fixed)
+            if report:
+                report.write(json.dumps(result, ensure_ascii=False) + "\n")
+            for issue in result["issues"][:3]:
+                print(f"⚠️  {result['file']}:{result['line']}: {issue}")
+            results.append(result)
+    finally:
+        for f in (output, report):
+            if f:
+                f.close()
+
+    summary = summarize(results, args.max_tokens, args.epochs, args.price_per_million)
+    tokens = summary["tokens"]
+    print(f"\n📋 {summary['examples']} examples: {summary['valid']} valid, {summary['invalid']} with problems"
+          f" ({summary['truncated']} truncated to fit)")
+    print(f"🧮 Tokens per example: min {tokens['min']}, mean {tokens['mean']}, median {tokens['median']},"
+          f" p95 {tokens['p95']}, max {tokens['max']} (total {tokens['total']:,})")
+    for issue, count in sorted(summary["issues"].items(), key=lambda item: -item[1]):
+        print(f"   {count:>6} × {issue}")
+    print(f"💰 ~{summary['billable_tokens']:,} training tokens over {summary['epochs']} epochs"
+          f" ≈ ${summary['estimated_cost_usd']:.2f} at ${args.price_per_million:.2f}/1M")
+    if args.output:
+        print(f"📄 Wrote {summary['valid']} examples to {args.output}")
+    if summary["invalid"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,32 @@
 import os
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from typing import Callable, Optional, List, Dict, Any
 from supabase import create_client, Client
-from datetime import datetime
+from datetime import datetime, timedelta
+from session_cache import SessionCache, CachedDatabaseService
+from pagination import (
+    DEFAULT_PAGE_SIZE, decode_cursor, check_page_arguments, build_page, postgrest_keyset_filter,
+    DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, check_search_arguments, build_search_page,
+    DEFAULT_SESSION_PAGE_SIZE, MAX_SESSION_PAGE_SIZE, session_select_columns, build_session_page,
+    MESSAGE_FETCH_PAGE_SIZE, message_select_columns
+)
+
+
+def build_message_rows(session_uuid: str, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Build messages table rows for a bulk insert, keeping created_at strictly increasing"""
+    # Messages are ordered by created_at, so rows of the same request must not share a timestamp
+    now = datetime.utcnow()
+    return [
+        {
+            "session_id": session_uuid,
+            "message_id": message["message_id"],
+            "sender": message["sender"],
+            "text_content": message["text_content"],
+            "created_at": message.get("created_at") or (now + timedelta(microseconds=index)).isoformat() + "Z"
+        }
+        for index, message in enumerate(messages)
+    ]
 
 
 class DatabaseService:
@@ -16,15 +41,19 @@ class DatabaseService:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables are required")
         
         self.supabase: Client = create_client(url, key)
+        
+        # session_id -> sessions.id (UUID); a session's UUID never changes once created
+        self._session_uuid_cache: Dict[str, str] = {}
     
-    def create_session(self, session_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+    def create_session(self, session_id: str, user_id: Optional[str] = None,
+                       created_at: Optional[str] = None) -> Dict[str, Any]:
         """Create a new session in database following supabase-py insert pattern"""
         session_data = {
             "session_id": session_id,
             "user_id": user_id,
             "status": "active",
             "message_count": 0,  # Explicitly initialize message count
-            "created_at": datetime.utcnow().isoformat() + "Z"
+            "created_at": created_at or datetime.utcnow().isoformat() + "Z"
         }
         
         # Following supabase-py insert pattern from documentation
@@ -32,6 +61,7 @@ class DatabaseService:
         
         # Check if data was inserted successfully
         if result.data and len(result.data) > 0:
+            self._session_uuid_cache[session_id] = result.data[0]["id"]
             return result.data[0]
         else:
             raise Exception("Failed to create session in database")
@@ -46,25 +76,29 @@ class DatabaseService:
         
         # Return first result if exists
         if result.data and len(result.data) > 0:
+            self._session_uuid_cache[session_id] = result.data[0]["id"]
             return result.data[0]
         return None
     
+    def get_session_uuid(self, session_id: str) -> Optional[str]:
+        """Get the sessions.id UUID for a session_id, querying the database only on a cache miss"""
+        session_uuid = self._session_uuid_cache.get(session_id)
+        if session_uuid is None:
+            session = self.get_session(session_id)
+            if session:
+                session_uuid = session["id"]
+        return session_uuid
+    
     def update_session(self, session_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
         """Update session in database following supabase-py update pattern"""
         updates["updated_at"] = datetime.utcnow().isoformat() + "Z"
         
-        print(f"🔍 DEBUG update_session called:")
-        print(f"  session_id: {session_id}")
-        print(f"  updates: {updates}")
-        
         # Following supabase-py update + eq pattern from documentation
         result = self.supabase.table("sessions")\
             .update(updates)\
             .eq("session_id", session_id)\
             .execute()
         
-        print(f"🔍 Supabase update result: {result.data}")
-        
         # Check if data was updated successfully
         if result.data and len(result.data) > 0:
             return result.data[0]
@@ -74,14 +108,6 @@ class DatabaseService:
     def end_session(self, session_id: str, summary: str, duration: int, 
                    rating: Optional[int] = None, feedback: Optional[str] = None, message_count: Optional[int] = None) -> Dict[str, Any]:
         """End session and save summary, including message count if provided"""
-        print(f"🔍 DEBUG end_session called with:")
-        print(f"  session_id: {session_id}")
-        print(f"  summary: {summary[:50]}...")
-        print(f"  duration: {duration}")
-        print(f"  rating: {rating}")
-        print(f"  feedback: {feedback}")
-        print(f"  message_count: {message_count}")
-        
         updates = {
             "status": "ended",
             "ended_at": datetime.utcnow().isoformat() + "Z",
@@ -92,22 +118,18 @@ class DatabaseService:
         }
         if message_count is not None:
             updates["message_count"] = message_count
-            print(f"✅ Added message_count to updates: {message_count}")
-        else:
-            print(f"⚠️  message_count is None, not adding to updates")
         
-        print(f"🔍 Full updates dict: {updates}")
         return self.update_session(session_id, updates)
     
     def save_message(self, session_id: str, message_id: str, sender: str, text_content: str) -> Dict[str, Any]:
         """Save message to database following supabase-py insert pattern"""
-        # Get session UUID first
-        session = self.get_session(session_id)
-        if not session:
+        # Get session UUID first (cached after the session was created or loaded)
+        session_uuid = self.get_session_uuid(session_id)
+        if not session_uuid:
             raise ValueError(f"Session {session_id} not found")
         
         message_data = {
-            "session_id": session["id"],  # Use UUID from session
+            "session_id": session_uuid,  # Use UUID from session
             "message_id": message_id,
             "sender": sender,
             "text_content": text_content,
@@ -123,43 +145,212 @@ class DatabaseService:
         else:
             raise Exception("Failed to save message to database")
     
+    def save_messages(self, session_id: str, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Save several messages of a session in a single insert request.
+        
+        Args:
+            session_id: The session the messages belong to
+            messages: Dicts with message_id, sender, text_content and optionally
+                created_at, in conversation order
+        
+        Returns:
+            List of inserted message rows
+        """
+        if not messages:
+            return []
+        
+        session_uuid = self.get_session_uuid(session_id)
+        if not session_uuid:
+            raise ValueError(f"Session {session_id} not found")
+        
+        rows = build_message_rows(session_uuid, messages)
+        
+        # supabase-py insert accepts a list of rows for a bulk insert
+        result = self.supabase.table("messages").insert(rows).execute()
+        
+        if result.data and len(result.data) == len(rows):
+            return result.data
+        else:
+            raise Exception("Failed to save messages to database")
+    
     def get_conversation_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get all messages for a session following supabase-py select pattern"""
-        session = self.get_session(session_id)
-        if not session:
+        session_uuid = self.get_session_uuid(session_id)
+        if not session_uuid:
             return []
         
         # Following supabase-py select + eq + order pattern from documentation
         result = self.supabase.table("messages")\
             .select("*")\
-            .eq("session_id", session["id"])\
+            .eq("session_id", session_uuid)\
             .order("created_at")\
             .execute()
         
         return result.data or []
     
+    def get_messages_for_sessions(self, session_uuids: List[str],
+                                  columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Get the messages of many sessions at once with an IN (...) over their UUIDs.
+        
+        Replaces one get_conversation_history call (two round trips) per session.
+        The response is read in pages of MESSAGE_FETCH_PAGE_SIZE rows, since
+        PostgREST caps the rows returned by a single request.
+        
+        Args:
+            session_uuids: sessions.id values (not the public session_id strings)
+            columns: Message columns to return; id, session_id and created_at are always included
+        
+        Returns:
+            Messages ordered by session, created_at and id
+        """
+        if not session_uuids:
+            return []
+        select = ", ".join(message_select_columns(columns))
+        rows: List[Dict[str, Any]] = []
+        while True:
+            result = self.supabase.table("messages")\
+                .select(select)\
+                .in_("session_id", list(session_uuids))\
+                .order("session_id")\
+                .order("created_at")\
+                .order("id")\
+                .range(len(rows), len(rows) + MESSAGE_FETCH_PAGE_SIZE - 1)\
+                .execute()
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < MESSAGE_FETCH_PAGE_SIZE:
+                return rows
+    
+    def get_messages_page(self, session_id: str, limit: int = DEFAULT_PAGE_SIZE,
+                          after: Optional[str] = None, before: Optional[str] = None,
+                          since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of a session's messages using keyset pagination on (created_at, id).
+        
+        Args:
+            session_id: The session to read
+            limit: Maximum number of messages in the page
+            after: Cursor; return the messages that follow it
+            before: Cursor; return the messages that precede it
+            since: ISO timestamp; return the messages created after it
+        
+        Returns:
+            Dict with messages (oldest first), has_more, next_cursor and prev_cursor
+        """
+        check_page_arguments(limit, after, before, since)
+        session_uuid = self.get_session_uuid(session_id)
+        if not session_uuid:
+            return build_page([], limit, descending=False, cursor=after or before)
+        
+        query = self.supabase.table("messages")\
+            .select("*")\
+            .eq("session_id", session_uuid)
+        if after:
+            query = query.or_(postgrest_keyset_filter("after", *decode_cursor(after)))
+        elif before:
+            query = query.or_(postgrest_keyset_filter("before", *decode_cursor(before)))
+        elif since:
+            query = query.gt("created_at", since)
+        
+        descending = before is not None
+        result = query.order("created_at", desc=descending)\
+            .order("id", desc=descending)\
+            .limit(limit + 1)\
+            .execute()
+        
+        return build_page(result.data or [], limit, descending, cursor=after or before)
+    
+    def get_sessions_page(self, columns: Optional[List[str]] = None, status: Optional[str] = None,
+                          min_rating: Optional[int] = None, created_after: Optional[str] = None,
+                          created_before: Optional[str] = None, session_ids: Optional[List[str]] = None,
+                          changed_since: Optional[str] = None,
+                          limit: int = DEFAULT_SESSION_PAGE_SIZE, after: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of sessions, newest first, with every filter applied by the database.
+        
+        Pages are read with keyset pagination on (created_at, id), see migrations/003.
+        
+        Args:
+            columns: Session columns to return; id and created_at are always included
+            status: Only sessions with this status
+            min_rating: Only sessions rated at least this
+            created_after: Only sessions created at or after this ISO date or timestamp
+            created_before: Only sessions created before this ISO date or timestamp
+            session_ids: Only these sessions
+            changed_since: Only sessions created or updated at or after this ISO timestamp
+            limit: Maximum number of sessions in the page
+            after: Cursor; return the sessions that follow it (next_cursor of the previous page)
+        
+        Returns:
+            Dict with sessions, has_more and next_cursor
+        """
+        if not 1 <= limit <= MAX_SESSION_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_SESSION_PAGE_SIZE}")
+        
+        query = self.supabase.table("sessions")\
+            .select(", ".join(session_select_columns(columns)))
+        if status:
+            query = query.eq("status", status)
+        if min_rating is not None:
+            query = query.gte("rating", min_rating)
+        if created_after:
+            query = query.gte("created_at", created_after)
+        if created_before:
+            query = query.lt("created_at", created_before)
+        if session_ids:
+            query = query.in_("session_id", list(session_ids))
+        if changed_since:
+            # updated_at defaults to the insert time, so new sessions match too
+            query = query.gte("updated_at", changed_since)
+        if after:
+            # Newest first, so the next page holds the rows before the cursor
+            query = query.or_(postgrest_keyset_filter("before", *decode_cursor(after)))
+        
+        result = query.order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .limit(limit + 1)\
+            .execute()
+        
+        return build_session_page(result.data or [], limit, cursor=after)
+    
+    def search_messages(self, query: str, session_id: Optional[str] = None, user_id: Optional[str] = None,
+                        created_after: Optional[str] = None, created_before: Optional[str] = None,
+                        limit: int = DEFAULT_SEARCH_LIMIT, offset: int = 0) -> Dict[str, Any]:
+        """
+        Ranked full-text search over messages (GIN-indexed tsvector, see migrations/002).
+        
+        Args:
+            query: Search text in web search syntax ("quoted phrases", -excluded, or)
+            session_id: Only search this session
+            user_id: Only search sessions of this user
+            created_after: Only messages created at or after this ISO timestamp
+            created_before: Only messages created before this ISO timestamp
+            limit: Maximum number of results
+            offset: Number of results to skip (for the next page)
+        
+        Returns:
+            Dict with results (best match first, each with rank and a <b>highlighted</b>
+            snippet), has_more and next_offset
+        """
+        check_search_arguments(query, limit, offset)
+        result = self.supabase.rpc("search_messages", {
+            "search_query": query,
+            "session_filter": session_id,
+            "user_filter": user_id,
+            "created_after": created_after,
+            "created_before": created_before,
+            "result_limit": limit,
+            "result_offset": offset
+        }).execute()
+        
+        return build_search_page(result.data or [], limit, offset)
+    
     def search_messages_global(self, query: str, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Search messages globally across all sessions for a user using PostgreSQL full-text search"""
         try:
-            # Simplified approach: Search messages with text content containing the query
-            # Following supabase-py select pattern from documentation
-            
-            if user_id:
-                # When we add auth in Phase 2, we'll join with sessions table to filter by user
-                # For now, just search all messages since user_id is None in Phase 1
-                result = self.supabase.table("messages")\
-                    .select("*, sessions!inner(session_id, user_id, created_at)")\
-                    .ilike("text_content", f"%{query}%")\
-                    .execute()
-            else:
-                # Phase 1: Search all messages (no user filtering)
-                result = self.supabase.table("messages")\
-                    .select("*")\
-                    .ilike("text_content", f"%{query}%")\
-                    .execute()
-            
-            return result.data or []
-            
+            return self.search_messages(query, user_id=user_id, limit=MAX_SEARCH_LIMIT)["results"]
         except Exception as e:
             print(f"Search error: {e}")
             # Return empty list if search fails
@@ -185,5 +376,181 @@ class DatabaseService:
         return self.update_session(session_id, updates)
 
 
-# Initialize singleton service instance
-db_service = DatabaseService() 
\ No newline at end of file
+# Storage backend: "supabase" (default) or "sqlite" for a local file with no network hop
+DATABASE_BACKEND = os.environ.get("DATABASE_BACKEND", "supabase").lower()
+SQLITE_DATABASE_PATH = os.environ.get("SQLITE_DATABASE_PATH", "kuku_coach.db")
+
+
+def create_database_service(backend: Optional[str] = None):
+    """
+    Create the database service for the configured backend.
+    
+    Args:
+        backend: "supabase" or "sqlite"; defaults to the DATABASE_BACKEND environment variable
+    
+    Returns:
+        A DatabaseService or SQLiteDatabaseService instance
+    """
+    backend = (backend or DATABASE_BACKEND).lower()
+    if backend == "sqlite":
+        from sqlite_database_service import SQLiteDatabaseService
+        return SQLiteDatabaseService(SQLITE_DATABASE_PATH)
+    if backend == "supabase":
+        return DatabaseService()
+    raise ValueError(f"Unknown DATABASE_BACKEND: {backend} (expected 'supabase' or 'sqlite')")
+
+
+def database_configured(backend: Optional[str] = None) -> bool:
+    """True if the settings the backend needs are present (checked on every call)"""
+    backend = (backend or DATABASE_BACKEND).lower()
+    if backend == "supabase":
+        return bool(os.environ.get("SUPABASE_URL") and os.environ.get("SUPABASE_SERVICE_ROLE_KEY"))
+    return backend == "sqlite"
+
+
+class DatabaseUnavailable(Exception):
+    """Raised when the database service could not be created or failed its health probe"""
+
+
+class LazyDatabaseService:
+    """
+    Proxy that creates the database service on first use instead of at import.
+    
+    A missing setting or unreachable database no longer disables persistence
+    for the life of the process: creation is retried at most once per
+    retry_interval_seconds (calls in between fail fast with DatabaseUnavailable),
+    and start_monitor() keeps reconnecting and probing in the background so
+    the API picks the database up as soon as it becomes reachable.
+    """
+    
+    def __init__(self, factory: Callable[[], Any], probe: Optional[Callable[[Any], Any]] = None,
+                 retry_interval_seconds: float = 15.0, breaker=None):
+        """
+        Initialize the proxy.
+        
+        Args:
+            factory: Creates the real service; may raise while the database is unavailable
+            probe: Cheap call used as health check, e.g. lambda db: db.get_session("...")
+            retry_interval_seconds: Minimum time between two creation attempts
+            breaker: Optional CircuitBreaker; probe results are recorded on it and
+                the database counts as unavailable while it is open
+        """
+        self._factory = factory
+        self._probe = probe
+        self.retry_interval_seconds = retry_interval_seconds
+        self.breaker = breaker
+        self._service = None
+        self._lock = threading.Lock()
+        self._last_attempt_at: Optional[float] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.healthy: Optional[bool] = None  # None until the first probe
+        self.last_error: Optional[str] = None
+        self.last_probe_latency_ms: Optional[float] = None
+        self.connected_at: Optional[str] = None
+    
+    def get(self):
+        """
+        Return the real service, creating it if needed.
+        
+        Raises:
+            DatabaseUnavailable: If it cannot be created (or the last attempt failed recently)
+        """
+        service = self._service
+        if service is not None:
+            return service
+        with self._lock:
+            if self._service is not None:
+                return self._service
+            now = time.monotonic()
+            if self._last_attempt_at is not None and now - self._last_attempt_at < self.retry_interval_seconds:
+                raise DatabaseUnavailable(f"Database unavailable: {self.last_error}")
+            self._last_attempt_at = now
+            try:
+                self._service = self._factory()
+            except Exception as e:
+                self.last_error = str(e)
+                raise DatabaseUnavailable(f"Database unavailable: {e}") from e
+            self.connected_at = datetime.utcnow().isoformat() + "Z"
+            self.last_error = None
+            print("✅ Database service connected")
+            return self._service
+    
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+    
+    def is_available(self) -> bool:
+        """True if the service exists, its last health probe (if any) passed and its circuit is not open"""
+        try:
+            self.get()
+        except DatabaseUnavailable:
+            return False
+        if self.breaker is not None and not self.breaker.available():
+            return False
+        return self.healthy is not False
+    
+    def probe(self) -> bool:
+        """Create the service if needed and run the health probe; returns the new health state"""
+        start = time.monotonic()
+        try:
+            service = self.get()
+            if self._probe is not None:
+                self._probe(service)
+        except Exception as e:
+            if self.healthy is not False:
+                print(f"⚠️ Database health probe failed: {e}")
+            self.healthy = False
+            self.last_error = str(e)
+            if self.breaker is not None:
+                self.breaker.record_failure(e)
+            return False
+        if self.breaker is not None:
+            self.breaker.record_success()
+        if self.healthy is False:
+            print("✅ Database is reachable again")
+        self.healthy = True
+        self.last_error = None
+        self.last_probe_latency_ms = round((time.monotonic() - start) * 1000, 1)
+        return True
+    
+    def start_monitor(self, interval_seconds: float = 30.0) -> None:
+        """Probe (and reconnect) in a background thread every interval_seconds"""
+        if self._monitor is not None and self._monitor.is_alive():
+            return
+        self._stopping.clear()
+        
+        def monitor():
+            while True:
+                self.probe()
+                if self._stopping.wait(timeout=interval_seconds):
+                    return
+        
+        self._monitor = threading.Thread(target=monitor, name="database-monitor", daemon=True)
+        self._monitor.start()
+    
+    def stop_monitor(self) -> None:
+        self._stopping.set()
+    
+    def status(self) -> Dict[str, Any]:
+        """Return the connection and probe state for the health endpoint"""
+        return {
+            "backend": DATABASE_BACKEND,
+            "configured": database_configured(),
+            "connected": self._service is not None,
+            "healthy": self.healthy,
+            "connected_at": self.connected_at,
+            "last_probe_latency_ms": self.last_probe_latency_ms,
+            "last_error": self.last_error
+        }
+
+
+# Session rows are cached in front of the database; shared with the async service
+SESSION_CACHE_TTL_SECONDS = float(os.environ.get("SESSION_CACHE_TTL_SECONDS", "300"))
+session_cache = SessionCache(ttl_seconds=SESSION_CACHE_TTL_SECONDS)
+
+# Singleton service instance; the real service is created on first use
+# The probe reads a session id that never exists: one indexed lookup, never cached
+db_service = LazyDatabaseService(
+    lambda: CachedDatabaseService(create_database_service(), session_cache),
+    probe=lambda service: service.get_session("__health_probe__")
+) 
\ No newline at end of file
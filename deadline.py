@@ -0,0 +1,117 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline expires or the request is cancelled."""
+
+
+class Deadline:
+    """
+    Time budget for a single request, passed through every stage of the turn pipeline.
+
+    Each stage (transcription, LLM, summarization, wrap-up, TTS) asks the deadline
+    for its remaining budget instead of using a fixed timeout, so the stages of a
+    turn can never add up to more than the request's budget. Cancelling the
+    deadline (e.g. when the HTTP client disconnects) makes every later stage fail
+    fast and releases the caller of any call running through run().
+    """
+
+    def __init__(self, budget_seconds: float):
+        """
+        Start a new deadline.
+
+        Args:
+            budget_seconds: Total time budget for the request in seconds
+        """
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+        self.cancel_reason: Optional[str] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() has been called."""
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Cancel the request; all stages that have not finished yet are abandoned."""
+        if not self._cancelled.is_set():
+            self.cancel_reason = reason
+            self._cancelled.set()
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (0 once expired or cancelled)."""
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """True once the budget is used up or the request was cancelled."""
+        return self.remaining() <= 0
+
+    def check(self, stage: str = "request") -> None:
+        """Raise DeadlineExceeded if the deadline has expired or was cancelled."""
+        if self.cancelled:
+            raise DeadlineExceeded(f"{stage} cancelled: {self.cancel_reason}")
+        if self.expired():
+            raise DeadlineExceeded(f"{stage} timed out after {self.budget_seconds:.0f}s request deadline")
+
+    def timeout_for(self, stage: str = "request", stage_limit: Optional[float] = None) -> float:
+        """
+        Get the timeout to use for one stage.
+
+        Args:
+            stage: Name of the stage, used in error messages
+            stage_limit: Optional upper bound for this stage on its own
+
+        Returns:
+            float: Remaining budget, capped at stage_limit
+
+        Raises:
+            DeadlineExceeded: If there is no budget left for the stage
+        """
+        self.check(stage)
+        remaining = self.remaining()
+        if stage_limit is not None:
+            return min(remaining, stage_limit)
+        return remaining
+
+    def run(self, func: Callable[..., Any], *args, stage: str = "request", **kwargs) -> Any:
+        """
+        Call func and return its result, giving up when the deadline expires or is cancelled.
+
+        The blocking call runs on a daemon worker thread, so the caller is released
+        as soon as the deadline ends even if the underlying HTTP call has not
+        returned yet. The HTTP request itself is not cancelled: it keeps running
+        (and is billed) until it returns or hits its own timeout. Every stage
+        therefore passes the remaining budget as that timeout and makes a single
+        attempt (no client retries), so abandoned work ends by the deadline.
+        func should only perform the remote call and leave any shared state
+        changes to the caller.
+
+        Raises:
+            DeadlineExceeded: If the deadline ends before func returns
+        """
+        self.check(stage)
+        outcome = {}
+        done = threading.Event()
+
+        def target():
+            try:
+                outcome["result"] = func(*args, **kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=target, name=f"deadline-{stage}", daemon=True).start()
+
+        while not done.wait(timeout=min(0.05, max(self.remaining(), 0.001))):
+            if self.expired():
+                self.check(stage)
+
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
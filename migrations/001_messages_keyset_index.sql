@@ -0,0 +1,5 @@
+-- Keyset pagination of conversation history on (created_at, id)
+-- Lets GET /api/sessions/{id}/messages?after=...&limit=... read a page with an
+-- index range scan instead of sorting the whole session.
+CREATE INDEX IF NOT EXISTS idx_messages_session_created_id
+  ON public.messages (session_id, created_at, id);
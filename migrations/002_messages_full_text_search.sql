@@ -0,0 +1,64 @@
+-- Indexed full-text search over messages
+-- Replaces the ilike '%query%' sequential scan in search_messages_global with a
+-- GIN-indexed tsvector, ranked results, highlighted snippets and filters.
+
+-- Stored tsvector kept in sync by Postgres on every insert/update
+ALTER TABLE public.messages
+  ADD COLUMN IF NOT EXISTS text_search tsvector
+  GENERATED ALWAYS AS (to_tsvector('english', coalesce(text_content, ''))) STORED;
+
+-- Replaces the expression index from the initial schema, which queries did not use
+DROP INDEX IF EXISTS public.idx_messages_text_content;
+CREATE INDEX IF NOT EXISTS idx_messages_text_search
+  ON public.messages USING gin (text_search);
+
+CREATE INDEX IF NOT EXISTS idx_messages_created_at
+  ON public.messages (created_at);
+
+-- Ranked search with optional filters, called through supabase.rpc("search_messages", ...)
+-- Returns result_limit + 1 rows at most so callers can tell whether there is another page.
+CREATE OR REPLACE FUNCTION public.search_messages(
+  search_query TEXT,
+  session_filter TEXT DEFAULT NULL,
+  user_filter UUID DEFAULT NULL,
+  created_after TIMESTAMPTZ DEFAULT NULL,
+  created_before TIMESTAMPTZ DEFAULT NULL,
+  result_limit INTEGER DEFAULT 20,
+  result_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+  id UUID,
+  message_id TEXT,
+  session_id TEXT,
+  sender TEXT,
+  text_content TEXT,
+  created_at TIMESTAMPTZ,
+  rank REAL,
+  snippet TEXT
+)
+LANGUAGE sql STABLE
+AS $$
+  WITH query AS (
+    SELECT websearch_to_tsquery('english', search_query) AS q
+  ),
+  matches AS (
+    SELECT m.id, m.message_id, s.session_id, m.sender, m.text_content, m.created_at,
+           ts_rank_cd(m.text_search, query.q) AS rank, query.q
+    FROM public.messages m
+    JOIN public.sessions s ON s.id = m.session_id
+    CROSS JOIN query
+    WHERE m.text_search @@ query.q
+      AND (session_filter IS NULL OR s.session_id = session_filter)
+      AND (user_filter IS NULL OR s.user_id = user_filter)
+      AND (created_after IS NULL OR m.created_at >= created_after)
+      AND (created_before IS NULL OR m.created_at < created_before)
+    ORDER BY rank DESC, m.created_at DESC, m.id
+    LIMIT result_limit + 1 OFFSET result_offset
+  )
+  -- Snippets are only built for the rows of the page, not for every match
+  SELECT id, message_id, session_id, sender, text_content, created_at, rank,
+         ts_headline('english', text_content, q,
+                     'StartSel=<b>, StopSel=</b>, MaxWords=24, MinWords=8, MaxFragments=2') AS snippet
+  FROM matches
+  ORDER BY rank DESC, created_at DESC, id;
+$$;
@@ -0,0 +1,6 @@
+-- Keyset pagination of the session listing used by data exports
+-- get_sessions_page reads sessions newest first on (created_at, id) with the
+-- export filters (status, rating, date range, session ids) applied in the query,
+-- so an export only reads the sessions it writes.
+CREATE INDEX IF NOT EXISTS idx_sessions_created_id
+  ON public.sessions (created_at DESC, id DESC);
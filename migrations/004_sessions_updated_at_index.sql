@@ -0,0 +1,5 @@
+-- Incremental data exports
+-- export_conversations.py --incremental only reads sessions created or updated
+-- since the watermark of its previous run (updated_at >= watermark).
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at
+  ON public.sessions (updated_at);
@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config import (
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_DEFAULT_DELAY_SECONDS,
+    HEDGE_LATENCY_WINDOW
+)
+from deadline import DeadlineExceeded
+
+
+class LatencyTracker:
+    """Thread-safe record of recent response latencies per model."""
+
+    def __init__(self, window: int = HEDGE_LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        """Add one latency sample for a model."""
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def sample_count(self, model: str) -> int:
+        with self._lock:
+            return len(self._samples.get(model, ()))
+
+    def percentile(self, model: str, percentile: float) -> Optional[float]:
+        """Return the nearest-rank latency percentile for a model, or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if not samples:
+            return None
+        rank = max(1, int(round(percentile / 100.0 * len(samples))))
+        return samples[min(rank, len(samples)) - 1]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return sample counts and p50/p95 latencies for every model seen so far."""
+        with self._lock:
+            models = list(self._samples)
+        return {
+            model: {
+                "samples": self.sample_count(model),
+                "p50": self.percentile(model, 50),
+                "p95": self.percentile(model, 95)
+            }
+            for model in models
+        }
+
+
+# Shared by all conversations so the percentiles reflect the whole process
+latency_tracker = LatencyTracker()
+
+
+class ModelRouter:
+    """
+    Sends a request to the primary model and hedges it with a secondary model.
+
+    The secondary model is only asked when the primary has not produced an answer
+    by its HEDGE_PERCENTILE latency (or immediately if the primary fails), so the
+    tail latency of a turn is bounded while the average cost barely changes. The
+    first valid answer wins and the other request is abandoned: its result is
+    discarded and it is bounded by the timeout it was started with.
+    """
+
+    def __init__(self, primary_name: str, primary_llm: Any,
+                 secondary_name: Optional[str] = None, secondary_llm: Any = None,
+                 tracker: LatencyTracker = latency_tracker):
+        """
+        Initialize the router.
+
+        Args:
+            primary_name: Model name of the primary model
+            primary_llm: Chat model used for the primary request
+            secondary_name: Model name of the hedge model, or None to disable hedging
+            secondary_llm: Chat model used for hedged requests
+            tracker: Latency tracker shared between routers
+        """
+        self.primary_name = primary_name
+        self.primary_llm = primary_llm
+        self.secondary_name = secondary_name if secondary_llm is not None else None
+        self.secondary_llm = secondary_llm
+        self.tracker = tracker
+        self.last_model_used: Optional[str] = None
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary model before sending the hedged request."""
+        if self.tracker.sample_count(self.primary_name) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_SECONDS
+        return self.tracker.percentile(self.primary_name, HEDGE_PERCENTILE)
+
+    def _start_attempt(self, name, llm, prompt, deadline, stage, results):
+        """Start one model request on a daemon thread; its outcome is put on results."""
+        timeout = deadline.timeout_for(stage)
+
+        def attempt():
+            start_time = time.monotonic()
+            try:
+                content = llm.invoke(prompt, timeout=timeout).content
+                if not content or not content.strip():
+                    raise ValueError(f"{name} returned an empty response")
+                self.tracker.record(name, time.monotonic() - start_time)
+                results.put((name, content, None))
+            except Exception as e:
+                results.put((name, None, e))
+
+        threading.Thread(target=attempt, name=f"model-{stage}", daemon=True).start()
+
+    def invoke(self, prompt: Any, deadline, stage: str = "llm") -> str:
+        """
+        Get a response for prompt within the deadline, hedging if the primary is slow.
+
+        Returns:
+            str: Content of the first valid response
+
+        Raises:
+            DeadlineExceeded: If the deadline ends before any model answers
+            Exception: The last model error if every attempt failed
+        """
+        results = queue.Queue()
+        self._start_attempt(self.primary_name, self.primary_llm, prompt, deadline, stage, results)
+        outstanding = 1
+        hedged = self.secondary_llm is None
+        hedge_at = time.monotonic() + self.hedge_delay()
+        last_error = None
+
+        while outstanding > 0:
+            deadline.check(stage)
+            try:
+                name, content, error = results.get(timeout=0.05)
+            except queue.Empty:
+                if not hedged and time.monotonic() >= hedge_at:
+                    # The primary is slower than usual: race it against the secondary model
+                    self._start_attempt(self.secondary_name, self.secondary_llm, prompt, deadline, stage, results)
+                    outstanding += 1
+                    hedged = True
+                continue
+
+            outstanding -= 1
+            if error is None:
+                self.last_model_used = name
+                return content
+
+            last_error = error
+            if not hedged:
+                # The primary failed outright; fail over immediately instead of waiting
+                self._start_attempt(self.secondary_name, self.secondary_llm, prompt, deadline, stage, results)
+                outstanding += 1
+                hedged = True
+
+        raise last_error if last_error is not None else DeadlineExceeded(f"{stage} produced no response")
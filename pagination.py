@@ -0,0 +1,199 @@
+import base64
+import json
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Cursor values come from clients and end up in PostgREST filter strings, so
+# only ISO-8601 timestamps and canonical UUIDs (or in-memory message ids) pass
+_TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,9})?(Z|[+-]\d{2}(:?\d{2})?)?")
+# In-memory ids are msg-xxxxxxxx (new messages) or msg-{session_id}-{position} (history)
+_MESSAGE_ID_PATTERN = re.compile(r"msg-[A-Za-z0-9_-]{1,128}")
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """Encode a (created_at, id) position as an opaque URL-safe cursor"""
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def check_cursor_position(created_at: str, row_id: str, allow_message_ids: bool = False) -> None:
+    """
+    Check that a (created_at, id) position holds an ISO-8601 timestamp and a UUID.
+
+    Args:
+        allow_message_ids: Also accept the msg-... ids of in-memory messages
+
+    Raises:
+        ValueError: If either value has another shape
+    """
+    if not isinstance(created_at, str) or not _TIMESTAMP_PATTERN.fullmatch(created_at):
+        raise ValueError(f"Invalid cursor timestamp: {created_at!r}")
+    if allow_message_ids and isinstance(row_id, str) and _MESSAGE_ID_PATTERN.fullmatch(row_id):
+        return
+    try:
+        valid = isinstance(row_id, str) and str(uuid.UUID(row_id)) == row_id.lower()
+    except ValueError:
+        valid = False
+    if not valid:
+        raise ValueError(f"Invalid cursor id: {row_id!r}")
+
+
+def decode_cursor(cursor: str, allow_message_ids: bool = False) -> Tuple[str, str]:
+    """
+    Decode a cursor created by encode_cursor.
+
+    Args:
+        cursor: Cursor sent by the client
+        allow_message_ids: Also accept cursors of the in-memory history (msg-... ids)
+
+    Raises:
+        ValueError: If the cursor is malformed or its values are not a timestamp and an id
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    check_cursor_position(created_at, row_id, allow_message_ids)
+    return created_at, row_id
+
+
+def check_page_arguments(limit: int, after: Optional[str], before: Optional[str], since: Optional[str]) -> None:
+    """Validate the paging arguments shared by every backend"""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if sum(value is not None for value in (after, before, since)) > 1:
+        raise ValueError("Only one of after, before and since can be used")
+
+
+def build_page(rows: List[Dict[str, Any]], limit: int, descending: bool,
+               cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Turn limit + 1 rows fetched in keyset order into a page in conversation order.
+
+    Args:
+        rows: Rows ordered by (created_at, id), descending when paging backwards
+        limit: Page size; one extra row tells whether there are more rows
+        descending: True when the rows were fetched backwards (before=...)
+        cursor: The cursor the page was requested with
+
+    Returns:
+        Dict with messages (oldest first), has_more (in the paging direction),
+        next_cursor (after the newest message) and prev_cursor (before the oldest)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if descending:
+        rows.reverse()
+
+    if rows:
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        prev_cursor = encode_cursor(rows[0]["created_at"], rows[0]["id"])
+    else:
+        # Nothing new: keep polling from the same position
+        next_cursor = prev_cursor = cursor
+
+    return {
+        "messages": rows,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
+
+
+def postgrest_keyset_filter(direction: str, created_at: str, row_id: str) -> str:
+    """
+    Build the PostgREST or-filter for rows after/before a (created_at, id) position.
+
+    Args:
+        direction: "after" or "before"
+        created_at: created_at of the cursor row
+        row_id: id of the cursor row
+
+    Raises:
+        ValueError: If created_at is not an ISO-8601 timestamp or row_id not a UUID
+    """
+    check_cursor_position(created_at, row_id)
+    op = "gt" if direction == "after" else "lt"
+    # Timestamps contain ':' and '+', so they are quoted for the PostgREST parser
+    return f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{row_id})'
+
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def check_search_arguments(query: str, limit: int, offset: int) -> None:
+    """Validate the search arguments shared by every backend"""
+    if not query or not query.strip():
+        raise ValueError("Search query must not be empty")
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_SEARCH_LIMIT}")
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+
+
+def build_search_page(rows: List[Dict[str, Any]], limit: int, offset: int) -> Dict[str, Any]:
+    """Turn limit + 1 ranked search rows into a page of results"""
+    has_more = len(rows) > limit
+    return {
+        "results": rows[:limit],
+        "has_more": has_more,
+        "next_offset": offset + limit if has_more else None
+    }
+
+
+DEFAULT_SESSION_PAGE_SIZE = 500
+MAX_SESSION_PAGE_SIZE = 1000
+
+SESSION_COLUMNS = (
+    "id", "session_id", "user_id", "status", "created_at", "updated_at", "ended_at",
+    "message_count", "summary", "duration_seconds", "rating", "feedback"
+)
+
+
+MESSAGE_COLUMNS = ("id", "session_id", "message_id", "sender", "text_content", "created_at")
+
+# Bulk message reads are split into requests of this many rows (PostgREST caps responses)
+MESSAGE_FETCH_PAGE_SIZE = 1000
+
+
+def select_columns(columns: Optional[List[str]], allowed: Tuple[str, ...], required: Tuple[str, ...]) -> List[str]:
+    """
+    Validate the columns to read; the required columns are always included.
+
+    Raises:
+        ValueError: For a column that is not in allowed
+    """
+    if not columns:
+        return list(allowed)
+    unknown = set(columns) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown columns: {sorted(unknown)}")
+    return list(required) + [c for c in dict.fromkeys(columns) if c not in required]
+
+
+def session_select_columns(columns: Optional[List[str]]) -> List[str]:
+    """Validate the session columns to read; id and created_at are always included (keyset)"""
+    return select_columns(columns, SESSION_COLUMNS, ("id", "created_at"))
+
+
+def message_select_columns(columns: Optional[List[str]]) -> List[str]:
+    """Validate the message columns to read; id, session_id and created_at are always included"""
+    return select_columns(columns, MESSAGE_COLUMNS, ("id", "session_id", "created_at"))
+
+
+def build_session_page(rows: List[Dict[str, Any]], limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Turn limit + 1 session rows fetched newest first into a page with a cursor to the next one"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "sessions": rows,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if rows else cursor
+    }
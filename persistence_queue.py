@@ -0,0 +1,337 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Errors a retry cannot fix (bad payload, constraint violation, unknown column):
+# writes failing with them are dead-lettered at once instead of being retried
+NON_RETRYABLE_ERRORS = (ValueError, TypeError, KeyError)
+# SQLSTATE classes 22 (data exception), 23 (integrity constraint violation) and
+# 42 (syntax error or undefined object), and PostgREST's request (PGRST1xx) and
+# schema (PGRST2xx) errors; PGRST0xx are connection errors and stay retryable
+NON_RETRYABLE_CODE_PREFIXES = ("22", "23", "42", "PGRST1", "PGRST2")
+
+
+def is_retryable(error: Exception) -> bool:
+    """True unless the error means the write will fail the same way on every attempt."""
+    if isinstance(error, NON_RETRYABLE_ERRORS) and not isinstance(error, json.JSONDecodeError):
+        return False
+    # postgrest APIError carries the SQLSTATE or PostgREST code; httpx errors the HTTP status
+    code = str(getattr(error, "code", "") or "")
+    if code.startswith(NON_RETRYABLE_CODE_PREFIXES):
+        return False
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status not in (408, 429))
+
+
+class PersistenceQueue:
+    """
+    Write-behind queue that moves database writes out of the request path.
+
+    Every write is first appended to a local SQLite spool (WAL mode), so it
+    survives both a database outage and a restart of the API. A background
+    thread replays the spool in order, merging consecutive writes of the same
+    session into one call (e.g. the message-count updates of several turns
+    become a single update_session). A session whose write fails backs off
+    exponentially on its own while the writes of other sessions continue; when
+    several sessions fail and nothing succeeds (the database is unreachable),
+    the whole writer backs off and keeps the writes spooled until it recovers.
+    Writes that keep failing, or fail with an error a retry cannot fix, are
+    moved to a dead-letter table instead of blocking their session forever.
+    """
+
+    OPERATIONS = ("create_session", "save_messages", "update_session", "end_session")
+
+    def __init__(self, db, spool_path: str = "persistence_spool.db", batch_size: int = 200,
+                 poll_interval: float = 0.2, backoff_base: float = 0.5, backoff_max: float = 60.0,
+                 max_attempts: int = 20):
+        """
+        Initialize the queue and open (or create) the spool file.
+
+        Args:
+            db: Database service the writes are applied to
+            spool_path: Path of the SQLite spool file
+            batch_size: Maximum number of spooled writes replayed per batch
+            poll_interval: Seconds the writer sleeps when there is nothing to do
+            backoff_base: First retry delay in seconds after a failed write
+            backoff_max: Upper bound for the retry delay in seconds
+            max_attempts: Attempts before a write is moved to the dead-letter table
+        """
+        self.db = db
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+
+        self._conn = sqlite3.connect(spool_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending_writes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_writes_session ON pending_writes (session_id)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letter_writes (
+                id INTEGER PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                failed_at REAL NOT NULL
+            )
+        """)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+        # session_id -> (consecutive failures, monotonic time of the next attempt)
+        self._session_backoff: Dict[str, Tuple[int, float]] = {}
+        self.written = 0
+        self.last_error: Optional[str] = None
+
+    def enqueue(self, session_id: str, operation: str, **payload) -> int:
+        """
+        Spool one write and wake the writer thread.
+
+        Args:
+            session_id: Session the write belongs to; writes of a session are applied in order
+            operation: One of OPERATIONS
+            **payload: Arguments of the operation
+
+        Returns:
+            int: Spool id of the write
+        """
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Unknown persistence operation: {operation}")
+        # Timestamp rows when they are created, not when they are replayed after an outage
+        now = datetime.utcnow()
+        if operation == "create_session":
+            payload.setdefault("created_at", now.isoformat() + "Z")
+        elif operation == "save_messages":
+            payload["messages"] = [
+                dict(message, created_at=message.get("created_at") or (now + timedelta(microseconds=index)).isoformat() + "Z")
+                for index, message in enumerate(payload["messages"])
+            ]
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO pending_writes (session_id, operation, payload, enqueued_at) VALUES (?, ?, ?, ?)",
+                (session_id, operation, json.dumps(payload), time.time())
+            )
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def has_pending(self, session_id: str) -> bool:
+        """True if the session has writes that have not reached the database yet."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM pending_writes WHERE session_id = ? LIMIT 1", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, lag and failure information for the health endpoint."""
+        with self._lock:
+            depth, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM pending_writes"
+            ).fetchone()
+            dead_letters = self._conn.execute("SELECT COUNT(*) FROM dead_letter_writes").fetchone()[0]
+        return {
+            "queue_depth": depth,
+            "lag_seconds": round(time.time() - oldest, 3) if oldest is not None else 0.0,
+            "dead_letters": dead_letters,
+            "written": self.written,
+            "consecutive_failures": self._consecutive_failures,
+            "retry_in_seconds": round(max(0.0, self._retry_at - time.monotonic()), 3),
+            "sessions_backing_off": len(self._session_backoff),
+            "last_error": self.last_error
+        }
+
+    def start(self) -> None:
+        """Start the background writer; spooled writes from a previous run are replayed first."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._thread.start()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until every spooled write has been applied.
+
+        Returns:
+            bool: True if the spool is empty, False if the timeout was reached first
+        """
+        end_time = time.monotonic() + timeout
+        while time.monotonic() < end_time:
+            if self.stats()["queue_depth"] == 0:
+                return True
+            if not self._database_ready():
+                break  # Nothing can be written until the database is back
+            self._wakeup.set()
+            time.sleep(min(self.poll_interval, 0.05))
+        return self.stats()["queue_depth"] == 0
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """Flush for up to timeout seconds and stop the writer; unflushed writes stay spooled."""
+        flushed = self.flush(timeout)
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        return flushed
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(timeout=self.poll_interval)
+            self._wakeup.clear()
+            if time.monotonic() < self._retry_at or not self._database_ready():
+                continue
+            try:
+                while self.process_batch() and time.monotonic() >= self._retry_at:
+                    pass
+            except Exception as e:
+                # Never let the writer thread die; the writes stay spooled
+                print(f"⚠️ Persistence writer error: {e}")
+
+    def _database_ready(self) -> bool:
+        # While a lazily connected database reports itself down, leave the writes
+        # spooled instead of spending their attempts (and dead-lettering them)
+        is_available = getattr(self.db, "is_available", None)
+        return is_available is None or is_available()
+
+    def process_batch(self) -> int:
+        """
+        Replay one batch of spooled writes, leaving out sessions that are backing off.
+
+        Returns:
+            int: Number of spooled writes that were applied
+        """
+        now = time.monotonic()
+        waiting = [session_id for session_id, (_, retry_at) in self._session_backoff.items() if retry_at > now]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, session_id, operation, payload, attempts FROM pending_writes "
+                f"WHERE session_id NOT IN ({','.join('?' * len(waiting))}) ORDER BY id LIMIT ?",
+                waiting + [self.batch_size]
+            ).fetchall()
+        if not rows:
+            return 0
+
+        applied = 0
+        failed_sessions = set()
+        for session_id, steps in self._group_by_session(rows).items():
+            for operation, payload, ids, attempts in steps:
+                try:
+                    self._apply(session_id, operation, payload)
+                except Exception as e:
+                    if self._record_failure(ids, attempts, e):
+                        self._session_backoff.pop(session_id, None)
+                        continue
+                    failed_sessions.add(session_id)
+                    self._back_off(session_id)
+                    # Keep the session's order: its later writes wait for this one
+                    break
+                self._delete(ids)
+                self._session_backoff.pop(session_id, None)
+                applied += len(ids)
+
+        if len(failed_sessions) > 1 and not applied:
+            # Every session failed: the database is unreachable, not one write bad
+            self._consecutive_failures += 1
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (self._consecutive_failures - 1))
+            self._retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+        elif applied:
+            self._consecutive_failures = 0
+            self._retry_at = 0.0
+        self.written += applied
+        return applied
+
+    def _back_off(self, session_id: str) -> None:
+        """Hold back the session's writes for an exponentially growing, jittered delay."""
+        failures = self._session_backoff.get(session_id, (0, 0.0))[0] + 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (failures - 1))
+        self._session_backoff[session_id] = (failures, time.monotonic() + delay * random.uniform(0.5, 1.0))
+
+    def _group_by_session(self, rows) -> Dict[str, List[tuple]]:
+        """Group spooled rows per session and merge consecutive writes that can be combined."""
+        sessions: Dict[str, List[tuple]] = {}
+        for row_id, session_id, operation, payload_json, attempts in rows:
+            payload = json.loads(payload_json)
+            steps = sessions.setdefault(session_id, [])
+            if steps and steps[-1][0] == operation and operation in ("save_messages", "update_session"):
+                _, previous, ids, previous_attempts = steps[-1]
+                if operation == "save_messages":
+                    merged = {"messages": previous["messages"] + payload["messages"]}
+                else:
+                    merged = {"updates": {**previous["updates"], **payload["updates"]}}
+                steps[-1] = (operation, merged, ids + [row_id], max(previous_attempts, attempts))
+            else:
+                steps.append((operation, payload, [row_id], attempts))
+        return sessions
+
+    def _apply(self, session_id: str, operation: str, payload: Dict[str, Any]) -> None:
+        if operation == "create_session":
+            self.db.create_session(session_id, user_id=payload.get("user_id"), created_at=payload.get("created_at"))
+        elif operation == "save_messages":
+            self.db.save_messages(session_id, payload["messages"])
+        elif operation == "update_session":
+            self.db.update_session(session_id, payload["updates"])
+        elif operation == "end_session":
+            self.db.end_session(session_id=session_id, **payload)
+
+    def _delete(self, ids: List[int]) -> None:
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            self._conn.execute(f"DELETE FROM pending_writes WHERE id IN ({placeholders})", ids)
+
+    def _record_failure(self, ids: List[int], attempts: int, error: Exception) -> bool:
+        """
+        Count a failed attempt; dead-letter the writes once they ran out of attempts or cannot succeed.
+
+        Returns:
+            bool: True if the writes were moved to the dead-letter table
+        """
+        self.last_error = str(error)
+        dead = attempts + 1 >= self.max_attempts or not is_retryable(error)
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                f"UPDATE pending_writes SET attempts = attempts + 1, last_error = ? WHERE id IN ({placeholders})",
+                [str(error)] + ids
+            )
+            if dead:
+                self._conn.execute(
+                    f"""INSERT INTO dead_letter_writes
+                        SELECT id, session_id, operation, payload, enqueued_at, attempts, last_error, ?
+                        FROM pending_writes WHERE id IN ({placeholders})""",
+                    [time.time()] + ids
+                )
+                self._conn.execute(f"DELETE FROM pending_writes WHERE id IN ({placeholders})", ids)
+            self._conn.execute("COMMIT")
+        if dead:
+            print(f"⚠️ Moved {len(ids)} write(s) to the dead-letter table after {attempts + 1} attempt(s): {error}")
+        else:
+            print(f"⚠️ Database write failed (attempt {attempts + 1}), will retry: {error}")
+        return dead
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class SessionCache:
+    """
+    Thread-safe TTL cache of session rows keyed by session_id.
+
+    Session rows rarely change, and every change goes through update_session or
+    end_session, which refresh the cached row. The TTL bounds how stale a row
+    can get when it is changed by another process (e.g. another uvicorn worker).
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 10000):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: How long a cached row is served before it is read again
+            max_entries: Number of sessions kept; the least recently used are evicted
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._rows: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached row, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._rows.get(session_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._rows[session_id]
+                self.misses += 1
+                return None
+            self._rows.move_to_end(session_id)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, session_id: str, row: Dict[str, Any]) -> None:
+        """Cache a session row for ttl_seconds."""
+        with self._lock:
+            self._rows[session_id] = (time.monotonic() + self.ttl_seconds, dict(row))
+            self._rows.move_to_end(session_id)
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop a session's row so the next read goes to the database."""
+        with self._lock:
+            if self._rows.pop(session_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size, hit/miss counts and hit rate for the health endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._rows),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions
+            }
+
+
+class CachedDatabaseService:
+    """
+    Read-through session cache in front of a database service.
+
+    get_session and get_session_uuid are answered from the cache when possible;
+    create_session, update_session and end_session refresh it with the row the
+    database returned. Every other method is passed through unchanged.
+    """
+
+    def __init__(self, service, cache: SessionCache):
+        self.service = service
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.service, name)
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self.cache.get(session_id)
+        if row is None:
+            row = self.service.get_session(session_id)
+            if row:
+                self.cache.put(session_id, row)
+        return row
+
+    def get_session_uuid(self, session_id: str) -> Optional[str]:
+        row = self.get_session(session_id)
+        return row["id"] if row else None
+
+    def create_session(self, session_id: str, *args, **kwargs) -> Dict[str, Any]:
+        row = self.service.create_session(session_id, *args, **kwargs)
+        self.cache.put(session_id, row)
+        return row
+
+    def update_session(self, session_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        self.cache.invalidate(session_id)
+        row = self.service.update_session(session_id, updates)
+        self.cache.put(session_id, row)
+        return row
+
+    def end_session(self, session_id: str, *args, **kwargs) -> Dict[str, Any]:
+        # end_session goes through the wrapped service's own update_session
+        self.cache.invalidate(session_id)
+        row = self.service.end_session(session_id, *args, **kwargs)
+        self.cache.put(session_id, row)
+        return row
+
@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class SessionUpdateCoalescer:
+    """
+    Collects per-session field updates in memory and writes them out in batches.
+
+    Counters such as message_count change on every turn, but only the latest
+    value matters. Updates are merged per session and handed to the sink at most
+    once per flush interval, when the session ends (flush(session_id)) or at
+    shutdown (stop()), whichever comes first.
+    """
+
+    def __init__(self, sink: Callable[[str, Dict[str, Any]], Any], flush_interval_seconds: float = 10.0):
+        """
+        Initialize the coalescer.
+
+        Args:
+            sink: Called as sink(session_id, updates) to write merged updates
+            flush_interval_seconds: Maximum time an update waits in memory
+        """
+        self.sink = sink
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._first_update_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.updates_received = 0
+        self.flushes = 0
+
+    def update(self, session_id: str, **fields) -> None:
+        """Merge fields into the session's pending update."""
+        with self._lock:
+            self._pending.setdefault(session_id, {}).update(fields)
+            self._first_update_at.setdefault(session_id, time.monotonic())
+            self.updates_received += 1
+
+    def flush(self, session_id: Optional[str] = None) -> int:
+        """
+        Write pending updates now.
+
+        Args:
+            session_id: Only flush this session; all sessions when None
+
+        Returns:
+            int: Number of sessions written
+        """
+        with self._lock:
+            session_ids = [session_id] if session_id is not None else list(self._pending)
+            batch = {sid: self._pending.pop(sid) for sid in session_ids if sid in self._pending}
+            for sid in batch:
+                self._first_update_at.pop(sid, None)
+        return self._write(batch)
+
+    def _flush_due(self) -> int:
+        """Write the sessions whose oldest pending update has waited a full interval."""
+        cutoff = time.monotonic() - self.flush_interval_seconds
+        with self._lock:
+            due = [sid for sid, since in self._first_update_at.items() if since <= cutoff]
+            batch = {sid: self._pending.pop(sid) for sid in due}
+            for sid in due:
+                self._first_update_at.pop(sid, None)
+        return self._write(batch)
+
+    def _write(self, batch: Dict[str, Dict[str, Any]]) -> int:
+        written = 0
+        for session_id, updates in batch.items():
+            try:
+                self.sink(session_id, updates)
+                written += 1
+            except Exception as e:
+                print(f"⚠️ Failed to write session updates for {session_id}: {e}")
+                # Put the updates back under any newer values so they are retried
+                with self._lock:
+                    self._pending[session_id] = {**updates, **self._pending.get(session_id, {})}
+                    self._first_update_at.setdefault(session_id, time.monotonic())
+        self.flushes += written
+        return written
+
+    def start(self) -> None:
+        """Start the background thread that flushes due sessions."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="session-update-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> int:
+        """Stop the background thread and flush everything that is still pending."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        return self.flush()
+
+    def _run(self) -> None:
+        poll_interval = min(1.0, self.flush_interval_seconds / 2)
+        while not self._stopping.wait(timeout=poll_interval):
+            self._flush_due()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pending and written counts for the health endpoint."""
+        with self._lock:
+            pending_sessions = len(self._pending)
+        return {
+            "pending_sessions": pending_sessions,
+            "updates_received": self.updates_received,
+            "flushes": self.flushes
+        }
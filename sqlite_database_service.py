@@ -0,0 +1,431 @@
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any
+
+from pagination import (
+    DEFAULT_PAGE_SIZE, decode_cursor, check_page_arguments, build_page,
+    DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, check_search_arguments, build_search_page,
+    DEFAULT_SESSION_PAGE_SIZE, MAX_SESSION_PAGE_SIZE, session_select_columns, build_session_page,
+    message_select_columns
+)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    session_id TEXT UNIQUE NOT NULL,
+    user_id TEXT,
+    status TEXT NOT NULL DEFAULT 'active' CHECK (status IN ('active', 'ended')),
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    ended_at TEXT,
+    message_count INTEGER DEFAULT 0,
+    summary TEXT,
+    duration_seconds INTEGER,
+    rating INTEGER CHECK (rating >= 1 AND rating <= 5),
+    feedback TEXT
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    message_id TEXT UNIQUE NOT NULL,
+    sender TEXT NOT NULL CHECK (sender IN ('user', 'ai')),
+    text_content TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions(created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_created_id ON sessions(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at);
+CREATE INDEX IF NOT EXISTS idx_messages_session_created ON messages(session_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at);
+
+-- Full-text index over messages.text_content, kept in sync by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text_content,
+    content='messages',
+    content_rowid='rowid',
+    tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, text_content) VALUES (new.rowid, new.text_content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, text_content) VALUES ('delete', old.rowid, old.text_content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF text_content ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, text_content) VALUES ('delete', old.rowid, old.text_content);
+    INSERT INTO messages_fts(rowid, text_content) VALUES (new.rowid, new.text_content);
+END;
+"""
+
+# Columns update_session may change; keys are interpolated into SQL, so they are whitelisted
+SESSION_UPDATE_COLUMNS = {
+    "user_id", "status", "updated_at", "ended_at", "message_count",
+    "summary", "duration_seconds", "rating", "feedback"
+}
+
+
+def to_fts5_query(query: str) -> str:
+    """
+    Translate a web-search style query into a safe FTS5 MATCH expression.
+
+    Words are ANDed, "quoted text" is a phrase, -word excludes a term and
+    "or" between two terms matches either. Every term is quoted, so FTS5
+    syntax in user input is never interpreted.
+
+    Raises:
+        ValueError: If the query has no term to match
+    """
+    positive: List[str] = []
+    negative: List[str] = []
+    pending_or = False
+    for negate, phrase, word in re.findall(r'(-?)(?:"([^"]*)"|(\S+))', query):
+        if not phrase and word.lower() == "or":
+            pending_or = bool(positive)
+            continue
+        words = re.findall(r"\w+", phrase or word)
+        if not words:
+            continue
+        term = '"' + " ".join(words) + '"'
+        if negate:
+            negative.append(term)
+        elif pending_or:
+            positive[-1] = f"({positive[-1]} OR {term})"
+            pending_or = False
+        else:
+            positive.append(term)
+
+    if not positive:
+        raise ValueError("Search query must contain at least one word to match")
+    expression = " AND ".join(positive)
+    for term in negative:
+        expression = f"({expression}) NOT {term}"
+    return expression
+
+
+class SQLiteDatabaseService:
+    """
+    Local SQLite implementation of the DatabaseService interface.
+
+    Uses the same tables, columns and return values as the Supabase service,
+    so it can replace it for single-node deployments and load tests without a
+    network hop. Each thread gets its own connection; WAL mode lets readers
+    run while a write is in progress.
+    """
+
+    def __init__(self, db_path: str = "kuku_coach.db"):
+        """
+        Open (or create) the SQLite database.
+
+        Args:
+            db_path: Path of the database file
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        had_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'"
+        ).fetchone() is not None
+        conn.executescript(SCHEMA)
+        if not had_fts:
+            # Index messages stored before full-text search existed
+            conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._connection().execute(sql, params).fetchall()]
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.utcnow().isoformat() + "Z"
+
+    def create_session(self, session_id: str, user_id: Optional[str] = None,
+                       created_at: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new session in the database"""
+        session_uuid = str(uuid.uuid4())
+        with self._write_lock:
+            self._connection().execute(
+                "INSERT INTO sessions (id, session_id, user_id, status, message_count, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'active', 0, ?, ?)",
+                (session_uuid, session_id, user_id, created_at or self._now(), self._now())
+            )
+        session = self.get_session(session_id)
+        if session:
+            return session
+        else:
+            raise Exception("Failed to create session in database")
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get session from the database"""
+        rows = self._query("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
+        return rows[0] if rows else None
+
+    def get_session_uuid(self, session_id: str) -> Optional[str]:
+        """Get the sessions.id UUID for a session_id"""
+        row = self._connection().execute(
+            "SELECT id FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row["id"] if row else None
+
+    def update_session(self, session_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Update session in the database"""
+        updates["updated_at"] = self._now()
+        unknown = set(updates) - SESSION_UPDATE_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown session columns: {', '.join(sorted(unknown))}")
+
+        assignments = ", ".join(f"{column} = ?" for column in updates)
+        with self._write_lock:
+            cursor = self._connection().execute(
+                f"UPDATE sessions SET {assignments} WHERE session_id = ?",
+                list(updates.values()) + [session_id]
+            )
+
+        if cursor.rowcount > 0:
+            return self.get_session(session_id)
+        else:
+            raise Exception(f"Failed to update session {session_id}")
+
+    def end_session(self, session_id: str, summary: str, duration: int,
+                   rating: Optional[int] = None, feedback: Optional[str] = None, message_count: Optional[int] = None) -> Dict[str, Any]:
+        """End session and save summary, including message count if provided"""
+        updates = {
+            "status": "ended",
+            "ended_at": self._now(),
+            "summary": summary,
+            "duration_seconds": duration,
+            "rating": rating,
+            "feedback": feedback
+        }
+        if message_count is not None:
+            updates["message_count"] = message_count
+        return self.update_session(session_id, updates)
+
+    def save_message(self, session_id: str, message_id: str, sender: str, text_content: str) -> Dict[str, Any]:
+        """Save a single message to the database"""
+        return self.save_messages(session_id, [{
+            "message_id": message_id,
+            "sender": sender,
+            "text_content": text_content
+        }])[0]
+
+    def save_messages(self, session_id: str, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Save several messages of a session in a single transaction.
+
+        Args:
+            session_id: The session the messages belong to
+            messages: Dicts with message_id, sender, text_content and optionally
+                created_at, in conversation order
+
+        Returns:
+            List of inserted message rows
+        """
+        if not messages:
+            return []
+
+        session_uuid = self.get_session_uuid(session_id)
+        if not session_uuid:
+            raise ValueError(f"Session {session_id} not found")
+
+        # Messages are ordered by created_at, so keep the timestamps strictly increasing
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "session_id": session_uuid,
+                "message_id": message["message_id"],
+                "sender": message["sender"],
+                "text_content": message["text_content"],
+                "created_at": message.get("created_at") or (now + timedelta(microseconds=index)).isoformat() + "Z"
+            }
+            for index, message in enumerate(messages)
+        ]
+
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT INTO messages (id, session_id, message_id, sender, text_content, created_at) "
+                    "VALUES (:id, :session_id, :message_id, :sender, :text_content, :created_at)",
+                    rows
+                )
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return rows
+
+    def get_conversation_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get all messages for a session in conversation order"""
+        session_uuid = self.get_session_uuid(session_id)
+        if not session_uuid:
+            return []
+        return self._query(
+            "SELECT * FROM messages WHERE session_id = ? ORDER BY created_at",
+            (session_uuid,)
+        )
+
+    def get_messages_for_sessions(self, session_uuids: List[str],
+                                  columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get the messages of many sessions with one IN (...) query, ordered by session, created_at and id"""
+        if not session_uuids:
+            return []
+        placeholders = ",".join("?" * len(session_uuids))
+        return self._query(
+            f"SELECT {', '.join(message_select_columns(columns))} FROM messages "
+            f"WHERE session_id IN ({placeholders}) ORDER BY session_id, created_at, id",
+            list(session_uuids)
+        )
+
+    def get_messages_page(self, session_id: str, limit: int = DEFAULT_PAGE_SIZE,
+                          after: Optional[str] = None, before: Optional[str] = None,
+                          since: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of a session's messages using keyset pagination on (created_at, id)"""
+        check_page_arguments(limit, after, before, since)
+        session_uuid = self.get_session_uuid(session_id)
+        if not session_uuid:
+            return build_page([], limit, descending=False, cursor=after or before)
+
+        sql = "SELECT * FROM messages WHERE session_id = ?"
+        params: List[Any] = [session_uuid]
+        if after or before:
+            created_at, row_id = decode_cursor(after or before)
+            op = ">" if after else "<"
+            # Row-value comparison walks idx_messages_session_created
+            sql += f" AND (created_at, id) {op} (?, ?)"
+            params += [created_at, row_id]
+        elif since:
+            sql += " AND created_at > ?"
+            params.append(since)
+
+        descending = before is not None
+        order = "DESC" if descending else "ASC"
+        sql += f" ORDER BY created_at {order}, id {order} LIMIT ?"
+        params.append(limit + 1)
+
+        return build_page(self._query(sql, params), limit, descending, cursor=after or before)
+
+    def get_sessions_page(self, columns: Optional[List[str]] = None, status: Optional[str] = None,
+                          min_rating: Optional[int] = None, created_after: Optional[str] = None,
+                          created_before: Optional[str] = None, session_ids: Optional[List[str]] = None,
+                          changed_since: Optional[str] = None,
+                          limit: int = DEFAULT_SESSION_PAGE_SIZE, after: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of sessions, newest first, filtered in SQL (see DatabaseService.get_sessions_page)"""
+        if not 1 <= limit <= MAX_SESSION_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_SESSION_PAGE_SIZE}")
+
+        # Column names are checked against SESSION_COLUMNS before they reach the SQL
+        sql = f"SELECT {', '.join(session_select_columns(columns))} FROM sessions WHERE 1 = 1"
+        params: List[Any] = []
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if min_rating is not None:
+            sql += " AND rating >= ?"
+            params.append(min_rating)
+        if created_after:
+            sql += " AND created_at >= ?"
+            params.append(created_after)
+        if created_before:
+            sql += " AND created_at < ?"
+            params.append(created_before)
+        if session_ids:
+            sql += f" AND session_id IN ({','.join('?' * len(session_ids))})"
+            params += list(session_ids)
+        if changed_since:
+            # Rows written before updated_at was set on insert only have created_at
+            sql += " AND COALESCE(updated_at, created_at) >= ?"
+            params.append(changed_since)
+        if after:
+            sql += " AND (created_at, id) < (?, ?)"
+            params += list(decode_cursor(after))
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        return build_session_page(self._query(sql, params), limit, cursor=after)
+
+    def search_messages(self, query: str, session_id: Optional[str] = None, user_id: Optional[str] = None,
+                        created_after: Optional[str] = None, created_before: Optional[str] = None,
+                        limit: int = DEFAULT_SEARCH_LIMIT, offset: int = 0) -> Dict[str, Any]:
+        """
+        Ranked full-text search over messages using the FTS5 index.
+
+        Takes the same arguments and returns the same shape as
+        DatabaseService.search_messages; rank is the negated bm25 score, so
+        higher is better in both backends.
+        """
+        check_search_arguments(query, limit, offset)
+        sql = (
+            "SELECT m.id, m.message_id, s.session_id, m.sender, m.text_content, m.created_at, "
+            "-bm25(messages_fts) AS rank, "
+            "snippet(messages_fts, 0, '<b>', '</b>', '…', 16) AS snippet "
+            "FROM messages_fts "
+            "JOIN messages m ON m.rowid = messages_fts.rowid "
+            "JOIN sessions s ON s.id = m.session_id "
+            "WHERE messages_fts MATCH ?"
+        )
+        params: List[Any] = [to_fts5_query(query)]
+        if session_id:
+            sql += " AND s.session_id = ?"
+            params.append(session_id)
+        if user_id:
+            sql += " AND s.user_id = ?"
+            params.append(user_id)
+        if created_after:
+            sql += " AND m.created_at >= ?"
+            params.append(created_after)
+        if created_before:
+            sql += " AND m.created_at < ?"
+            params.append(created_before)
+        sql += " ORDER BY bm25(messages_fts), m.created_at DESC, m.id LIMIT ? OFFSET ?"
+        params += [limit + 1, offset]
+
+        return build_search_page(self._query(sql, params), limit, offset)
+
+    def search_messages_global(self, query: str, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search messages across all sessions using the full-text index"""
+        try:
+            return self.search_messages(query, user_id=user_id, limit=MAX_SEARCH_LIMIT)["results"]
+        except Exception as e:
+            print(f"Search error: {e}")
+            return []
+
+    def debug_get_all_sessions(self) -> List[Dict[str, Any]]:
+        """Debug method to get all sessions and their message counts"""
+        try:
+            return self._query(
+                "SELECT session_id, status, message_count, created_at, ended_at, summary "
+                "FROM sessions ORDER BY created_at DESC"
+            )
+        except Exception as e:
+            print(f"Error getting sessions: {e}")
+            return []
+
+    def debug_update_message_count(self, session_id: str, message_count: int) -> Dict[str, Any]:
+        """Debug method to manually update a session's message count"""
+        print(f"🔧 DEBUG: Manually updating message_count for {session_id} to {message_count}")
+        return self.update_session(session_id, {"message_count": message_count})
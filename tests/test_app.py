@@ -0,0 +1,142 @@
+"""
+Offline tests for the API endpoints, run in memory (no database or OpenAI calls).
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from async_database_service import AsyncDatabaseService
+from deadline import Deadline, DeadlineExceeded
+from sqlite_database_service import SQLiteDatabaseService
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "DATABASE_CONFIGURED", False)
+    return TestClient(api.app)
+
+
+def create_session(client, history=()):
+    session_id = client.post("/api/sessions").json()["data"]["sessionId"]
+    chat_memory = api.session_conversations[session_id].memory.chat_memory
+    for i, text in enumerate(history):
+        if i % 2 == 0:
+            chat_memory.add_user_message(text)
+        else:
+            chat_memory.add_ai_message(text)
+    return session_id
+
+
+def test_in_memory_history_pages_follow_next_cursor(client):
+    session_id = create_session(client, ["one", "two", "three", "four", "five"])
+    url = f"/api/sessions/{session_id}/messages"
+
+    first = client.get(url, params={"limit": 2}).json()
+    assert first["success"], first
+    assert [m["text"] for m in first["data"]["messages"]] == ["one", "two"]
+
+    second = client.get(url, params={"limit": 2, "after": first["data"]["pagination"]["nextCursor"]}).json()
+    assert second["success"], second
+    assert [m["text"] for m in second["data"]["messages"]] == ["three", "four"]
+    assert second["data"]["pagination"]["hasMore"]
+
+
+def test_abandoned_turn_is_a_failure_and_is_not_stored(client, monkeypatch):
+    session_id = create_session(client)
+    conversation = api.session_conversations[session_id]
+
+    def abandoned(user_text, deadline=None):
+        raise DeadlineExceeded("llm cancelled: client disconnected")
+
+    monkeypatch.setattr(api, "transcribe_audio", lambda path, deadline=None: "Hello coach")
+    monkeypatch.setattr(conversation, "process_input", abandoned)
+    response = client.post(f"/api/sessions/{session_id}/messages", headers={"Idempotency-Key": "turn-1"},
+                           files={"audio": ("turn.wav", b"RIFF", "audio/wav")}).json()
+
+    assert not response["success"]
+    assert api.sessions[session_id]["messageCount"] == 0
+    assert api.turn_result_cache.get(session_id, "turn-1") is None
+
+
+def test_disconnect_does_not_cancel_a_turn_duplicates_wait_for():
+    class DisconnectedRequest:
+        async def is_disconnected(self):
+            return True
+
+    waiting = [True]
+    deadline = Deadline(5)
+
+    async def scenario():
+        watcher = asyncio.create_task(api.cancel_on_disconnect(DisconnectedRequest(), deadline, lambda: waiting[0]))
+        await asyncio.sleep(api.DISCONNECT_POLL_SECONDS * 3)
+        assert not deadline.cancelled
+        waiting[0] = False
+        await asyncio.wait_for(watcher, api.DISCONNECT_POLL_SECONDS * 3)
+
+    asyncio.run(scenario())
+    assert deadline.cancelled
+
+
+def test_concurrent_turns_of_a_session_run_one_at_a_time(monkeypatch):
+    import httpx
+
+    monkeypatch.setattr(api, "DATABASE_CONFIGURED", False)
+    monkeypatch.setattr(api, "transcribe_audio", lambda path, deadline=None: "Hello coach")
+    monkeypatch.setattr(api, "text_to_speech_api", lambda text, path, deadline=None: False)
+    active, overlaps = [0], []
+    lock = threading.Lock()
+
+    def process_input(user_text, deadline=None):
+        with lock:
+            active[0] += 1
+            overlaps.append(active[0])
+        time.sleep(0.2)
+        with lock:
+            active[0] -= 1
+        return "Tell me more."
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            session_id = (await client.post("/api/sessions")).json()["data"]["sessionId"]
+            conversation = api.session_conversations[session_id]
+            monkeypatch.setattr(conversation, "process_input", process_input)
+            monkeypatch.setattr(conversation, "should_wrap_up", lambda deadline=None: False)
+            send = lambda: client.post(f"/api/sessions/{session_id}/messages",
+                                       files={"audio": ("turn.wav", b"RIFF", "audio/wav")})
+            return session_id, await asyncio.gather(send(), send())
+
+    session_id, responses = asyncio.run(scenario())
+    assert all(response.json()["success"] for response in responses)
+    assert overlaps == [1, 1]
+    assert api.sessions[session_id]["messageCount"] == 4
+
+
+def test_history_reads_session_and_messages_from_the_database(client, monkeypatch, tmp_path):
+    db = SQLiteDatabaseService(str(tmp_path / "kuku_coach.db"))
+    monkeypatch.setattr(api, "database_available", lambda: True)
+    monkeypatch.setattr(api, "persistence_queue", SimpleNamespace(has_pending=lambda session_id: False))
+    monkeypatch.setattr(api, "async_db_service", AsyncDatabaseService(db))
+
+    stored = create_session(client, ["from memory"])
+    db.create_session(stored)
+    db.save_messages(stored, [{"message_id": "m1", "sender": "user", "text_content": "from the database"}])
+    response = client.get(f"/api/sessions/{stored}/messages").json()
+    assert [m["text"] for m in response["data"]["messages"]] == ["from the database"]
+
+    # A session the database does not know is served from memory
+    unknown = create_session(client, ["from memory"])
+    response = client.get(f"/api/sessions/{unknown}/messages").json()
+    assert [m["text"] for m in response["data"]["messages"]] == ["from memory"]
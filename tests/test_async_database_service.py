@@ -0,0 +1,59 @@
+"""
+Offline tests for the async database service.
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_database_service import AsyncDatabaseService
+from sqlite_database_service import SQLiteDatabaseService
+
+
+class SlowService:
+    """Synchronous service that takes 0.1s per request."""
+
+    def get_session(self, session_id):
+        time.sleep(0.1)
+        return {"id": "uuid-1", "session_id": session_id}
+
+    def get_conversation_history(self, session_id):
+        time.sleep(0.1)
+        return [{"message_id": "m1"}]
+
+
+def test_session_and_history_are_fetched_concurrently():
+    service = AsyncDatabaseService(SlowService())
+
+    async def fetch():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await service.get_session_with_history("s1")
+        return result, loop.time() - start
+
+    result, elapsed = asyncio.run(fetch())
+
+    assert result["session"]["id"] == "uuid-1"
+    assert result["messages"] == [{"message_id": "m1"}]
+    # Two 0.1s requests in parallel worker threads
+    assert elapsed < 0.19
+
+
+def test_service_awaits_sync_backend(tmp_path):
+    db = AsyncDatabaseService(SQLiteDatabaseService(str(tmp_path / "kuku_coach.db")))
+
+    async def scenario():
+        await db.create_session("s1")
+        await db.save_messages("s1", [{"message_id": "m1", "sender": "user", "text_content": "hi"}])
+        return await db.get_session_with_history("s1"), await db.get_histories(["s1", "missing"])
+
+    combined, histories = asyncio.run(scenario())
+
+    assert combined["session"]["session_id"] == "s1"
+    assert [m["message_id"] for m in combined["messages"]] == ["m1"]
+    assert [m["message_id"] for m in histories["s1"]] == ["m1"]
+    assert histories["missing"] == []
@@ -0,0 +1,84 @@
+"""
+Offline tests for the per-dependency circuit breakers.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from deadline import Deadline, DeadlineExceeded
+
+
+def fail(breaker, error=ConnectionError("timeout"), **kwargs):
+    with pytest.raises(type(error)):
+        with breaker.guard(**kwargs):
+            raise error
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("chat", failure_threshold=3, recovery_seconds=60)
+    fail(breaker)
+    fail(breaker)
+    with breaker.guard():
+        pass  # a success resets the count
+    fail(breaker)
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.available()
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard():
+            pytest.fail("an open circuit must not call the dependency")
+
+    snapshot = breaker.snapshot()
+    assert snapshot["rejected"] == 1 and snapshot["times_opened"] == 1
+    assert snapshot["last_error"] == "timeout" and snapshot["retry_in_seconds"] > 0
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("tts", failure_threshold=1, recovery_seconds=0.05)
+    fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN and breaker.available()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # only one probe at a time
+    breaker.record_failure("still down")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    with breaker.guard():
+        pass
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.consecutive_failures == 0
+
+
+def test_cancelled_or_budgetless_requests_and_caller_errors_are_not_counted():
+    breaker = CircuitBreaker("database", failure_threshold=1)
+    deadline = Deadline(10)
+    deadline.cancel("client disconnected")
+    fail(breaker, deadline=deadline)
+    fail(breaker, deadline=Deadline(0))
+    fail(breaker, error=ValueError("bad query"), ignore=(ValueError,))
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_hanging_calls_open_the_breaker():
+    breaker = CircuitBreaker("chat", failure_threshold=2, recovery_seconds=60)
+    release = threading.Event()
+    for _ in range(2):
+        deadline = Deadline(0.1)
+        with pytest.raises(DeadlineExceeded):
+            with breaker.guard(deadline):
+                deadline.run(release.wait, 5, stage="llm")
+    release.set()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.failures == 2
+    assert "timed out" in breaker.last_error
@@ -0,0 +1,125 @@
+"""
+Offline tests for the hierarchical (map-reduce) closing summary.
+
+These tests replace the closing LLM with a stub, so they run without an
+OpenAI API key or network access.
+"""
+
+import sys
+import os
+import threading
+
+# Add parent directory to path so we can import the conversation module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import pytest
+
+import conversation as conversation_module
+from conversation import Conversation
+from deadline import Deadline
+
+
+class StubClosingLLM:
+    """Records every prompt and answers chunk prompts and the final prompt differently."""
+
+    def __init__(self):
+        self.prompts = []
+        self.timeouts = []
+        self.lock = threading.Lock()
+
+    def predict(self, prompt, timeout=None):
+        with self.lock:
+            self.prompts.append(prompt)
+            self.timeouts.append(timeout)
+        if "part" in prompt and "of a coaching conversation" in prompt:
+            return f"chunk summary {len(self.prompts)}"
+        return "FINAL SUMMARY"
+
+
+@pytest.fixture
+def conversation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return Conversation()
+
+
+@pytest.fixture
+def closing_llm(monkeypatch):
+    stub = StubClosingLLM()
+    monkeypatch.setattr(conversation_module, "ChatOpenAI", lambda **kwargs: stub)
+    return stub
+
+
+def add_rounds(conversation, rounds):
+    for i in range(conversation.conversation_rounds, conversation.conversation_rounds + rounds):
+        conversation.memory.chat_memory.add_user_message(f"client message {i}")
+        conversation.memory.chat_memory.add_ai_message(f"coach reply {i}")
+    conversation.conversation_rounds += rounds
+
+
+def test_chunks_are_turn_aligned(conversation):
+    add_rounds(conversation, 10)
+    chunks = conversation._split_into_turn_chunks(conversation.get_conversation_history(), rounds_per_chunk=4)
+
+    assert [len(chunk) for chunk in chunks] == [8, 8, 4]
+    for chunk in chunks:
+        assert chunk[0].type == "human"
+        assert chunk[-1].type == "ai"
+
+
+def test_short_session_uses_single_call(conversation, closing_llm):
+    add_rounds(conversation, 3)
+
+    assert conversation.generate_closing_summary() == "FINAL SUMMARY"
+    assert len(closing_llm.prompts) == 1
+    assert "Full conversation history" in closing_llm.prompts[0]
+
+
+def test_long_session_maps_chunks_then_reduces(conversation, closing_llm):
+    add_rounds(conversation, 20)
+    conversation.memory.moving_summary_buffer = "Summary of earlier dialog: pruned messages"
+
+    assert conversation.generate_closing_summary(hierarchical=True) == "FINAL SUMMARY"
+
+    # 20 rounds with 8 rounds per chunk -> 3 chunk summaries plus the reduce call
+    assert len(closing_llm.prompts) == 4
+    final_prompt = closing_llm.prompts[-1]
+    assert "Summary of earlier dialog: pruned messages" in final_prompt
+    assert "Part 1 of 3" in final_prompt and "Part 3 of 3" in final_prompt
+    assert "client message 0" not in final_prompt
+
+
+def test_fresh_draft_is_returned_without_llm_call(conversation, closing_llm):
+    add_rounds(conversation, 16)
+
+    assert conversation.maybe_refresh_closing_draft() is True
+    conversation._closing_draft_thread.join()
+    assert conversation.get_closing_draft_staleness() == 0
+
+    calls_before = len(closing_llm.prompts)
+    assert conversation.finalize_closing_summary() == "FINAL SUMMARY"
+    assert len(closing_llm.prompts) == calls_before
+
+
+def test_stale_draft_gets_delta_update(conversation, closing_llm):
+    add_rounds(conversation, 3)
+    assert conversation.maybe_refresh_closing_draft() is False
+
+    assert conversation.maybe_refresh_closing_draft(force=True) is True
+    conversation._closing_draft_thread.join()
+    add_rounds(conversation, 2)
+    assert conversation.get_closing_draft_staleness() == 2
+
+    conversation.finalize_closing_summary()
+    delta_prompt = closing_llm.prompts[-1]
+    assert "<DRAFT_SUMMARY>" in delta_prompt
+    new_exchanges = delta_prompt.split("<NEW_EXCHANGES>")[1]
+    assert "client message 3" in new_exchanges and "client message 4" in new_exchanges
+    assert "client message 2" not in new_exchanges
+
+
+def test_every_closing_call_gets_the_remaining_budget_as_timeout(conversation, closing_llm):
+    add_rounds(conversation, 20)
+    assert conversation.generate_closing_summary(hierarchical=True, deadline=Deadline(30)) == "FINAL SUMMARY"
+    assert len(closing_llm.timeouts) > 1
+    assert all(timeout is not None and 0 < timeout <= 30 for timeout in closing_llm.timeouts)
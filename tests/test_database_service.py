@@ -0,0 +1,88 @@
+"""
+Offline tests for DatabaseService round trips, using a fake Supabase client.
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-key")
+
+import pytest
+
+from database_service import DatabaseService
+
+
+class FakeQuery:
+    """Minimal query builder that records every executed request on its client."""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.operation = None
+        self.payload = None
+
+    def select(self, columns="*"):
+        self.operation = "select"
+        return self
+
+    def insert(self, payload):
+        self.operation = "insert"
+        self.payload = payload
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def execute(self):
+        self.client.requests.append((self.table, self.operation))
+        if self.operation == "insert":
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            return SimpleNamespace(data=[dict(row, id=f"uuid-{len(self.client.requests)}") for row in rows])
+        return SimpleNamespace(data=[{"id": "uuid-existing", "session_id": "s1"}])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.requests = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def service():
+    db = DatabaseService.__new__(DatabaseService)
+    db.supabase = FakeSupabase()
+    db._session_uuid_cache = {}
+    return db
+
+
+def test_created_session_uuid_is_cached(service):
+    session = service.create_session("s1")
+    service.save_message("s1", "m1", "user", "hello")
+
+    assert service.supabase.requests == [("sessions", "insert"), ("messages", "insert")]
+    assert service.get_session_uuid("s1") == session["id"]
+
+
+def test_save_messages_is_one_request_per_turn(service):
+    rows = service.save_messages("s1", [
+        {"message_id": "m1", "sender": "user", "text_content": "hello"},
+        {"message_id": "m2", "sender": "ai", "text_content": "hi there"}
+    ])
+
+    # One lookup on the cache miss, then a single bulk insert
+    assert service.supabase.requests == [("sessions", "select"), ("messages", "insert")]
+    assert [row["session_id"] for row in rows] == ["uuid-existing", "uuid-existing"]
+    assert rows[0]["created_at"] < rows[1]["created_at"]
+
+    service.save_messages("s1", [{"message_id": "m3", "sender": "user", "text_content": "again"}])
+    assert service.supabase.requests[-1] == ("messages", "insert")
+    assert len(service.supabase.requests) == 3
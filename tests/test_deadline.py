@@ -0,0 +1,74 @@
+"""
+Offline tests for request deadlines and their propagation through Conversation.
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded
+from conversation import Conversation
+
+
+def test_timeout_for_is_capped_by_remaining_budget():
+    deadline = Deadline(5)
+    assert deadline.timeout_for("tts", 2) == 2
+    assert 4 < deadline.timeout_for("llm") <= 5
+
+
+def test_cancel_releases_blocked_call():
+    deadline = Deadline(30)
+    threading.Timer(0.1, deadline.cancel, args=("client disconnected",)).start()
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="client disconnected"):
+        deadline.run(time.sleep, 5, stage="llm")
+    assert time.monotonic() - start < 1
+
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout_for("tts")
+
+
+def test_run_returns_result_and_reraises_errors():
+    deadline = Deadline(5)
+    assert deadline.run(lambda x: x * 2, 21) == 42
+    with pytest.raises(ValueError):
+        deadline.run(int, "not a number")
+
+
+class SlowLLM:
+    """Stand-in for the chat model that records the per-call timeout it was given."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.timeouts = []
+
+    def invoke(self, prompt, timeout=None):
+        self.timeouts.append(timeout)
+        time.sleep(self.delay)
+        raise AssertionError("the deadline should have released the caller")
+
+
+def test_process_input_stops_at_deadline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conversation = Conversation()
+    slow_llm = SlowLLM(delay=2)
+    conversation.router.primary_llm = slow_llm
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        conversation.process_input("Hello coach", deadline=Deadline(0.3))
+
+    assert time.monotonic() - start < 1.5
+    # The turn failed, so nothing of it is kept for the retry
+    assert conversation.get_conversation_history() == []
+    # The timeout is passed per call; no fallback call is made once the budget is gone
+    assert len(slow_llm.timeouts) == 1 and slow_llm.timeouts[0] <= 0.3
+    assert conversation.conversation_rounds == 0
@@ -0,0 +1,270 @@
+"""
+Offline tests for data_export/export_conversations.py, using the SQLite database service.
+"""
+
+import sys
+import os
+import json
+
+# Add parent and data_export directories to path so we can import the project modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "data_export"))
+
+import pytest
+
+import export_conversations
+from sqlite_database_service import SQLiteDatabaseService
+
+
+def add_session(db, session_id, created_at, status="ended", rating=None, turns=2):
+    db.create_session(session_id, created_at=created_at)
+    db.save_messages(session_id, [
+        {"message_id": f"{session_id}-{i}", "sender": "user" if i % 2 == 0 else "ai",
+         "text_content": f"{session_id} message {i}"}
+        for i in range(turns * 2)
+    ])
+    db.update_session(session_id, {"status": status, "rating": rating, "summary": f"Summary of {session_id}",
+                                   "message_count": turns * 2})
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    db = SQLiteDatabaseService(str(tmp_path / "kuku_coach.db"))
+    add_session(db, "s1", "2025-01-01T09:00:00Z", rating=5)
+    add_session(db, "s2", "2025-01-02T09:00:00Z", rating=2)
+    add_session(db, "s3", "2025-01-02T23:59:59.900000Z", rating=4)
+    add_session(db, "s4", "2025-01-03T09:00:00Z", status="active")
+    monkeypatch.setattr(export_conversations, "db_service", db)
+    return db
+
+
+def test_sessions_page_applies_filters_and_keyset_pagination(db):
+    first = db.get_sessions_page(columns=["session_id"], limit=2)
+    assert [s["session_id"] for s in first["sessions"]] == ["s4", "s3"] and first["has_more"]
+    assert set(first["sessions"][0]) == {"id", "created_at", "session_id"}
+    second = db.get_sessions_page(columns=["session_id"], limit=2, after=first["next_cursor"])
+    assert [s["session_id"] for s in second["sessions"]] == ["s2", "s1"] and not second["has_more"]
+
+    def matching(**filters):
+        return [s["session_id"] for s in export_conversations.iter_sessions(["session_id"], page_size=1, **filters)]
+
+    assert matching(status="ended", min_rating=4) == ["s3", "s1"]
+    after, before = export_conversations.date_range_filter("2025-01-02", "2025-01-02")
+    assert matching(created_after=after, created_before=before) == ["s3", "s2"]
+    assert matching(session_ids=["s1", "s4", "missing"]) == ["s4", "s1"]
+
+    with pytest.raises(ValueError):
+        db.get_sessions_page(columns=["session_id; DROP TABLE sessions"])
+
+
+def test_export_reads_only_matching_sessions(db, tmp_path):
+    output = tmp_path / "export.jsonl"
+    export_conversations.export_conversations(str(output), format_type="turn-by-turn",
+                                              status="ended", min_rating=4)
+    examples = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(examples) == 4  # two turns each from s3 and s1
+    assert examples[0]["output"] == "s3 message 1"
+
+    export_conversations.export_conversations(str(tmp_path / "notes.txt"), format_type="txt",
+                                              session_ids=["s2"])
+    text = (tmp_path / "notes_s2.txt").read_text()
+    assert "User: s2 message 0" in text and "Summary of s2" in text
+
+
+def test_messages_are_fetched_in_bulk_batches_in_session_order(db, monkeypatch):
+    calls = []
+    bulk_fetch = db.get_messages_for_sessions
+    monkeypatch.setattr(db, "get_messages_for_sessions", lambda uuids, columns=None: calls.append(len(uuids)) or bulk_fetch(uuids, columns))
+    monkeypatch.setattr(db, "get_conversation_history", lambda session_id: pytest.fail("no per-session fetch"))
+
+    sessions = export_conversations.iter_sessions(["session_id"])
+    conversations = list(export_conversations.iter_conversations(sessions, batch_size=3, workers=2))
+
+    assert calls == [3, 1]
+    assert [session["session_id"] for session, _ in conversations] == ["s4", "s3", "s2", "s1"]
+    for session, messages in conversations:
+        assert [m["text_content"] for m in messages] == [f"{session['session_id']} message {i}" for i in range(4)]
+        assert set(messages[0]) == {"id", "session_id", "created_at", "sender", "text_content"}
+
+
+def test_incremental_export_appends_only_new_or_changed_sessions(db, tmp_path):
+    output = str(tmp_path / "eval.jsonl")
+    manifest_path = tmp_path / "eval.manifest.json"
+
+    first = export_conversations.export_incremental(output, format_type="full", shard_size=3)
+    assert first == {"exported": 4, "unchanged": 0, "skipped": 0}
+    manifest = json.loads(manifest_path.read_text())
+    assert [shard["file"] for shard in manifest["shards"]] == ["eval-00001.jsonl", "eval-00002.jsonl"]
+    assert sum(len((tmp_path / shard["file"]).read_text().splitlines()) for shard in manifest["shards"]) == 4
+
+    # Everything was read before the watermark overlap ends, but nothing changed
+    assert export_conversations.export_incremental(output, format_type="full", shard_size=3) == \
+        {"exported": 0, "unchanged": 4, "skipped": 0}
+
+    db.save_messages("s2", [{"message_id": "s2-4", "sender": "user", "text_content": "one more"},
+                            {"message_id": "s2-5", "sender": "ai", "text_content": "s2 follow-up"}])
+    db.update_session("s2", {"message_count": 6})
+    third = export_conversations.export_incremental(output, format_type="full", shard_size=3)
+    assert third == {"exported": 1, "unchanged": 3, "skipped": 0}
+
+    manifest = json.loads(manifest_path.read_text())
+    entry = manifest["sessions"]["s2"]
+    assert (entry["shard"], entry["line"], entry["message_count"]) == ("eval-00002.jsonl", 1, 6)
+    assert manifest["superseded"] == [] and manifest["compacting"] == [] and len(manifest["runs"]) == 3
+    appended = json.loads((tmp_path / "eval-00002.jsonl").read_text().splitlines()[1])
+    assert appended["output"]["choices"][0]["message"]["content"] == "s2 follow-up"
+    # The outdated s2 line was removed from the first shard, so every session appears once
+    assert [shard["lines"] for shard in manifest["shards"]] == [2, 2]
+    assert (tmp_path / "eval-00001.jsonl").stat().st_size == manifest["shards"][0]["bytes"]
+    s3 = json.loads((tmp_path / "eval-00001.jsonl").read_text().splitlines()[manifest["sessions"]["s3"]["line"]])
+    assert s3["input"][1]["text"].startswith("s3")
+    assert not list(tmp_path.glob("*.compact"))
+
+    with pytest.raises(ValueError):
+        export_conversations.export_incremental(output, format_type="full", status="ended")
+
+
+def test_interrupted_compaction_is_completed_by_the_next_run(db, tmp_path, monkeypatch):
+    output = str(tmp_path / "eval.jsonl")
+    export_conversations.export_incremental(output, format_type="full")
+    db.save_messages("s3", [{"message_id": "s3-4", "sender": "user", "text_content": "one more"},
+                            {"message_id": "s3-5", "sender": "ai", "text_content": "s3 follow-up"}])
+    db.update_session("s3", {"message_count": 6})
+
+    # Stop after the manifest is saved but before the compacted shard is moved into place
+    with monkeypatch.context() as m:
+        m.setattr(export_conversations.ExportManifest, "complete_compaction", lambda self, directory: False)
+        export_conversations.export_incremental(output, format_type="full")
+    manifest = json.loads((tmp_path / "eval.manifest.json").read_text())
+    assert manifest["compacting"] == ["eval-00001.jsonl"] and (tmp_path / "eval-00001.jsonl.compact").exists()
+
+    assert export_conversations.export_incremental(output, format_type="full")["exported"] == 0
+    manifest = json.loads((tmp_path / "eval.manifest.json").read_text())
+    lines = (tmp_path / "eval-00001.jsonl").read_text().splitlines()
+    assert manifest["compacting"] == [] and len(lines) == manifest["shards"][0]["lines"] == 4
+    assert json.loads(lines[manifest["sessions"]["s3"]["line"]])["output"]["choices"][0]["message"]["content"] \
+        == "s3 follow-up"
+
+
+def test_parquet_export_writes_typed_session_and_message_tables(db, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    export_conversations.export_conversations(str(tmp_path / "analytics.parquet"), format_type="parquet",
+                                              status="ended")
+
+    sessions = pq.read_table(tmp_path / "analytics.sessions.parquet").to_pylist()
+    assert [s["session_id"] for s in sessions] == ["s3", "s2", "s1"]
+    assert sessions[0]["rating"] == 4 and sessions[0]["rounds"] == 2 and sessions[0]["created_at"].year == 2025
+    assert str(pq.read_schema(tmp_path / "analytics.sessions.parquet").field("rating").type) == "int8"
+
+    messages = pq.read_table(tmp_path / "analytics.messages.parquet", columns=["session_id", "position", "text_length"])
+    assert messages.num_rows == 12
+    assert messages.slice(0, 1).to_pylist() == [{"session_id": "s3", "position": 0, "text_length": len("s3 message 0")}]
+
+
+def test_compressed_sharded_output_and_txt_bundle(db, tmp_path):
+    import gzip
+    import tarfile
+    import zipfile
+
+    export_conversations.export_conversations(str(tmp_path / "turns.jsonl"), format_type="turn-by-turn",
+                                              min_messages=2, compression="gzip", shard_records=3)
+    index = json.loads((tmp_path / "turns.index.json").read_text())
+    assert index["records"] == 8 and index["compression"] == "gzip"
+    # Two turns per session; a session's turns are never split across shards
+    assert [(shard["path"], shard["records"]) for shard in index["shards"]] == [
+        ("turns-00001.jsonl.gz", 2), ("turns-00002.jsonl.gz", 2),
+        ("turns-00003.jsonl.gz", 2), ("turns-00004.jsonl.gz", 2)
+    ]
+    assert index["shards"][0]["first_session"] == "s4"
+    with gzip.open(tmp_path / "turns-00001.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert json.loads(f.readline())["output"] == "s4 message 1"
+
+    export_conversations.export_conversations(str(tmp_path / "notes.txt"), format_type="txt",
+                                              status="ended", bundle="tar", compression="gzip")
+    with tarfile.open(tmp_path / "notes.tar.gz") as tar:
+        assert tar.getnames() == ["notes_s3.txt", "notes_s2.txt", "notes_s1.txt"]
+        assert "Summary of s3" in tar.extractfile("notes_s3.txt").read().decode("utf-8")
+
+    export_conversations.export_conversations(str(tmp_path / "review.txt"), format_type="txt",
+                                              session_ids=["s1"], bundle="zip")
+    with zipfile.ZipFile(tmp_path / "review.zip") as archive:
+        assert archive.namelist() == ["review_s1.txt"]
+    assert not list(tmp_path.glob("notes_*.txt")) and not list(tmp_path.glob("review_*.txt"))
+
+
+def test_turn_lines_match_turn_examples_and_prefix_reference_round_trips(db, tmp_path):
+    from prefix_reference import load_prefix_reference
+
+    messages = [
+        {"sender": "user", "text_content": "Ich bin müde \"heute\"", "created_at": "2025-01-01T09:00:00Z"},
+        {"sender": "ai", "text_content": "Was hilft dir?\n", "created_at": "2025-01-01T09:00:01Z"},
+        {"sender": "ai", "text_content": "retry", "created_at": "2025-01-01T09:00:02Z"},
+        {"sender": "user", "text_content": "out of order", "created_at": "2025-01-01T09:00:03Z"},
+        {"sender": "user", "text_content": "Schlaf 😴", "created_at": "2025-01-01T09:00:04Z"},
+        {"sender": "ai", "text_content": "Gut.", "created_at": "2025-01-01T09:00:05Z"},
+    ]
+    session = {"session_id": "s9", "message_count": 6}
+    expected = [json.dumps(example, ensure_ascii=False) + "\n"
+                for example in export_conversations.format_conversation_turn_by_turn(session, list(messages))]
+    assert len(expected) == 2
+    assert export_conversations.encode_turn_lines(session, list(messages)) == expected
+
+    export_conversations.export_conversations(str(tmp_path / "turns.jsonl"), format_type="turn-by-turn")
+    export_conversations.export_conversations(str(tmp_path / "turns-ref.jsonl"), format_type="turn-by-turn-ref",
+                                              compression="gzip")
+    turns = [json.loads(line) for line in (tmp_path / "turns.jsonl").read_text().splitlines()]
+    assert list(load_prefix_reference(str(tmp_path / "turns-ref.jsonl.gz"))) == turns
+    assert len(turns) == 8
+
+    # Every shard defines the prompts it uses and loads on its own
+    export_conversations.export_conversations(str(tmp_path / "ref.jsonl"), format_type="turn-by-turn-ref",
+                                              shard_records=2)
+    shards = sorted(tmp_path.glob("ref-*.jsonl"))
+    assert len(shards) == 4
+    assert [example for shard in shards for example in load_prefix_reference(str(shard))] == turns
+
+
+def test_dedup_drops_repeated_and_near_identical_examples(db, tmp_path):
+    pytest.importorskip("numpy")
+    from dedup import deduplicate
+
+    story = ("I keep delaying my sleep because I scroll through my phone late at night "
+             "and then I feel exhausted and unfocused at work the next morning")
+    wrap_up = "Thank you for the conversation today. What is one small step you will take this week?"
+    for session_id, created_at, user_text in (("d1", "2025-02-01T09:00:00Z", story),
+                                              ("d2", "2025-02-02T09:00:00Z", story + " again"),
+                                              ("d3", "2025-02-03T09:00:00Z", story.upper())):
+        db.create_session(session_id, created_at=created_at)
+        db.save_messages(session_id, [
+            {"message_id": f"{session_id}-0", "sender": "user", "text_content": user_text},
+            {"message_id": f"{session_id}-1", "sender": "ai", "text_content": wrap_up},
+        ])
+
+    output = tmp_path / "turns.jsonl"
+    export_conversations.export_conversations(str(output), format_type="turn-by-turn", min_messages=2,
+                                              dedup_threshold=0.7)
+    outputs = [json.loads(line)["output"] for line in output.read_text().splitlines()]
+    # s1-s4 are distinct; d2 (near-identical) and d3 (same words) repeat d1
+    assert len(outputs) == 8 + 1 and outputs.count(wrap_up) == 1
+
+    dpo = {"input": {"messages": [{"role": "user", "content": story}]},
+           "preferred_output": [{"role": "assistant", "content": wrap_up}],
+           "non_preferred_output": [{"role": "assistant", "content": "ok"}]}
+    kept, removed = deduplicate([dpo, dict(dpo), {"messages": [{"role": "user", "content": "different"}]}])
+    assert (len(kept), removed) == (2, 1)
+
+
+def test_parallel_formatting_writes_the_same_output_as_serial(db, tmp_path):
+    for format_type in export_conversations.JSONL_FORMATS:
+        serial, parallel = tmp_path / f"{format_type}-1.jsonl", tmp_path / f"{format_type}-2.jsonl"
+        export_conversations.export_conversations(str(serial), format_type=format_type)
+        export_conversations.export_conversations(str(parallel), format_type=format_type, workers=2)
+        assert serial.read_bytes() == parallel.read_bytes() != b""
+
+    conversations = list(export_conversations.iter_conversations(export_conversations.iter_sessions(
+        export_conversations.SESSION_COLUMNS_BY_FORMAT["turn-by-turn"])))
+    results = list(export_conversations.format_conversations(conversations, "turn-by-turn", min_messages=5,
+                                                             dedup=True, workers=2, batch_size=1))
+    assert [result["session_id"] for result in results] == ["s4", "s3", "s2", "s1"]
+    assert all(result["skip"] == "only 4 messages (min: 5)" for result in results)
@@ -0,0 +1,70 @@
+"""
+Offline tests for lazy database initialization, reconnects and the health probe.
+"""
+
+import sys
+import os
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from database_service import LazyDatabaseService, DatabaseUnavailable
+
+
+class FlakyFactory:
+    """Fails until reachable is set, then returns a service whose probe can be made to fail."""
+
+    def __init__(self):
+        self.reachable = False
+        self.calls = 0
+        self.service = type("Service", (), {"get_session": lambda self, session_id: None})()
+
+    def __call__(self):
+        self.calls += 1
+        if not self.reachable:
+            raise ConnectionError("connection refused")
+        return self.service
+
+
+def test_service_is_created_on_first_use_and_retries_are_throttled():
+    factory = FlakyFactory()
+    db = LazyDatabaseService(factory, retry_interval_seconds=60)
+    assert factory.calls == 0
+
+    with pytest.raises(DatabaseUnavailable):
+        db.get_session("s1")
+    # Within the retry interval calls fail fast without trying again
+    factory.reachable = True
+    assert not db.is_available()
+    assert factory.calls == 1
+
+    db.retry_interval_seconds = 0
+    assert db.is_available()
+    assert db.get_session("s1") is None
+    assert factory.calls == 2
+    assert db.status()["connected"] and db.status()["last_error"] is None
+
+
+def test_probe_marks_database_down_and_up_again():
+    factory = FlakyFactory()
+    factory.reachable = True
+    healthy = {"ok": True}
+
+    def probe(service):
+        if not healthy["ok"]:
+            raise ConnectionError("timeout")
+
+    db = LazyDatabaseService(factory, probe=probe, retry_interval_seconds=0)
+    assert db.probe() and db.is_available()
+    assert db.status()["last_probe_latency_ms"] is not None
+
+    healthy["ok"] = False
+    assert not db.probe()
+    assert not db.is_available()
+    assert db.status()["healthy"] is False and db.status()["last_error"] == "timeout"
+
+    healthy["ok"] = True
+    assert db.probe() and db.is_available()
+    assert factory.calls == 1
@@ -0,0 +1,78 @@
+"""
+Offline tests for hedged model routing.
+"""
+
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded
+from model_router import LatencyTracker, ModelRouter
+
+
+class FakeLLM:
+    """Answers after a fixed delay, or raises if given an error."""
+
+    def __init__(self, reply, delay=0.0, error=None):
+        self.reply = reply
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def invoke(self, prompt, timeout=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(content=self.reply)
+
+
+def make_router(primary, secondary, primary_latency=0.05):
+    tracker = LatencyTracker()
+    for _ in range(30):
+        tracker.record("primary", primary_latency)
+    return ModelRouter("primary", primary, "secondary", secondary, tracker=tracker)
+
+
+def test_fast_primary_is_not_hedged():
+    primary, secondary = FakeLLM("primary answer"), FakeLLM("secondary answer")
+    router = make_router(primary, secondary, primary_latency=1.0)
+
+    assert router.invoke("hi", Deadline(5)) == "primary answer"
+    assert secondary.calls == 0
+    assert router.last_model_used == "primary"
+
+
+def test_slow_primary_is_hedged_after_p95():
+    primary, secondary = FakeLLM("primary answer", delay=2), FakeLLM("secondary answer")
+    router = make_router(primary, secondary)
+
+    start = time.monotonic()
+    assert router.invoke("hi", Deadline(5)) == "secondary answer"
+    assert time.monotonic() - start < 1
+    assert router.last_model_used == "secondary"
+
+
+def test_failed_primary_fails_over_immediately():
+    primary = FakeLLM("", error=RuntimeError("rate limited"))
+    secondary = FakeLLM("secondary answer")
+    router = make_router(primary, secondary, primary_latency=10)
+
+    assert router.invoke("hi", Deadline(5)) == "secondary answer"
+
+
+def test_empty_answers_raise_last_error_and_deadline_is_respected():
+    router = make_router(FakeLLM(" "), FakeLLM(""))
+    with pytest.raises(ValueError, match="empty response"):
+        router.invoke("hi", Deadline(5))
+
+    slow_router = make_router(FakeLLM("late", delay=2), FakeLLM("late", delay=2))
+    with pytest.raises(DeadlineExceeded):
+        slow_router.invoke("hi", Deadline(0.3))
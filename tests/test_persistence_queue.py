@@ -0,0 +1,145 @@
+"""
+Offline tests for the write-behind persistence queue, using a fake database service.
+"""
+
+import sys
+import os
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+
+import pytest
+
+from persistence_queue import PersistenceQueue
+
+
+class FakeDatabase:
+    """Records applied writes; raises while `down` is set, like an unreachable Supabase."""
+
+    def __init__(self):
+        self.calls = []
+        self.down = False
+        self.errors = {}  # session_id -> exception raised for that session's writes
+
+    def _record(self, *call):
+        if self.down:
+            raise ConnectionError("database unreachable")
+        if call[1] in self.errors:
+            raise self.errors[call[1]]
+        self.calls.append(call)
+
+    def create_session(self, session_id, user_id=None, created_at=None):
+        self._record("create_session", session_id)
+
+    def save_messages(self, session_id, messages):
+        self._record("save_messages", session_id, [m["message_id"] for m in messages])
+
+    def update_session(self, session_id, updates):
+        self._record("update_session", session_id, updates)
+
+    def end_session(self, session_id, summary, duration, rating=None, feedback=None, message_count=None):
+        self._record("end_session", session_id, message_count)
+
+
+@pytest.fixture
+def db():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def queue(tmp_path, db):
+    return PersistenceQueue(db, spool_path=str(tmp_path / "spool.db"), backoff_base=0.01, max_attempts=3)
+
+
+def test_writes_of_a_session_are_merged_in_order(queue, db):
+    queue.enqueue("s1", "create_session", user_id=None)
+    queue.enqueue("s1", "save_messages", messages=[{"message_id": "u1", "sender": "user", "text_content": "hi"}])
+    queue.enqueue("s1", "save_messages", messages=[{"message_id": "a1", "sender": "ai", "text_content": "hello"}])
+    queue.enqueue("s1", "update_session", updates={"message_count": 2})
+    queue.enqueue("s1", "update_session", updates={"message_count": 4})
+    queue.enqueue("s1", "end_session", summary="done", duration=10, message_count=4)
+
+    assert queue.has_pending("s1")
+    assert queue.process_batch() == 6
+    assert db.calls == [
+        ("create_session", "s1"),
+        ("save_messages", "s1", ["u1", "a1"]),
+        ("update_session", "s1", {"message_count": 4}),
+        ("end_session", "s1", 4),
+    ]
+    assert queue.stats()["queue_depth"] == 0
+
+
+def test_writes_stay_spooled_during_outage_and_survive_restart(tmp_path, queue, db):
+    db.down = True
+    queue.enqueue("s1", "create_session", user_id=None)
+    queue.enqueue("s1", "update_session", updates={"message_count": 2})
+    queue.enqueue("s2", "create_session", user_id=None)
+
+    assert queue.process_batch() == 0
+    stats = queue.stats()
+    assert stats["queue_depth"] == 3 and stats["consecutive_failures"] == 1
+    assert stats["retry_in_seconds"] > 0 and stats["sessions_backing_off"] == 2
+
+    # A new queue on the same spool file replays the writes once the database is back
+    db.down = False
+    restarted = PersistenceQueue(db, spool_path=queue.spool_path)
+    restarted.start()
+    assert restarted.stop(timeout=5)
+    assert db.calls == [("create_session", "s1"), ("update_session", "s1", {"message_count": 2}),
+                        ("create_session", "s2")]
+
+
+def test_failing_write_is_dead_lettered(queue, db):
+    db.down = True
+    queue.enqueue("s1", "update_session", updates={"rating": 5})
+    for _ in range(3):
+        queue.process_batch()
+        time.sleep(0.05)  # Past the session's backoff
+
+    stats = queue.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["dead_letters"] == 1
+    assert "unreachable" in stats["last_error"]
+
+
+def test_writer_waits_while_database_reports_unavailable(queue, db):
+    db.is_available = lambda: False
+    queue.enqueue("s1", "create_session", user_id=None)
+    queue.start()
+    assert not queue.stop(timeout=5)
+
+    stats = queue.stats()
+    assert stats["queue_depth"] == 1 and stats["consecutive_failures"] == 0
+    assert db.calls == []
+
+
+def test_failing_session_does_not_hold_back_other_sessions(queue, db):
+    db.errors["s1"] = ConnectionError("statement timeout")
+    queue.enqueue("s1", "update_session", updates={"rating": 5})
+    queue.enqueue("s2", "create_session", user_id=None)
+    assert queue.process_batch() == 1
+
+    # s1 is backing off; a new write of s2 goes through right away, s1 is not retried yet
+    queue.enqueue("s2", "update_session", updates={"message_count": 2})
+    assert queue.process_batch() == 1
+    stats = queue.stats()
+    assert stats["queue_depth"] == 1 and stats["sessions_backing_off"] == 1
+    assert stats["consecutive_failures"] == 0 and stats["retry_in_seconds"] == 0
+    assert db.calls == [("create_session", "s2"), ("update_session", "s2", {"message_count": 2})]
+
+
+def test_non_retryable_error_is_dead_lettered_at_once(queue, db):
+    class APIError(Exception):
+        code = "23503"  # foreign_key_violation, as reported by PostgREST
+
+    db.errors["s1"] = APIError("insert or update on table \"messages\" violates foreign key constraint")
+    db.errors["s2"] = ValueError("invalid payload")
+    queue.enqueue("s1", "save_messages", messages=[{"message_id": "m1", "sender": "user", "text_content": "hi"}])
+    queue.enqueue("s2", "update_session", updates={"rating": 9})
+    queue.process_batch()
+
+    stats = queue.stats()
+    assert stats["queue_depth"] == 0 and stats["dead_letters"] == 2 and stats["sessions_backing_off"] == 0
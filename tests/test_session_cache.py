@@ -0,0 +1,85 @@
+"""
+Offline tests for the read-through session cache.
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from session_cache import SessionCache, CachedDatabaseService
+from async_database_service import AsyncDatabaseService
+from sqlite_database_service import SQLiteDatabaseService
+
+
+class CountingService:
+    """Wraps a database service and counts get_session calls."""
+
+    def __init__(self, service):
+        self.service = service
+        self.session_reads = 0
+
+    def __getattr__(self, name):
+        return getattr(self.service, name)
+
+    def get_session(self, session_id):
+        self.session_reads += 1
+        return self.service.get_session(session_id)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return CountingService(SQLiteDatabaseService(str(tmp_path / "kuku_coach.db")))
+
+
+def test_reads_are_served_from_cache_and_refreshed_by_writes(backend):
+    cache = SessionCache(ttl_seconds=60)
+    db = CachedDatabaseService(backend, cache)
+    db.create_session("s1")
+
+    for _ in range(3):
+        assert db.get_session("s1")["status"] == "active"
+    assert backend.session_reads == 0
+
+    db.end_session("s1", summary="done", duration=10)
+    assert db.get_session("s1")["status"] == "ended"
+    db.update_session("s1", {"rating": 5})
+    assert db.get_session("s1")["rating"] == 5
+
+    stats = cache.stats()
+    assert stats["hits"] == 5 and stats["misses"] == 0 and stats["hit_rate"] == 1.0
+    assert stats["invalidations"] == 2
+
+
+def test_expired_rows_are_read_again(backend):
+    cache = SessionCache(ttl_seconds=0.05)
+    db = CachedDatabaseService(backend, cache)
+    backend.service.create_session("s1")
+
+    db.get_session("s1")
+    db.get_session("s1")
+    time.sleep(0.1)
+    db.get_session("s1")
+
+    assert backend.session_reads == 2
+    assert cache.stats()["hits"] == 1
+
+    # Missing sessions are not cached, so a session created later is found
+    assert db.get_session("s2") is None
+    backend.service.create_session("s2")
+    assert db.get_session("s2") is not None
+
+
+def test_async_service_shares_the_cache(backend):
+    cache = SessionCache()
+    db = CachedDatabaseService(backend, cache)
+    db.create_session("s1")
+
+    async_db = AsyncDatabaseService(db)
+    assert asyncio.run(async_db.get_session_uuid("s1")) == db.get_session_uuid("s1")
+    assert backend.session_reads == 0
@@ -0,0 +1,58 @@
+"""
+Offline tests for coalesced session updates.
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_updates import SessionUpdateCoalescer
+
+
+def test_updates_are_merged_until_flushed():
+    writes = []
+    coalescer = SessionUpdateCoalescer(lambda sid, updates: writes.append((sid, updates)), flush_interval_seconds=60)
+
+    for count in (2, 4, 6):
+        coalescer.update("s1", message_count=count)
+    coalescer.update("s2", message_count=2)
+    assert writes == []
+
+    assert coalescer.flush("s1") == 1
+    assert writes == [("s1", {"message_count": 6})]
+    assert coalescer.stop() == 1
+    assert writes[-1] == ("s2", {"message_count": 2})
+    assert coalescer.stats() == {"pending_sessions": 0, "updates_received": 4, "flushes": 2}
+
+
+def test_background_flush_after_interval():
+    writes = []
+    coalescer = SessionUpdateCoalescer(lambda sid, updates: writes.append((sid, updates)), flush_interval_seconds=0.1)
+    coalescer.start()
+    coalescer.update("s1", message_count=2)
+    coalescer.update("s1", message_count=4)
+
+    deadline = time.monotonic() + 2
+    while not writes and time.monotonic() < deadline:
+        time.sleep(0.02)
+    coalescer.stop()
+    assert writes == [("s1", {"message_count": 4})]
+
+
+def test_failed_write_is_kept_for_retry():
+    attempts = []
+
+    def flaky_sink(session_id, updates):
+        attempts.append(updates)
+        if len(attempts) == 1:
+            raise ConnectionError("spool unavailable")
+
+    coalescer = SessionUpdateCoalescer(flaky_sink, flush_interval_seconds=60)
+    coalescer.update("s1", message_count=2)
+    assert coalescer.flush() == 0
+    coalescer.update("s1", message_count=4)
+    assert coalescer.flush() == 1
+    assert attempts[-1] == {"message_count": 4}
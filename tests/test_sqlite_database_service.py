@@ -0,0 +1,143 @@
+"""
+Offline tests for the SQLite implementation of the database service.
+"""
+
+import sys
+import os
+
+# Add parent directory to path so we can import the project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor, postgrest_keyset_filter
+from sqlite_database_service import SQLiteDatabaseService
+
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteDatabaseService(str(tmp_path / "kuku_coach.db"))
+
+
+def test_session_lifecycle(db):
+    session = db.create_session("s1")
+    assert session["status"] == "active" and session["message_count"] == 0
+
+    db.update_session("s1", {"message_count": 2})
+    ended = db.end_session("s1", summary="Great session", duration=120, message_count=4)
+    assert ended["status"] == "ended"
+    assert ended["summary"] == "Great session"
+    assert ended["message_count"] == 4
+    assert ended["ended_at"] is not None
+
+    with pytest.raises(ValueError):
+        db.update_session("s1", {"status = 'ended'; --": 1})
+    with pytest.raises(Exception):
+        db.update_session("missing", {"message_count": 1})
+
+
+def test_messages_are_returned_in_order_and_searchable(db):
+    db.create_session("s1")
+    db.save_message("s1", "m1", "user", "I feel stressed about work")
+    db.save_messages("s1", [
+        {"message_id": "m2", "sender": "ai", "text_content": "What part of work?"},
+        {"message_id": "m3", "sender": "user", "text_content": "Deadlines at WORK mostly"},
+    ])
+
+    history = db.get_conversation_history("s1")
+    assert [m["message_id"] for m in history] == ["m1", "m2", "m3"]
+    assert {m["session_id"] for m in history} == {db.get_session_uuid("s1")}
+
+    assert {m["message_id"] for m in db.search_messages_global("work")} == {"m1", "m2", "m3"}
+    assert db.get_conversation_history("missing") == []
+    with pytest.raises(ValueError):
+        db.save_message("missing", "m4", "user", "hello")
+
+
+def test_indexes_exist(db):
+    indexes = {row["name"] for row in db._query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_messages_session_created", "idx_messages_created_at", "idx_sessions_created_at"} <= indexes
+
+
+def test_keyset_pages_walk_forward_and_back(db):
+    db.create_session("s1")
+    db.save_messages("s1", [
+        {"message_id": f"m{i}", "sender": "user", "text_content": f"message {i}"} for i in range(5)
+    ])
+
+    first = db.get_messages_page("s1", limit=2)
+    assert [m["message_id"] for m in first["messages"]] == ["m0", "m1"] and first["has_more"]
+    second = db.get_messages_page("s1", limit=2, after=first["next_cursor"])
+    third = db.get_messages_page("s1", limit=2, after=second["next_cursor"])
+    assert [m["message_id"] for m in second["messages"]] == ["m2", "m3"]
+    assert [m["message_id"] for m in third["messages"]] == ["m4"] and not third["has_more"]
+
+    # Polling past the end returns nothing and keeps the cursor
+    empty = db.get_messages_page("s1", limit=2, after=third["next_cursor"])
+    assert empty["messages"] == [] and empty["next_cursor"] == third["next_cursor"]
+
+    back = db.get_messages_page("s1", limit=2, before=third["prev_cursor"])
+    assert [m["message_id"] for m in back["messages"]] == ["m2", "m3"] and back["has_more"]
+
+    since = db.get_messages_page("s1", limit=10, since=first["messages"][1]["created_at"])
+    assert [m["message_id"] for m in since["messages"]] == ["m2", "m3", "m4"]
+
+    with pytest.raises(ValueError):
+        db.get_messages_page("s1", after=first["next_cursor"], since="2020-01-01")
+    with pytest.raises(ValueError):
+        db.get_messages_page("s1", after="not-a-cursor")
+
+
+def test_cursor_values_are_checked_before_they_reach_a_filter():
+    row_id = "0b6f3f6e-2d5c-4a1e-9a43-6f0b7d3c2a10"
+    assert decode_cursor(encode_cursor("2025-01-01T09:00:00.123456+00:00", row_id)) == \
+        ("2025-01-01T09:00:00.123456+00:00", row_id)
+    assert decode_cursor(encode_cursor("2025-01-01T09:00:00Z", "msg-1a2b3c4d"), allow_message_ids=True)[1] == \
+        "msg-1a2b3c4d"
+    assert decode_cursor(encode_cursor("2025-01-01T09:00:00Z", "msg-session-6fbaece8b9-1"), allow_message_ids=True)[1] == \
+        "msg-session-6fbaece8b9-1"
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("2025-01-01T09:00:00Z", "msg-1,or(id.gt.0)"), allow_message_ids=True)
+    for created_at, cursor_id in (('2025-01-01",id.gt.0', row_id),
+                                  ("2025-01-01T09:00:00Z", f"{row_id},and(status.eq.active)"),
+                                  ("2025-01-01T09:00:00Z", "msg-1a2b3c4d"),
+                                  (["2025-01-01T09:00:00Z"], row_id)):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor(created_at, cursor_id))
+    with pytest.raises(ValueError):
+        postgrest_keyset_filter("after", "2025-01-01T09:00:00Z", "1),or(id.gt.0")
+
+
+def test_full_text_search_ranks_filters_and_pages(db):
+    db.create_session("s1", user_id="u1")
+    db.create_session("s2", user_id="u2")
+    db.save_messages("s1", [
+        {"message_id": "m1", "sender": "user", "text_content": "Work stress keeps me up, work is all I think about"},
+        {"message_id": "m2", "sender": "ai", "text_content": "What about work feels most stressful?"},
+        {"message_id": "m3", "sender": "user", "text_content": "My morning routine helps with sleep"},
+    ])
+    db.save_messages("s2", [
+        {"message_id": "m4", "sender": "user", "text_content": "Stressed about working late again"},
+    ])
+
+    # Stemming matches "working" too; the message mentioning work twice ranks first
+    page = db.search_messages("work", limit=2)
+    assert page["results"][0]["message_id"] == "m1"
+    assert page["has_more"] and page["next_offset"] == 2
+    assert page["results"][0]["session_id"] == "s1"
+    assert "<b>Work</b>" in page["results"][0]["snippet"]
+    assert page["results"][0]["rank"] >= page["results"][1]["rank"]
+
+    next_page = db.search_messages("work", offset=2)
+    assert not next_page["has_more"]
+    found = [r["message_id"] for r in page["results"] + next_page["results"]]
+    assert sorted(found) == ["m1", "m2", "m4"]
+    assert [r["message_id"] for r in db.search_messages("work", user_id="u2")["results"]] == ["m4"]
+    assert [r["message_id"] for r in db.search_messages("work -feels", session_id="s1")["results"]] == ["m1"]
+    assert [r["message_id"] for r in db.search_messages('"morning routine"')["results"]] == ["m3"]
+    assert db.search_messages("work", created_after="2999-01-01")["results"] == []
+
+    # FTS5 syntax in user input is quoted, not interpreted
+    assert db.search_messages("NEAR(work AND")["results"] == []
+    with pytest.raises(ValueError):
+        db.search_messages("***")
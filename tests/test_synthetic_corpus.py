@@ -0,0 +1,46 @@
+"""
+Offline tests for data_export/synthetic_corpus.py, loading into the SQLite database service.
+"""
+
+import sys
+import os
+
+# Add parent and data_export directories to path so we can import the project modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "data_export"))
+
+import pytest
+
+import export_conversations
+import synthetic_corpus
+from sqlite_database_service import SQLiteDatabaseService
+
+
+def test_generated_sessions_follow_the_options_and_the_seed():
+    options = dict(turns=(2, 4), user_words=(3, 5), rating_weights={4: 1}, unrated_share=0, active_share=0)
+    sessions = list(synthetic_corpus.generate_sessions(101, **options))
+    assert sessions == list(synthetic_corpus.generate_sessions(101, **options))
+    assert sum(len(messages) for _, messages in sessions) == 101
+    for session, messages in sessions[:-1]:
+        assert 4 <= len(messages) <= 8 and session["message_count"] == len(messages)
+        assert session["rating"] == 4 and session["status"] == "ended"
+        assert [m["sender"] for m in messages[:2]] == ["user", "ai"]
+        assert all(3 <= len(m["text_content"].split()) <= 5 for m in messages[::2])
+
+    with pytest.raises(ValueError):
+        synthetic_corpus.parse_rating_weights("6:1")
+    assert synthetic_corpus.parse_rating_weights("1:1,5:3") == {1: 1.0, 5: 3.0}
+
+
+def test_loaded_corpus_exports(tmp_path, monkeypatch):
+    db = SQLiteDatabaseService(str(tmp_path / "corpus.db"))
+    stats = synthetic_corpus.load_corpus(db, 500, batch_size=64, progress=False, active_share=0)
+    conn = db._connection()
+    assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == stats["messages"] == 500
+    assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == stats["sessions"]
+
+    monkeypatch.setattr(export_conversations, "db_service", db)
+    output = tmp_path / "export.jsonl"
+    export_conversations.export_conversations(str(output), format_type="full", min_messages=2)
+    assert len(output.read_text().splitlines()) == stats["sessions"]
@@ -0,0 +1,103 @@
+"""
+Offline tests for the idempotent turn result cache used by POST /messages.
+"""
+
+import sys
+import os
+import asyncio
+
+# Add parent directory to path so we can import the turn_cache module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from turn_cache import TurnResultCache
+
+
+def test_retry_returns_stored_result():
+    cache = TurnResultCache()
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        return {"turn": len(calls)}
+
+    async def scenario():
+        first = await cache.run("session-1", "key-1", handler)
+        retry = await cache.run("session-1", "key-1", handler)
+        other = await cache.run("session-1", "key-2", handler)
+        return first, retry, other
+
+    first, retry, other = asyncio.run(scenario())
+    assert first == retry == {"turn": 1}
+    assert other == {"turn": 2}
+    assert len(calls) == 2
+
+
+def test_concurrent_duplicate_waits_for_in_flight_turn():
+    cache = TurnResultCache()
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "response"
+
+    async def scenario():
+        return await asyncio.gather(
+            cache.run("session-1", "key-1", handler),
+            cache.run("session-1", "key-1", handler)
+        )
+
+    assert asyncio.run(scenario()) == ["response", "response"]
+    assert len(calls) == 1
+    assert cache.stats() == {"cached_turns": 1, "in_flight_turns": 0}
+
+
+def test_failed_turns_are_not_stored_and_cache_is_bounded():
+    cache = TurnResultCache(max_entries_per_session=2)
+
+    async def scenario():
+        await cache.run("session-1", "failed", lambda: asyncio.sleep(0, result="error"),
+                        should_store=lambda result: result != "error")
+        for key in ("a", "b", "c"):
+            await cache.run("session-1", key, lambda: asyncio.sleep(0, result=key))
+
+    asyncio.run(scenario())
+    assert cache.get("session-1", "failed") is None
+    assert cache.get("session-1", "a") is None
+    assert cache.get("session-1", "c") == "c"
+
+
+def test_ended_and_least_recently_used_sessions_are_dropped():
+    cache = TurnResultCache(max_entries_per_session=2, max_sessions=2)
+    cache.store("session-1", "a", "1a")
+    cache.store("session-2", "a", "2a")
+    assert cache.get("session-1", "a") == "1a"  # session-1 is now the most recently used
+    cache.store("session-3", "a", "3a")
+
+    assert cache.get("session-2", "a") is None
+    assert cache.get("session-1", "a") == "1a" and cache.get("session-3", "a") == "3a"
+
+    cache.forget("session-1")
+    assert cache.get("session-1", "a") is None
+    assert cache.stats()["cached_turns"] == 1
+
+
+def test_waiting_counts_duplicates_of_in_flight_turn():
+    cache = TurnResultCache()
+    seen = []
+
+    async def handler():
+        await asyncio.sleep(0.05)
+        seen.append(cache.waiting("session-1", "key-1"))
+        return "response"
+
+    async def scenario():
+        return await asyncio.gather(
+            cache.run("session-1", "key-1", handler),
+            cache.run("session-1", "key-1", handler),
+            cache.run("session-1", "key-1", handler)
+        )
+
+    assert asyncio.run(scenario()) == ["response"] * 3
+    assert seen == [2]
+    assert cache.waiting("session-1", "key-1") == 0
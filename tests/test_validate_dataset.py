@@ -0,0 +1,64 @@
+"""
+Offline tests for data_export/validate_dataset.py (bundled cl100k_base encoding, no network).
+"""
+
+import sys
+import os
+import gzip
+import json
+
+# Add parent and data_export directories to path so we can import the project modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "data_export"))
+
+import pytest
+
+pytest.importorskip("tiktoken")
+
+import validate_dataset
+
+
+def test_bundled_encoding_matches_cl100k_base():
+    encoding = validate_dataset.load_encoding()
+    assert encoding.n_vocab == 100277
+    assert encoding.encode("hello world") == [15339, 1917]
+
+
+def test_validate_files_flags_problems_truncates_and_estimates_cost(tmp_path):
+    history = []
+    for i in range(6):
+        history += [{"role": "user", "content": f"question {i} " + "word " * 40},
+                    {"role": "assistant", "content": f"answer {i}"}]
+    examples = [
+        {"input": [{"role": "system", "content": "Be a coach."}, {"role": "user", "content": "Hi"}], "output": "Hello!"},
+        {"messages": [{"role": "system", "content": "Be a coach."}] + history},
+        {"messages": [{"role": "user", "content": "Hi"}, {"role": "user", "content": "Hello?"}]},
+        {"input": [{"role": "user", "content": "Hi"}], "output": ""},
+    ]
+    path = tmp_path / "dataset.jsonl"
+    path.write_text("\n".join(json.dumps(e) for e in examples) + "\nnot json\n", encoding="utf-8")
+
+    results = list(validate_dataset.validate_files([str(path)], max_tokens=200, truncate=True,
+                                                   workers=2, chunk_size=2))
+    assert [r["line"] for r in results] == [1, 2, 3, 4, 5]
+    assert results[0]["issues"] == [] and results[0]["kind"] == "turn-by-turn"
+    assert results[1]["issues"] == [] and results[1]["truncated_from"] > 200 >= results[1]["tokens"]
+    truncated = json.loads(results[1]["fixed"])["messages"]
+    assert truncated[0]["role"] == "system" and truncated[-1]["content"] == "answer 5"
+    assert "user and assistant messages do not alternate" in results[2]["issues"]
+    assert any("empty content" in issue for issue in results[3]["issues"])
+    assert results[4]["issues"][0].startswith("invalid example")
+
+    # Compressed export shards are read the same way
+    compressed = tmp_path / "dataset.jsonl.gz"
+    with gzip.open(compressed, "wt", encoding="utf-8") as f:
+        f.write(path.read_text(encoding="utf-8"))
+    assert [(r["line"], r["issues"]) for r in validate_dataset.validate_files([str(compressed)], max_tokens=200,
+                                                                            truncate=True, workers=1)] == \
+        [(r["line"], r["issues"]) for r in results]
+
+    summary = validate_dataset.summarize(results, max_tokens=200, price_per_million=10.0)
+    assert (summary["valid"], summary["invalid"], summary["truncated"]) == (2, 3, 1)
+    assert summary["epochs"] == 25  # Few examples: the API trains more epochs
+    assert summary["estimated_cost_usd"] == round(summary["tokens"]["total"] * 25 * 10.0 / 1_000_000, 2)
@@ -0,0 +1,122 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class TurnResultCache:
+    """
+    Bounded per-session cache of completed turn responses keyed by idempotency key.
+
+    A client that retries a turn with the same Idempotency-Key gets the stored
+    response instead of adding a second user/AI pair to the conversation. A
+    duplicate that arrives while the first request is still running waits for
+    that request's result instead of starting a second LLM/TTS pipeline;
+    waiting() tells the first request that its result is still wanted.
+
+    Ended sessions are dropped with forget(); sessions that are never ended
+    are dropped least recently used first once more than max_sessions are cached.
+    """
+
+    def __init__(self, max_entries_per_session: int = 32, max_sessions: int = 1000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries_per_session: Number of completed turns remembered per session;
+                the oldest entries are evicted first
+            max_sessions: Number of sessions whose turns are remembered; the least
+                recently used session is evicted first
+        """
+        self.max_entries_per_session = max_entries_per_session
+        self.max_sessions = max_sessions
+        self._results: "OrderedDict[str, OrderedDict[str, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, Dict[str, asyncio.Future]] = {}
+        self._waiting: Dict[Tuple[str, str], int] = {}
+
+    def get(self, session_id: str, key: str) -> Optional[Any]:
+        """Return the stored response for a completed turn, or None."""
+        session_results = self._results.get(session_id)
+        if session_results is None or key not in session_results:
+            return None
+        self._results.move_to_end(session_id)
+        session_results.move_to_end(key)
+        return session_results[key]
+
+    def store(self, session_id: str, key: str, result: Any) -> None:
+        """Remember a completed turn response, evicting the oldest entry and session if needed."""
+        session_results = self._results.setdefault(session_id, OrderedDict())
+        self._results.move_to_end(session_id)
+        session_results[key] = result
+        session_results.move_to_end(key)
+        while len(session_results) > self.max_entries_per_session:
+            session_results.popitem(last=False)
+        while len(self._results) > self.max_sessions:
+            self._results.popitem(last=False)
+
+    def waiting(self, session_id: str, key: str) -> int:
+        """Return the number of duplicate requests waiting for the in-flight turn."""
+        return self._waiting.get((session_id, key), 0)
+
+    def forget(self, session_id: str) -> None:
+        """Drop the stored responses of a session, e.g. when it has ended."""
+        self._results.pop(session_id, None)
+
+    async def run(self, session_id: str, key: str, handler: Callable[[], Awaitable[Any]],
+                  should_store: Callable[[Any], bool] = lambda result: True) -> Any:
+        """
+        Run a turn at most once per (session_id, key).
+
+        Args:
+            session_id: Session the turn belongs to
+            key: Client supplied idempotency key
+            handler: Coroutine function that processes the turn
+            should_store: Decides whether a result is kept for later retries;
+                failed turns are usually not stored so the client can retry them
+
+        Returns:
+            The handler's result, the stored result, or the in-flight result
+        """
+        cached = self.get(session_id, key)
+        if cached is not None:
+            return cached
+
+        session_in_flight = self._in_flight.setdefault(session_id, {})
+        pending = session_in_flight.get(key)
+        if pending is not None:
+            # Shield so a disconnecting duplicate does not cancel the original request
+            self._waiting[(session_id, key)] = self.waiting(session_id, key) + 1
+            try:
+                return await asyncio.shield(pending)
+            finally:
+                remaining = self._waiting.pop((session_id, key)) - 1
+                if remaining:
+                    self._waiting[(session_id, key)] = remaining
+
+        future = asyncio.get_running_loop().create_future()
+        session_in_flight[key] = future
+        try:
+            result = await handler()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no duplicate is waiting on it
+            future.exception()
+            raise
+        else:
+            if should_store(result):
+                self.store(session_id, key, result)
+            future.set_result(result)
+            return result
+        finally:
+            session_in_flight.pop(key, None)
+            if not session_in_flight:
+                self._in_flight.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of cached and in-flight turns."""
+        return {
+            "cached_turns": sum(len(results) for results in self._results.values()),
+            "in_flight_turns": sum(len(pending) for pending in self._in_flight.values())
+        }